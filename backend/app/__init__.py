@@ -0,0 +1,4 @@
+import time
+
+# Reference point for the boot-time report in app.main: the first import of the package.
+IMPORT_STARTED = time.perf_counter()
@@ -1,15 +1,22 @@
 from app.core import security
 from app.core.config import settings
 from app.core.database import get_session as _get_session
-from app.models.user import User
-from app.schemas.token import TokenPayload
-from fastapi import Depends, HTTPException, status
+from app.core.principal_cache import principal_cache
+from app.core.replicas import PRINCIPAL_KEY, STICKY_COOKIE, replica_router
+from app.core.revocation import revocation_filter
+from app.models.user import User, UserRole
+from app.schemas.token import Principal, TokenPayload
+from app.services.activity import activity_tracker
+from contextvars import ContextVar
+from dataclasses import dataclass
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from uuid import UUID
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -17,33 +24,157 @@ reusable_oauth2 = OAuth2PasswordBearer(
 )
 
 
+
+@dataclass
+class SharedScope:
+    """What the sub-requests of a batch request reuse instead of setting up their own.
+
+    ``principal`` was authenticated once from the batch request's token. With a
+    ``session``, sub-requests run on it (sequentially); without one, each opens
+    its own as usual.
+    """
+    principal: Principal
+    session: Optional[AsyncSession] = None
+
+
+shared_scope: ContextVar[Optional[SharedScope]] = ContextVar("shared_scope", default=None)
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    shared = shared_scope.get()
+    if shared is not None and shared.session is not None:
+        yield shared.session
+        return
     async for session in _get_session():
         yield session
 
 
-async def get_current_user(
-        session: AsyncSession = Depends(get_session),
-        token: str = Depends(reusable_oauth2),
-) -> User:
+def _decode_access_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
         token_data = TokenPayload(**payload)
         if not token_data.sub:
             raise ValueError("Missing subject")
-        user_id = UUID(token_data.sub)
+        if token_data.type is not None:
+            raise ValueError("Not an access token")
+        UUID(token_data.sub)
     except (JWTError, ValidationError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
+    if token_data.token_version is not None and revocation_filter.is_revoked(
+            UUID(token_data.sub), token_data.token_version,
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+    return token_data
+
 
-    result = await session.execute(select(User).where(User.id == user_id))
-    user = result.scalars().first()
+async def _load_user(session: AsyncSession, token_data: TokenPayload) -> User:
+    user_id = UUID(token_data.sub)
+    session.info[PRINCIPAL_KEY] = user_id
+    user = principal_cache.get(user_id)
+    if user is None:
+        stamp = principal_cache.stamp()
+        result = await session.execute(select(User).where(User.id == user_id))
+        user = result.scalars().first()
+        if user:
+            principal_cache.set(user, stamp)
 
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    if token_data.token_version is not None and token_data.token_version != user.token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
-
+    if settings.ACTIVITY_TRACKING_ENABLED:
+        activity_tracker.touch(user.id)
     return user
+
+
+async def get_current_user(
+        session: AsyncSession = Depends(get_session),
+        token: str = Depends(reusable_oauth2),
+) -> User:
+    """The caller's full user row; prefer get_current_principal when id/role/workspace suffice."""
+    return await _load_user(session, _decode_access_token(token))
+
+
+async def get_current_principal(
+        session: AsyncSession = Depends(get_session),
+        token: str = Depends(reusable_oauth2),
+) -> Principal:
+    shared = shared_scope.get()
+    if shared is not None:
+        session.info[PRINCIPAL_KEY] = shared.principal.id
+        return shared.principal
+    return await authenticate(session, token)
+
+
+async def authenticate(session: AsyncSession, token: str) -> Principal:
+    """Authenticated from the token's own claims when it carries them, with no DB read.
+
+    Stateless tokens are only issued to active users, and deactivation bumps the
+    token version, so the revocation filter check in ``_decode_access_token`` is
+    all that is needed here.
+    """
+    token_data = _decode_access_token(token)
+    if token_data.token_version is None or token_data.role is None or token_data.status is None:
+        return Principal.model_validate(await _load_user(session, token_data))
+    user_id = UUID(token_data.sub)
+    session.info[PRINCIPAL_KEY] = user_id
+    if settings.ACTIVITY_TRACKING_ENABLED:
+        activity_tracker.touch(user_id)
+    return Principal(
+        id=user_id,
+        workspace_id=token_data.workspace_id,
+        role=token_data.role,
+        status=token_data.status,
+    )
+
+
+async def get_read_session(
+        request: Request,
+        current_user: Principal = Depends(get_current_principal),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for endpoints that only read, bound to a read replica when one is usable.
+
+    Falls back to the primary when no replica is healthy or the caller committed a
+    write within DB_READ_YOUR_WRITES_SECONDS (known to this worker, or shown by the
+    signed cookie from the writing response), so users always see their own changes.
+    Inside a batch with a shared session (a transactional batch), that session is
+    used so reads see the batch's uncommitted writes.
+    """
+    shared = shared_scope.get()
+    if shared is not None and shared.session is not None:
+        yield shared.session
+        return
+    replica = replica_router.acquire(current_user.id, request.cookies.get(STICKY_COOKIE))
+    if replica is None:
+        async for session in _get_session():
+            yield session
+        return
+    try:
+        async with replica.session_factory() as session:
+            yield session
+    except (OperationalError, InterfaceError) as exc:
+        replica_router.evict(replica, f"{exc.__class__.__name__}: {exc.orig}")
+        raise
+    except DBAPIError as exc:
+        if exc.connection_invalidated:
+            replica_router.evict(replica, "connection lost")
+        raise
+    finally:
+        replica_router.release(replica)
+
+
+async def get_current_admin(current_user: Principal = Depends(get_current_principal)) -> Principal:
+    if current_user.role not in (UserRole.ADMIN, UserRole.SUPER_ADMIN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return current_user
+
+
+async def get_current_manager(current_user: Principal = Depends(get_current_principal)) -> Principal:
+    if current_user.role not in (UserRole.MANAGER, UserRole.ADMIN, UserRole.SUPER_ADMIN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return current_user
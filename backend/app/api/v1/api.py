@@ -1,6 +1,12 @@
-from app.api.v1.endpoints import auth, users
+from app.api.v1.endpoints import auth, batch, checklists, dashboard, events, folders, sops, users
 from fastapi import APIRouter
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/login", tags=["login"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
+api_router.include_router(folders.router, prefix="/folders", tags=["folders"])
+api_router.include_router(sops.router, prefix="/sops", tags=["sops"])
+api_router.include_router(checklists.router, prefix="/checklists", tags=["checklists"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
+api_router.include_router(batch.router, prefix="/batch", tags=["batch"])
@@ -1,28 +1,68 @@
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.models.user import User
-from app.schemas.token import Token
-from datetime import timedelta
+from app.models.user import RefreshToken, User, UserStatus, normalize_email
+from app.schemas.token import InviteAccept, Principal, RefreshTokenRequest, Token, TokenPayload
+from app.services.activity import activity_tracker
+from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError, jwt
+from pydantic import ValidationError
+from sqlalchemy import delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from typing import Any
+from uuid import UUID
 
 router = APIRouter()
 
 
+async def _issue_tokens(session: AsyncSession, user: User) -> Token:
+    """Access token, plus a single-use refresh token in stateless mode; the caller commits."""
+    if not settings.AUTH_STATELESS_TOKENS:
+        return Token(
+            access_token=security.create_access_token(
+                str(user.id), expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+            ),
+            token_type="bearer",
+        )
+    now = datetime.utcnow()
+    await session.execute(delete(RefreshToken).where(RefreshToken.user_id == user.id, RefreshToken.expires_at < now))
+    refresh = RefreshToken(user_id=user.id, expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+    session.add(refresh)
+    claims = {
+        "role": user.role.value,
+        "workspace_id": str(user.workspace_id) if user.workspace_id else None,
+        "status": user.status.value,
+        "token_version": user.token_version,
+    }
+    return Token(
+        access_token=security.create_access_token(
+            str(user.id),
+            expires_delta=timedelta(minutes=settings.STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES),
+            claims=claims,
+        ),
+        token_type="bearer",
+        refresh_token=security.create_refresh_token(str(user.id), user.token_version, refresh.id),
+    )
+
+
 @router.post("/access-token", response_model=Token)
 async def login_access_token(
         session: AsyncSession = Depends(deps.get_session),
         form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     # OAuth2PasswordRequestForm uses `username` field; we treat it as email.
-    result = await session.execute(select(User).where(User.email == form_data.username))
+    result = await session.execute(select(User).where(User.email == normalize_email(form_data.username)))
     user = result.scalars().first()
 
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await security.verify_and_update_password(
+            form_data.password, user.hashed_password
+        )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect email or password",
@@ -30,8 +70,94 @@ async def login_access_token(
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
 
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return Token(
-        access_token=security.create_access_token(str(user.id), expires_delta=access_token_expires),
-        token_type="bearer",
+    if new_hash:
+        user.hashed_password = new_hash
+    token = await _issue_tokens(session, user)
+    await session.commit()
+    if settings.ACTIVITY_TRACKING_ENABLED:
+        activity_tracker.record_login(user.id)
+
+    return token
+
+
+@router.post("/refresh-token", response_model=Token)
+async def refresh_access_token(
+        *,
+        session: AsyncSession = Depends(deps.get_session),
+        refresh_in: RefreshTokenRequest,
+) -> Any:
+    """Exchange a refresh token for a new token pair; checks the user row every time.
+
+    Each refresh token works once. Presenting an already exchanged one means a
+    copy leaked (or a client replayed it), so all of the user's tokens are revoked.
+    """
+    invalid = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
+    try:
+        payload = TokenPayload(**jwt.decode(refresh_in.refresh_token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]))
+        if (payload.type != security.REFRESH_TOKEN_TYPE or not payload.sub or payload.token_version is None
+                or payload.jti is None):
+            raise ValueError("Not a refresh token")
+        user_id = UUID(payload.sub)
+    except (JWTError, ValidationError, ValueError):
+        raise invalid
+
+    user = await session.get(User, user_id)
+    if not user or user.token_version != payload.token_version:
+        raise invalid
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    claimed = await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == payload.jti, RefreshToken.user_id == user_id, RefreshToken.used_at.is_(None))
+        .values(used_at=datetime.utcnow())
     )
+    if claimed.rowcount != 1:
+        if await session.get(RefreshToken, payload.jti) is not None:
+            user.token_version += 1
+            await session.commit()
+        raise invalid
+    token = await _issue_tokens(session, user)
+    await session.commit()
+    return token
+
+
+@router.post("/revoke-tokens", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_tokens(
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+) -> None:
+    """Sign out everywhere: every access and refresh token issued so far stops working."""
+    user = await session.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    user.token_version += 1
+    await session.commit()
+
+
+@router.post("/accept-invite", response_model=Token)
+async def accept_invite(
+        *,
+        session: AsyncSession = Depends(deps.get_session),
+        invite_in: InviteAccept,
+) -> Any:
+    """Set the first password of an invited user and log them in."""
+    try:
+        payload = TokenPayload(**jwt.decode(invite_in.token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]))
+        if payload.type != security.INVITE_TOKEN_TYPE or not payload.sub:
+            raise ValueError("Not an invite token")
+        user_id = UUID(payload.sub)
+    except (JWTError, ValidationError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired invite")
+
+    user = await session.get(User, user_id)
+    if not user or not user.hashed_password.startswith(security.UNUSABLE_PASSWORD):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired invite")
+
+    user.hashed_password = await security.get_password_hash_async(invite_in.password)
+    user.status = UserStatus.ACTIVE
+    await session.commit()
+    token = await _issue_tokens(session, user)
+    await session.commit()
+    if settings.ACTIVITY_TRACKING_ENABLED:
+        activity_tracker.record_login(user.id)
+    return token
@@ -0,0 +1,174 @@
+import asyncio
+import base64
+import json
+import logging
+from app.api import deps
+from app.core.config import settings
+from app.core.database import DEFERRED_COMMIT_HOOKS
+from app.core.events import event_hub
+from app.schemas.batch import BatchOperation, BatchRequest, BatchResponse, BatchResult
+from app.schemas.token import Principal
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# The batch request's own body headers don't describe a sub-request's, and its
+# validators would make every sub-request conditional on the same ETag.
+_DROPPED_HEADERS = {b"content-length", b"content-type", b"if-none-match", b"if-modified-since"}
+# Set by the router for the batch route itself; each sub-request gets its own.
+_ROUTE_KEYS = ("route", "endpoint", "path_params")
+_SKIPPED = {"detail": "Not run: an earlier request in the transaction failed"}
+
+
+@router.post("/", response_model=BatchResponse)
+async def run_batch(
+        request: Request,
+        batch_in: BatchRequest,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """Run several API calls in one round-trip, authenticated once.
+
+    Calls go through the API's own routes in-process, so each gets exactly the
+    status and body it would get on its own. Consecutive GETs run concurrently;
+    any other call waits for the ones before it and runs alone on this request's
+    session. With ``transaction``, all calls run in order in one transaction
+    that is committed only if none fails; after a failure the rest are skipped.
+    """
+    ids = [operation.id or str(index) for index, operation in enumerate(batch_in.requests)]
+    if batch_in.transaction:
+        return await _run_transaction(request, batch_in.requests, ids, session, current_user)
+
+    results: List[Optional[BatchResult]] = [None] * len(ids)
+    read_scope = deps.SharedScope(current_user)
+    write_scope = deps.SharedScope(current_user, session)
+    limit = asyncio.Semaphore(settings.BATCH_READ_CONCURRENCY)
+
+    async def read(index: int) -> None:
+        async with limit:
+            results[index] = await _call(request, batch_in.requests[index], ids[index], read_scope)
+
+    reads: List[int] = []
+    for index, operation in enumerate(batch_in.requests):
+        if operation.method == "GET":
+            reads.append(index)
+            continue
+        await asyncio.gather(*(read(pending) for pending in reads))
+        reads = []
+        results[index] = await _call(request, operation, ids[index], write_scope)
+        # Like the end of a separate request: drop uncommitted changes of a failed
+        # call and forget loaded rows, so the next call reads current data.
+        await session.close()
+    await asyncio.gather(*(read(pending) for pending in reads))
+    return BatchResponse(results=results)
+
+
+async def _run_transaction(
+        request: Request,
+        operations: List[BatchOperation],
+        ids: List[str],
+        session: AsyncSession,
+        current_user: Principal,
+) -> BatchResponse:
+    results: List[BatchResult] = []
+    async with session.bind.connect() as connection:
+        await connection.begin()
+        if connection.dialect.name == "sqlite":
+            # pysqlite only sends BEGIN before the first write; without it the first
+            # SAVEPOINT would open a transaction of its own that its release commits.
+            await connection.exec_driver_sql("BEGIN")
+        # Endpoints commit as usual; here that only releases a savepoint, so the
+        # in-process effects of those commits wait for the outer transaction.
+        shared = AsyncSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        commit_hooks: List[Callable[[], None]] = []
+        shared.info[DEFERRED_COMMIT_HOOKS] = commit_hooks
+        scope = deps.SharedScope(current_user, shared)
+        try:
+            with event_hub.hold() as events:
+                for operation, operation_id in zip(operations, ids):
+                    if results and results[-1].status >= 400:
+                        results.append(BatchResult(id=operation_id, status=424, body=_SKIPPED))
+                    else:
+                        results.append(await _call(request, operation, operation_id, scope))
+        finally:
+            await shared.close()
+        committed = all(result.status < 400 for result in results)
+        if committed:
+            await connection.commit()
+            for hook in commit_hooks:
+                hook()
+            event_hub.release(events)
+        else:
+            await connection.rollback()
+    return BatchResponse(results=results, committed=committed)
+
+
+async def _call(request: Request, operation: BatchOperation, operation_id: str, shared: deps.SharedScope) -> BatchResult:
+    """Send one call through the app's router and collect its response."""
+    path, _, query = operation.path.partition("?")
+    path = settings.API_V1_STR + path
+    body = b"" if operation.body is None else json.dumps(operation.body).encode()
+    headers = [(name, value) for name, value in request.scope["headers"] if name not in _DROPPED_HEADERS]
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    scope = {key: value for key, value in request.scope.items() if key not in _ROUTE_KEYS}
+    scope.update(
+        method=operation.method, path=path, raw_path=path.encode(), query_string=query.encode(), headers=headers,
+    )
+
+    received = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    status_code = 500
+    response_headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers.update(
+                (name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", ())
+            )
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    token = deps.shared_scope.set(shared)
+    try:
+        await request.app.router(scope, receive, send)
+    except StarletteHTTPException as exc:
+        # Raised by the router itself for an unknown path or method, before any route handles it.
+        return BatchResult(id=operation_id, status=exc.status_code, headers=exc.headers or {}, body={"detail": exc.detail})
+    except Exception:
+        logger.exception("Batch request %s %s failed", operation.method, path)
+        return BatchResult(id=operation_id, status=500, body={"detail": "Internal Server Error"})
+    finally:
+        deps.shared_scope.reset(token)
+    response_headers.pop("content-length", None)
+    return BatchResult(
+        id=operation_id,
+        status=status_code,
+        headers=response_headers,
+        body=_decode(b"".join(chunks), response_headers.get("content-type", "")),
+    )
+
+
+def _decode(content: bytes, content_type: str) -> Any:
+    if not content:
+        return None
+    if content_type.startswith("application/json"):
+        return json.loads(content)
+    if content_type.startswith("text/"):
+        return content.decode("utf-8", errors="replace")
+    return base64.b64encode(content).decode()
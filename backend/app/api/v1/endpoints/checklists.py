@@ -0,0 +1,64 @@
+from app.api import deps
+from app.core import http_cache
+from app.models.checklist import Checklist
+from app.models.user import UserRole
+from app.schemas.checklist import ChecklistItemsUpdate, ChecklistProgress, ChecklistRead
+from app.schemas.token import Principal
+from app.services import checklists
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Optional
+from uuid import UUID
+
+router = APIRouter()
+
+_SUPERVISORS = (UserRole.MANAGER, UserRole.ADMIN, UserRole.SUPER_ADMIN)
+
+
+def _check_access(checklist: Optional[Any], user: Principal) -> None:
+    """Assignees see their own checklists; managers and admins every checklist of their workspace."""
+    if checklist is None or not (
+            checklist.user_id == user.id
+            or (checklist.workspace_id == user.workspace_id and user.role in _SUPERVISORS)
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Checklist not found")
+
+
+@router.get("/{checklist_id}", response_model=ChecklistRead)
+async def read_checklist(
+        checklist_id: UUID,
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """The checklist with its steps and completed items, from a single query."""
+    checklist = await checklists.read_checklist(session, checklist_id)
+    _check_access(checklist, current_user)
+    not_modified = http_cache.conditional(
+        request, response, http_cache.strong_etag(checklist.id, checklist.version),
+    )
+    if not_modified:
+        return not_modified
+    return checklist
+
+
+@router.patch("/{checklist_id}/items", response_model=ChecklistProgress)
+async def update_checklist_items(
+        *,
+        checklist_id: UUID,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        items_in: ChecklistItemsUpdate,
+) -> Any:
+    """Check or uncheck many items at once; 409 if the checklist moved past ``version``."""
+    checklist = await session.get(Checklist, checklist_id)
+    _check_access(checklist, current_user)
+    try:
+        return await checklists.update_items(
+            session, checklist, items_in.version, items_in.items, current_user.id,
+        )
+    except checklists.UnknownSteps as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except checklists.ChecklistConflict as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
@@ -0,0 +1,29 @@
+from app.api import deps
+from app.models.sop import DifficultyLevel, SOPStatus
+from app.models.user import UserStatus
+from app.schemas.dashboard import DashboardCounters
+from app.schemas.token import Principal
+from app.services import dashboard
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any
+
+router = APIRouter()
+
+
+@router.get("/", response_model=DashboardCounters)
+async def read_dashboard(
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """SOPs per status, difficulty and folder and users per status, from one read of stored counters."""
+    if current_user.workspace_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No workspace")
+    counters = await dashboard.read_counters(session, current_user.workspace_id)
+    return DashboardCounters(
+        workspace_id=current_user.workspace_id,
+        sops_by_status={value.value: 0 for value in SOPStatus} | counters[dashboard.SOP_STATUS],
+        sops_by_difficulty={value.value: 0 for value in DifficultyLevel} | counters[dashboard.SOP_DIFFICULTY],
+        sops_by_folder=counters[dashboard.SOP_FOLDER],
+        users_by_status={value.value: 0 for value in UserStatus} | counters[dashboard.USER_STATUS],
+    )
@@ -0,0 +1,90 @@
+import asyncio
+from app.api import deps
+from app.core.config import settings
+from app.core.database import async_session_factory
+from app.core.events import Lagged, Subscription, event_hub
+from app.core.revocation import revocation_filter
+from app.schemas.token import TokenPayload
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from jose import jwt
+from time import time
+from typing import Optional
+from uuid import UUID
+
+router = APIRouter()
+
+
+def _lapsed(credentials: TokenPayload) -> Optional[str]:
+    """Why the token that opened the connection no longer authorizes it, if it doesn't."""
+    if credentials.exp is not None and credentials.exp <= time():
+        return "token expired"
+    if credentials.token_version is not None and revocation_filter.is_revoked(
+            UUID(credentials.sub), credentials.token_version,
+    ):
+        return "token revoked"
+    return None
+
+
+async def _pump(websocket: WebSocket, subscription: Subscription, credentials: TokenPayload) -> None:
+    while True:
+        timeout = settings.REALTIME_HEARTBEAT_SECONDS
+        if credentials.exp is not None:
+            # Wake up when the token expires even if no event or heartbeat is due.
+            timeout = min(timeout, max(credentials.exp - time(), 0))
+        try:
+            message = await subscription.next(timeout)
+        except Lagged:
+            # Events were lost; the client reconnects and refetches its views.
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="resync")
+            return
+        reason = _lapsed(credentials)
+        if reason is not None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=reason)
+            return
+        # send waits for the socket to drain, so a slow client fills only its own buffer
+        await websocket.send_json(message if message is not None else {"type": "ping"})
+
+
+async def _until_disconnect(websocket: WebSocket) -> None:
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/ws")
+async def event_stream(websocket: WebSocket) -> None:
+    """Push channel for the caller's workspace: SOP status, approval and comment events.
+
+    The first client message authenticates the connection: ``{"token": "<access token>"}``.
+    The connection is closed with 1008 once that token expires or is revoked.
+    """
+    await websocket.accept()
+    if not settings.REALTIME_ENABLED:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="disabled")
+        return
+    try:
+        hello = await asyncio.wait_for(websocket.receive_json(), settings.REALTIME_AUTH_TIMEOUT_SECONDS)
+        token = str(hello.get("token") or "")
+        async with async_session_factory() as session:
+            principal = await deps.authenticate(session, token)
+        credentials = TokenPayload(**jwt.get_unverified_claims(token))  # verified by authenticate
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, HTTPException, ValueError, AttributeError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="authentication failed")
+        return
+
+    subscription = event_hub.subscribe(principal.workspace_id)
+    try:
+        await websocket.send_json({"type": "subscribed", "data": {"workspace_id": str(principal.workspace_id)}})
+        tasks = [
+            asyncio.create_task(_pump(websocket, subscription, credentials)),
+            asyncio.create_task(_until_disconnect(websocket)),
+        ]
+        _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_hub.unsubscribe(subscription)
@@ -0,0 +1,86 @@
+from app.api import deps
+from app.core import http_cache
+from app.models.folder import Folder
+from app.schemas.folder import FolderCreate, FolderMove, FolderRead, FolderTreeNode
+from app.schemas.token import Principal
+from app.services import folders
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional
+from uuid import UUID
+
+router = APIRouter()
+
+
+async def _get_workspace_folder(session: AsyncSession, folder_id: UUID, user: Principal) -> Folder:
+    folder = await session.get(Folder, folder_id)
+    if not folder or folder.workspace_id != user.workspace_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
+    return folder
+
+
+@router.post("/", response_model=FolderRead, status_code=status.HTTP_201_CREATED)
+async def create_folder(
+        *,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        folder_in: FolderCreate,
+) -> Any:
+    parent = None
+    if folder_in.parent_id:
+        parent = await _get_workspace_folder(session, folder_in.parent_id, current_user)
+
+    db_folder = Folder(**folder_in.model_dump(), workspace_id=current_user.workspace_id)
+    db_folder.path = folders.child_path(parent, db_folder.id)
+    db_folder.depth = parent.depth + 1 if parent else 0
+    session.add(db_folder)
+    await session.commit()
+    return db_folder
+
+
+@router.get("/tree", response_model=List[FolderTreeNode])
+async def read_folder_tree(
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        root_id: Optional[UUID] = None,
+) -> Any:
+    """Whole workspace hierarchy (or one subtree) with SOP counts, in a single query."""
+    root = await _get_workspace_folder(session, root_id, current_user) if root_id else None
+    tree = await folders.load_tree(session, current_user.workspace_id, root)
+    not_modified = http_cache.conditional(request, response, http_cache.weak_etag(tree))
+    if not_modified:
+        return not_modified
+    return tree
+
+
+@router.post("/{folder_id}/move", response_model=FolderRead)
+async def move_folder(
+        *,
+        folder_id: UUID,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        move_in: FolderMove,
+) -> Any:
+    folder = await _get_workspace_folder(session, folder_id, current_user)
+    parent = None
+    if move_in.parent_id:
+        parent = await _get_workspace_folder(session, move_in.parent_id, current_user)
+    try:
+        await folders.move_subtree(session, folder, parent)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    await session.commit()
+    return folder
+
+
+@router.delete("/{folder_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_folder(
+        folder_id: UUID,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+) -> None:
+    folder = await _get_workspace_folder(session, folder_id, current_user)
+    await folders.delete_subtree(session, folder)
+    await session.commit()
@@ -0,0 +1,378 @@
+from app.api import deps
+from app.core import http_cache
+from app.core.config import settings
+from app.core.events import APPROVAL_UPDATED, COMMENT_CREATED, SOP_STATUS, event_hub
+from app.models.sop import Comment, SOP, SOPStatus
+from app.schemas.checklist import SOPAssignmentReport, SOPAssignmentRequest
+from app.schemas.sop import (
+    CommentCreate,
+    CommentPage,
+    CommentRead,
+    SOPCreate,
+    SOPCreated,
+    SOPPDFStatus,
+    SOPPage,
+    SOPRead,
+    SOPSearchResults,
+    SOPSummary,
+    SOPUpdate,
+    SOPVersionContent,
+    SOPVersionDiff,
+    SOPVersionRead,
+    SimilarSOP,
+)
+from app.schemas.token import Principal
+from app.services import assignments, outbox, pdf, search, similarity, versioning
+from app.services.pagination import InvalidCursor, decode_cursor, encode_cursor
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional
+from uuid import UUID
+
+router = APIRouter()
+
+_SUMMARY_COLUMNS = [getattr(SOP, name) for name in SOPSummary.model_fields]
+
+_STATUS_TIMESTAMPS = {
+    SOPStatus.PENDING_APPROVAL: "submitted_at",
+    SOPStatus.APPROVED: "approved_at",
+    SOPStatus.PUBLISHED: "published_at",
+}
+
+_APPROVAL_STATUSES = (SOPStatus.PENDING_APPROVAL, SOPStatus.APPROVED, SOPStatus.REJECTED)
+
+
+async def _get_workspace_sop(session: AsyncSession, sop_id: UUID, user: Principal) -> SOP:
+    sop = await session.get(SOP, sop_id)
+    if not sop or sop.workspace_id != user.workspace_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="SOP not found")
+    return sop
+
+
+def _publish_status_change(sop: SOP, previous: SOPStatus, user: Principal) -> None:
+    event = {"sop_id": sop.id, "title": sop.title, "from": previous, "to": sop.status, "by": user.id}
+    event_hub.publish(sop.workspace_id, SOP_STATUS, event)
+    if previous in _APPROVAL_STATUSES or sop.status in _APPROVAL_STATUSES:
+        event_hub.publish(sop.workspace_id, APPROVAL_UPDATED, {**event, "rejection_reason": sop.rejection_reason})
+
+
+@router.post("/", response_model=SOPCreated, status_code=status.HTTP_201_CREATED)
+async def create_sop(
+        *,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        sop_in: SOPCreate,
+) -> Any:
+    """Create an SOP; ``similar_sops`` warns about near-duplicates already in the workspace."""
+    db_sop = SOP(
+        **sop_in.model_dump(),
+        step_count=len(sop_in.content.get("steps") or []),
+        workspace_id=current_user.workspace_id,
+        created_by=current_user.id,
+    )
+    session.add(db_sop)
+    versioning.record_version(session, db_sop, None, created_by=current_user.id)
+    await session.commit()
+    created = SOPCreated.model_validate(db_sop)
+    created.similar_sops = [SimilarSOP(**item) for item in await similarity.find_similar(session, db_sop.id)]
+    return created
+
+
+@router.get("/", response_model=SOPPage)
+async def list_sops(
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        status_filter: Optional[SOPStatus] = Query(None, alias="status"),
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200),
+) -> Any:
+    """Most recently updated first, keyset-paginated; ``content`` is never loaded."""
+    statement = select(*_SUMMARY_COLUMNS).where(SOP.workspace_id == current_user.workspace_id)
+    if status_filter is not None:
+        statement = statement.where(SOP.status == status_filter)
+    else:
+        statement = statement.where(SOP.deleted_at.is_(None))
+    if cursor:
+        try:
+            updated_at, last_id = decode_cursor(cursor)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+        statement = statement.where(tuple_(SOP.updated_at, SOP.id) < tuple_(updated_at, last_id))
+    statement = statement.order_by(SOP.updated_at.desc(), SOP.id.desc()).limit(limit + 1)
+
+    rows = (await session.execute(statement)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+
+    etag = http_cache.weak_etag(
+        current_user.workspace_id, status_filter, cursor,
+        [(row["id"], row["updated_at"]) for row in rows],
+    )
+    not_modified = http_cache.conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    return SOPPage(items=rows, next_cursor=next_cursor)
+
+
+@router.get("/search", response_model=SOPSearchResults)
+async def search_sops(
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        q: str = Query(..., min_length=1, max_length=200),
+        status_filter: Optional[List[SOPStatus]] = Query(None, alias="status"),
+        limit: int = Query(20, ge=1, le=100),
+        offset: int = Query(0, ge=0),
+) -> Any:
+    results = await search.search_sops(
+        session,
+        q,
+        workspace_id=current_user.workspace_id,
+        statuses=status_filter,
+        limit=limit,
+        offset=offset,
+    )
+    return SOPSearchResults(query=q, results=results)
+
+
+@router.get("/{sop_id}", response_model=SOPRead)
+async def read_sop(
+        sop_id: UUID,
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    # Validate against the light columns first so a 304 never loads `content`.
+    validators = (await session.execute(
+        select(SOP.workspace_id, SOP.version, SOP.updated_at, SOP.pdf_status, SOP.pdf_content_hash)
+        .where(SOP.id == sop_id)
+    )).first()
+    if not validators or validators.workspace_id != current_user.workspace_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="SOP not found")
+    etag = http_cache.strong_etag(
+        sop_id, validators.version, validators.updated_at, validators.pdf_status, validators.pdf_content_hash,
+    )
+    not_modified = http_cache.conditional(request, response, etag, validators.updated_at)
+    if not_modified:
+        return not_modified
+    return await session.get(SOP, sop_id)
+
+
+@router.patch("/{sop_id}", response_model=SOPRead)
+async def update_sop(
+        *,
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        sop_in: SOPUpdate,
+) -> Any:
+    sop = await _get_workspace_sop(session, sop_id, current_user)
+    changes = sop_in.model_dump(exclude_unset=True, exclude={"version_note"})
+    now = datetime.utcnow()
+    previous_content = sop.content
+    previous_status = sop.status
+
+    content_changed = "content" in changes and changes["content"] != sop.content
+    if content_changed:
+        sop.version += 1
+        sop.step_count = len(changes["content"].get("steps") or [])
+    if "status" in changes and changes["status"] != sop.status:
+        timestamp_field = _STATUS_TIMESTAMPS.get(changes["status"])
+        if timestamp_field:
+            setattr(sop, timestamp_field, now)
+    for field, value in changes.items():
+        setattr(sop, field, value)
+    sop.updated_at = now
+    if content_changed:
+        versioning.record_version(session, sop, previous_content, current_user.id, sop_in.version_note)
+    outbox.append(session, outbox.SOP_UPDATED, "sop", sop.id, {
+        "from_status": previous_status,
+        "status": sop.status,
+        "version": sop.version,
+        "content_changed": content_changed,
+    })
+
+    await session.commit()
+    outbox.outbox_dispatcher.notify()
+    if sop.status != previous_status:
+        _publish_status_change(sop, previous_status, current_user)
+    return sop
+
+
+@router.get("/{sop_id}/similar", response_model=List[SimilarSOP])
+async def list_similar_sops(
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        threshold: float = Query(settings.SIMILARITY_THRESHOLD, ge=similarity.MIN_THRESHOLD, le=1),
+        limit: int = Query(10, ge=1, le=100),
+) -> Any:
+    """Near-duplicates of the SOP in its workspace, most similar first (MinHash/LSH estimate)."""
+    await _get_workspace_sop(session, sop_id, current_user)
+    return await similarity.find_similar(session, sop_id, threshold, limit)
+
+
+@router.post("/{sop_id}/assignments", response_model=SOPAssignmentReport)
+async def assign_sop(
+        *,
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_manager),
+        assignment_in: SOPAssignmentRequest,
+) -> Any:
+    """Assign the SOP to every selected user and open a checklist for each; idempotent."""
+    sop = await _get_workspace_sop(session, sop_id, current_user)
+    if sop.deleted_at is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="SOP is in the trash")
+    return await assignments.assign_sop(session, sop, assignment_in, current_user.id)
+
+
+@router.post("/{sop_id}/pdf", response_model=SOPPDFStatus, status_code=status.HTTP_202_ACCEPTED)
+async def request_sop_pdf(
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """Queue a PDF render; a no-op when the current content was already rendered."""
+    sop = await _get_workspace_sop(session, sop_id, current_user)
+    if await pdf.enqueue(session, sop):
+        await session.commit()
+        pdf.pdf_worker.notify()
+    return SOPPDFStatus(sop_id=sop.id, pdf_status=sop.pdf_status, pdf_url=sop.pdf_url)
+
+
+@router.get("/{sop_id}/pdf")
+async def download_sop_pdf(
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    sop = await _get_workspace_sop(session, sop_id, current_user)
+    path = pdf.pdf_path(sop.pdf_content_hash) if sop.pdf_content_hash else None
+    if path is None or not path.exists():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PDF not generated yet")
+    return FileResponse(path, media_type="application/pdf", filename=f"{sop.title}.pdf")
+
+
+@router.get("/{sop_id}/versions", response_model=List[SOPVersionRead])
+async def list_sop_versions(
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        before: Optional[int] = Query(None, ge=1),
+        limit: int = Query(50, ge=1, le=200),
+) -> Any:
+    await _get_workspace_sop(session, sop_id, current_user)
+    return await versioning.list_versions(session, sop_id, limit, before)
+
+
+@router.get("/{sop_id}/versions/diff", response_model=SOPVersionDiff)
+async def diff_sop_versions(
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        from_version: int = Query(..., ge=1),
+        to_version: int = Query(..., ge=1),
+) -> Any:
+    """JSON Patch that turns ``from_version``'s content into ``to_version``'s."""
+    await _get_workspace_sop(session, sop_id, current_user)
+    try:
+        operations = await versioning.diff_versions(session, sop_id, from_version, to_version)
+    except versioning.VersionNotFound as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+    return SOPVersionDiff(sop_id=sop_id, from_version=from_version, to_version=to_version, operations=operations)
+
+
+@router.get("/{sop_id}/versions/{version_number}", response_model=SOPVersionContent)
+async def read_sop_version(
+        sop_id: UUID,
+        version_number: int,
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    await _get_workspace_sop(session, sop_id, current_user)
+    # A recorded version never changes, so clients can cache it indefinitely.
+    not_modified = http_cache.conditional(
+        request, response, http_cache.strong_etag(sop_id, version_number), cache_control=http_cache.IMMUTABLE,
+    )
+    if not_modified:
+        return not_modified
+    try:
+        content = await versioning.reconstruct(session, sop_id, version_number)
+    except versioning.VersionNotFound as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+    return SOPVersionContent(sop_id=sop_id, version_number=version_number, content=content)
+
+
+@router.delete("/{sop_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_sop(
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        reason: Optional[str] = None,
+) -> None:
+    """Move the SOP to the trash; it is purged after TRASH_RETENTION_DAYS."""
+    sop = await _get_workspace_sop(session, sop_id, current_user)
+    now = datetime.utcnow()
+    previous_status = sop.status
+    sop.status = SOPStatus.DELETED
+    sop.deleted_at = now
+    sop.deleted_by_id = current_user.id
+    sop.delete_reason = reason
+    sop.permanent_delete_at = now + timedelta(days=settings.TRASH_RETENTION_DAYS)
+    sop.updated_at = now
+    await session.commit()
+    if previous_status != SOPStatus.DELETED:
+        _publish_status_change(sop, previous_status, current_user)
+
+
+@router.post("/{sop_id}/comments", response_model=CommentRead, status_code=status.HTTP_201_CREATED)
+async def create_comment(
+        *,
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        comment_in: CommentCreate,
+) -> Any:
+    sop = await _get_workspace_sop(session, sop_id, current_user)
+    comment = Comment(sop_id=sop.id, user_id=current_user.id, text=comment_in.text)
+    session.add(comment)
+    await session.commit()
+    event_hub.publish(sop.workspace_id, COMMENT_CREATED, CommentRead.model_validate(comment).model_dump())
+    return comment
+
+
+@router.get("/{sop_id}/comments", response_model=CommentPage)
+async def list_comments(
+        sop_id: UUID,
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200),
+) -> Any:
+    """Newest first, keyset-paginated."""
+    await _get_workspace_sop(session, sop_id, current_user)
+    statement = select(Comment).where(Comment.sop_id == sop_id)
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+        statement = statement.where(tuple_(Comment.created_at, Comment.id) < tuple_(created_at, last_id))
+    statement = statement.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit + 1)
+
+    comments = (await session.execute(statement)).scalars().all()
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_cursor = encode_cursor(comments[-1].created_at, comments[-1].id)
+    return CommentPage(items=comments, next_cursor=next_cursor)
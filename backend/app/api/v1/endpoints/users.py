@@ -1,11 +1,16 @@
 from app.api import deps
-from app.core import security
+from app.core import http_cache, security
 from app.models.user import User
-from app.schemas.user import UserCreate, UserRead
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.schemas.token import Principal
+from app.schemas.user import UserActivityRead, UserCreate, UserImportReport, UserPage, UserRead
+from app.services import outbox, user_import
+from app.services.activity import activity_tracker
+from app.services.pagination import InvalidCursor, decode_cursor, encode_cursor
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from typing import Any
+from typing import Any, Optional
 
 router = APIRouter()
 
@@ -30,17 +35,81 @@ async def create_user(
         is_active=user_in.is_active,
         job_title=user_in.job_title,
         workspace_id=user_in.workspace_id,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=await security.get_password_hash_async(user_in.password),
     )
 
     session.add(db_user)
+    outbox.append(session, outbox.USER_CREATED, "user", db_user.id, {
+        "workspace_id": db_user.workspace_id,
+        "role": db_user.role,
+    })
     await session.commit()
     await session.refresh(db_user)
     return db_user
 
 
+@router.get("/", response_model=UserPage)
+async def list_users(
+        session: AsyncSession = Depends(deps.get_read_session),
+        current_user: Principal = Depends(deps.get_current_admin),
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200),
+) -> Any:
+    """Users of the caller's workspace, newest first, with last-seen and login counts."""
+    statement = select(User).where(User.workspace_id == current_user.workspace_id)
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+        statement = statement.where(tuple_(User.created_at, User.id) < tuple_(created_at, last_id))
+    statement = statement.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1)
+
+    users = (await session.execute(statement)).scalars().all()
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+
+    items = []
+    for user in users:
+        item = UserActivityRead.model_validate(user)
+        pending = activity_tracker.pending(user.id)
+        if pending is not None:
+            # Not flushed yet: combine with what the database already has.
+            if item.last_active_at is None or pending.last_active_at > item.last_active_at:
+                item.last_active_at = pending.last_active_at
+            item.login_count += pending.logins
+        items.append(item)
+    return UserPage(items=items, next_cursor=next_cursor)
+
+
+@router.post("/import", response_model=UserImportReport)
+async def import_users(
+        request: Request,
+        session: AsyncSession = Depends(deps.get_session),
+        current_user: Principal = Depends(deps.get_current_admin),
+) -> Any:
+    """Bulk-create users into the caller's workspace from a streamed CSV or NDJSON body.
+
+    Rows without a password are created as PENDING and get an invite token in the report.
+    Rows with a role above the caller's are rejected.
+    """
+    records = user_import.iter_records(request.stream(), request.headers.get("content-type", ""))
+    try:
+        return await user_import.import_users(session, records, current_user.workspace_id, current_user.role)
+    except user_import.UnsupportedFormat as exc:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc))
+
+
 @router.get("/me", response_model=UserRead)
 async def read_user_me(
+        request: Request,
+        response: Response,
         current_user: User = Depends(deps.get_current_user),
 ) -> Any:
+    etag = http_cache.strong_etag(current_user.id, current_user.updated_at)
+    not_modified = http_cache.conditional(request, response, etag, current_user.updated_at)
+    if not_modified:
+        return not_modified
     return current_user
@@ -18,10 +18,119 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "changethis_secret_key_for_jwt_tokens"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
 
+    # Authenticated-user cache used by get_current_user. Invalidation is per
+    # process, so with several workers the TTL bounds how long a change takes
+    # to be seen everywhere. Set the size to 0 to disable caching.
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    INVITE_TOKEN_EXPIRE_HOURS: int = 72
+
+    # Opt-in self-contained access tokens: role, workspace, status and token version
+    # travel in the JWT, so requests authenticate without a DB read. They are short
+    # lived and paired with refresh tokens; revocations reach every worker within
+    # TOKEN_REVOCATION_REFRESH_SECONDS.
+    AUTH_STATELESS_TOKENS: bool = False
+    STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 5.0
+
+    # Bulk user import: rows per validation/insert batch, and how many bcrypt
+    # jobs one import may run at once (leaves pool capacity for logins)
+    USER_IMPORT_BATCH_SIZE: int = 500
+    USER_IMPORT_HASH_CONCURRENCY: int = 2
+
+    # Password hashing runs on a bounded thread pool; requests beyond
+    # workers + max pending are rejected with 503 and Retry-After.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    # SOP history stores a full snapshot every N versions and JSON Patch deltas between
+    SOP_VERSION_SNAPSHOT_INTERVAL: int = 20
+
+    # Background PDF rendering: worker processes, queue poll interval and output directory
+    PDF_WORKER_ENABLED: bool = True
+    PDF_WORKERS: int = 2
+    PDF_POLL_INTERVAL_SECONDS: float = 5.0
+    PDF_MAX_ATTEMPTS: int = 3
+    PDF_JOB_TIMEOUT_SECONDS: int = 300
+    PDF_STORAGE_DIR: str = "./storage/pdfs"
+
+    # last_active_at / login_count are buffered in memory and written in batches every
+    # interval, or sooner once this many users have pending activity
+    ACTIVITY_TRACKING_ENABLED: bool = True
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: float = 30.0
+    ACTIVITY_FLUSH_MAX_PENDING: int = 1000
+
+    # Bulk SOP assignment writes assignments and checklists in multi-row INSERTs of this many users
+    ASSIGNMENT_INSERT_BATCH_SIZE: int = 500
+
+    # Push channel (/api/v1/events/ws). Each connection buffers at most BUFFER_SIZE
+    # events; a client further behind is disconnected and must resync. With several
+    # workers, set BROKER_URL (unix:///path or tcp://host:port) to the event relay,
+    # which run.py starts in production mode, so events reach every worker's clients.
+    REALTIME_ENABLED: bool = True
+    REALTIME_BUFFER_SIZE: int = 256
+    REALTIME_HEARTBEAT_SECONDS: float = 25.0
+    REALTIME_AUTH_TIMEOUT_SECONDS: float = 10.0
+    REALTIME_BROKER_URL: str = ""
+
+    # Side effects of writes (PDF rendering on publish, ...) go through the transactional
+    # outbox: the dispatcher claims up to BATCH_SIZE due events per poll and handles at
+    # most CONCURRENCY at once. A failing event is retried after RETRY_BASE * 2^(n-1)
+    # seconds and dead-lettered after MAX_ATTEMPTS; claims older than CLAIM_TIMEOUT
+    # (a crashed process) are released.
+    OUTBOX_DISPATCHER_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_CONCURRENCY: int = 8
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 2.0
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_BASE_SECONDS: float = 1.0
+    OUTBOX_CLAIM_TIMEOUT_SECONDS: float = 300.0
+
+    # Near-duplicate detection: MinHash signatures (NUM_PERM hashes over SHINGLE_SIZE-word
+    # shingles of the step text) split into BANDS LSH bands. SOPs whose estimated Jaccard
+    # similarity reaches THRESHOLD are reported as similar; THRESHOLD must stay above the
+    # recall floor the banding gives (see app.services.similarity). Changing NUM_PERM, BANDS
+    # or SHINGLE_SIZE requires `python -m app.services.similarity` to rebuild the index.
+    SIMILARITY_NUM_PERM: int = 128
+    SIMILARITY_BANDS: int = 32
+    SIMILARITY_SHINGLE_SIZE: int = 3
+    SIMILARITY_THRESHOLD: float = 0.7
+    SIMILARITY_REBUILD_BATCH_SIZE: int = 500
+
+    # POST /api/v1/batch runs consecutive GET sub-requests concurrently, each on its own
+    # pooled session; this caps how many one batch runs (and connections it holds) at once.
+    BATCH_READ_CONCURRENCY: int = 8
+
+    # Dashboard counters are maintained on every write; a background job recounts every
+    # workspace each interval and corrects any drift.
+    DASHBOARD_RECONCILE_ENABLED: bool = True
+    DASHBOARD_RECONCILE_INTERVAL_SECONDS: float = 21600.0
+
+    # Soft-deleted SOPs stay in the trash this long before being purged. The purge
+    # runs every interval in transactions of at most BATCH_SIZE SOPs (with their
+    # versions, PDF jobs and folder links), pausing between batches so it spends at
+    # most DUTY_CYCLE of its time in the database.
+    TRASH_RETENTION_DAYS: int = 30
+    TRASH_PURGE_ENABLED: bool = True
+    TRASH_PURGE_INTERVAL_SECONDS: float = 3600.0
+    TRASH_PURGE_BATCH_SIZE: int = 100
+    TRASH_PURGE_DUTY_CYCLE: float = 0.25
+    TRASH_PURGE_MIN_PAUSE_SECONDS: float = 0.05
+
+    # Instrumentation: Prometheus text at /metrics, and a warning log with the
+    # SQL of every request slower than the threshold (0 disables the log)
+    METRICS_ENABLED: bool = True
+    SLOW_REQUEST_THRESHOLD_MS: float = 0
+    SLOW_REQUEST_MAX_STATEMENTS: int = 50
+
     # CORS: allow comma-separated string in env
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
-    @field_validator("BACKEND_CORS_ORIGINS", mode="before")
+    @field_validator("BACKEND_CORS_ORIGINS", "DATABASE_REPLICA_URLS", mode="before")
     @classmethod
     def assemble_cors_origins(cls, v: Union[str, List[str]]):
         if v is None:
@@ -39,5 +148,60 @@ class Settings(BaseSettings):
     # Default local DB (Phase later: switch to Supabase Postgres via .env)
     DATABASE_URL: str = "sqlite+aiosqlite:///./sophub.db"
 
+    # Engine tuning. SQL echo is expensive; only enable it while debugging.
+    DB_ECHO: bool = False
+    DB_QUERY_CACHE_SIZE: int = 1200
+    # Connection pool (server databases only)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg prepared statements cached per connection (0 disables, e.g. behind pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    # Read replicas (comma-separated URLs) serving read-only endpoints. A user's reads
+    # go to the primary for DB_READ_YOUR_WRITES_SECONDS after they commit a write;
+    # replicas failing a health check or lagging more than the max are skipped.
+    DATABASE_REPLICA_URLS: Union[List[str], str] = []
+    DB_REPLICA_SELECTION: str = "round_robin"  # or least_connections
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+    DB_REPLICA_HEALTH_CHECK_SECONDS: float = 10.0
+    DB_REPLICA_MAX_LAG_SECONDS: float = 30.0
+    # Pragmas applied to every new SQLite connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Startup checks the Alembic revision stamp (one query) and only runs DDL when it
+    # is behind. Disable auto-migration where migrations are a separate deploy step.
+    DB_AUTO_MIGRATE: bool = True
+    # Boot time above this is logged as a warning
+    STARTUP_TIME_BUDGET_MS: int = 2000
+
+    # run.py. "development" is a single auto-reloading process; "production" runs
+    # gunicorn managing uvicorn workers (uvicorn's own supervisor where gunicorn is
+    # unavailable, e.g. Windows). SERVER_WORKERS=0 means one per available CPU core.
+    SERVER_MODE: str = "development"
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    # "auto" picks uvloop / httptools when installed
+    SERVER_LOOP: str = "auto"
+    SERVER_HTTP: str = "auto"
+    # Import the app once in the master process before forking workers
+    SERVER_PRELOAD_APP: bool = True
+    # Recycle a worker after this many requests (plus up to the jitter, so workers
+    # restart one at a time) to cap memory growth; 0 disables
+    SERVER_MAX_REQUESTS: int = 10_000
+    SERVER_MAX_REQUESTS_JITTER: int = 1_000
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_BACKLOG: int = 2048
+    # Per-worker cap on concurrent connections/tasks before answering 503; 0 = unlimited
+    SERVER_LIMIT_CONCURRENCY: int = 0
+    # Seconds a silent worker may hang before being killed, and to finish in-flight requests on restart
+    SERVER_WORKER_TIMEOUT_SECONDS: int = 60
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    SERVER_LOG_LEVEL: str = "info"
+
 
 settings = Settings()
@@ -1,17 +1,170 @@
+import logging
+from app.core import metrics
 from app.core.config import settings
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel
+from pathlib import Path
+from sqlalchemy import event, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from time import perf_counter
+from typing import Any, AsyncGenerator, Callable, Dict, Optional
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+logger = logging.getLogger(__name__)
 
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+# Head of migrations/versions; bump it together with every new migration.
+SCHEMA_REVISION = "0012"
+# First revision; unversioned databases are checked against its schema and stamped with it.
+_INITIAL_REVISION = "0001"
 
-async def init_db():
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    database_url = make_url(url)
+    options: Dict[str, Any] = {
+        "echo": settings.DB_ECHO,
+        "future": True,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+    }
+    if database_url.get_backend_name() == "sqlite":
+        if database_url.database in (None, "", ":memory:"):
+            options["poolclass"] = StaticPool
+            options["connect_args"] = {"check_same_thread": False}
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if database_url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._query_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    metrics.record_query(statement, perf_counter() - context._query_started)
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """Build an engine for ``url`` using the pool and driver tuning from settings."""
+    new_engine = create_async_engine(url, **_engine_options(url))
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    if settings.METRICS_ENABLED:
+        event.listen(new_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(new_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    return new_engine
+
+
+engine = create_engine(settings.DATABASE_URL)
+async_session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+# session.info key holding a list on sessions whose commits are provisional: they only
+# release a savepoint of an outer transaction (a transactional batch request).
+DEFERRED_COMMIT_HOOKS = "deferred_commit_hooks"
+
+
+def on_commit(session: Session, callback: Callable[[], None]) -> None:
+    """Apply an ``after_commit`` side effect now, or once the outer transaction commits.
+
+    In-process effects of a commit (cache invalidation, revocations, replica
+    stickiness) go through here so that a provisional commit only queues them;
+    the owner of the outer transaction runs the queue after committing it, or
+    drops it on rollback.
+    """
+    deferred = session.info.get(DEFERRED_COMMIT_HOOKS)
+    if deferred is None:
+        callback()
+    else:
+        deferred.append(callback)
+
+
+def dialect_insert(session: AsyncSession, table):
+    """``INSERT`` for the session's dialect, offering ``on_conflict_do_nothing/update``."""
+    dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
+
+
+async def schema_revision(conn) -> Optional[str]:
+    """The Alembic revision stamped in the database, or None if it has never been migrated."""
+    try:
+        return await conn.scalar(text("SELECT version_num FROM alembic_version"))
+    except DBAPIError:
+        return None
+
+
+async def init_db() -> None:
+    """Make sure the schema is at ``SCHEMA_REVISION``; a single query when it already is."""
+    async with engine.connect() as conn:
+        current = await schema_revision(conn)
+    if current == SCHEMA_REVISION:
+        return
+    if not settings.DB_AUTO_MIGRATE:
+        raise RuntimeError(
+            f"Database schema is at {current or 'no revision'}, expected {SCHEMA_REVISION}; "
+            "run `alembic upgrade head`"
+        )
+    logger.warning("Migrating database schema from %s to %s", current or "no revision", SCHEMA_REVISION)
     async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(_migrate)
+
+
+def _migrate(connection: Connection) -> None:
+    # Alembic is only needed when there is something to do, so it is imported here.
+    from alembic import command
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    from app.models import checklist, dashboard, folder, outbox, similarity, sop, user, workspace  # noqa: F401  (registers every table)
+    from app.services.search import create_search_index
+
+    config = Config(str(BACKEND_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_ROOT / "migrations"))
+    config.attributes["connection"] = connection
+    config.attributes["configure_logger"] = False
+
+    inspector = inspect(connection)
+    tables = inspector.get_table_names()
+    if "alembic_version" not in tables and "users" in tables:
+        # Created by the old create_all-on-boot startup, which never added columns to
+        # existing tables: bring it to the first revision, then migrate like any other.
+        logger.warning("Unversioned database found; adopting it at revision %s", _INITIAL_REVISION)
+        initial = ScriptDirectory.from_config(config).get_revision(_INITIAL_REVISION).module.schema()
+        for table in initial.sorted_tables:
+            if table.name not in tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            missing = [column.name for column in table.columns if column.name not in present]
+            if missing:
+                raise RuntimeError(
+                    f"Unversioned database cannot be adopted: table {table.name} lacks {', '.join(missing)}"
+                )
+        initial.create_all(connection)
+        create_search_index(connection)
+        command.stamp(config, _INITIAL_REVISION)
+    command.upgrade(config, "head")
 
 
-async def get_session() -> AsyncSession:
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    async with async_session() as session:
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_factory() as session:
         yield session
@@ -0,0 +1,330 @@
+"""
+Workspace event fan-out for the push channel (``/api/v1/events/ws``).
+
+Endpoints publish after committing (SOP status and approval changes, new
+comments); ``EventHub`` hands each event to every connection subscribed to
+that workspace. Publishing never waits on a client: each subscription
+buffers at most ``REALTIME_BUFFER_SIZE`` events, and a client that falls
+further behind is dropped with a "resync" close so it reconnects and
+refetches instead of slowing everyone else down.
+
+Delivery between processes goes through a broker. ``LocalBroker`` only
+reaches this process. With several workers, ``RelayBroker`` connects every
+worker to a small relay (``python -m app.core.events <url>``, started by
+``run.py`` in production mode) that forwards each worker's events to all
+the others; if the relay is unreachable, events still reach local clients.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import uuid
+from app.core import metrics
+from app.core.config import settings
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+SOP_STATUS = "sop.status"
+APPROVAL_UPDATED = "approval.updated"
+COMMENT_CREATED = "comment.created"
+
+Deliver = Callable[[Dict[str, Any]], None]
+
+# Events published while held (see EventHub.hold) are collected here instead of sent.
+_held: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("held_events", default=None)
+
+
+class Lagged(Exception):
+    """The subscriber's buffer overflowed; it has missed events and must resync."""
+
+
+class Subscription:
+    def __init__(self, workspace_id: str, buffer_size: int):
+        self.workspace_id = workspace_id
+        self.buffer_size = buffer_size
+        self.lagged = False
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+
+    def offer(self, message: Dict[str, Any]) -> bool:
+        """Buffer ``message``; False (and lagged from then on) when the buffer is full."""
+        if len(self._buffer) >= self.buffer_size:
+            self.lagged = True
+            self._buffer.clear()
+        else:
+            self._buffer.append(message)
+        self._ready.set()
+        return not self.lagged
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """The next event; None after ``timeout`` idle seconds. Raises Lagged after an overflow."""
+        if not self._buffer and not self.lagged:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.lagged:
+            raise Lagged()
+        return self._buffer.popleft()
+
+
+class LocalBroker:
+    """Delivers within this process only."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def attach(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self._deliver(message)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"type": "local"}
+
+
+async def _open_connection(url: str):
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return await asyncio.open_unix_connection(parsed.path)
+    return await asyncio.open_connection(parsed.hostname, parsed.port)
+
+
+class RelayBroker:
+    """Delivers locally at once and forwards through the relay to the other workers."""
+
+    def __init__(self, url: str, max_outbox: int = 10_000, reconnect_seconds: float = 1.0):
+        self.url = url
+        self.origin: Optional[str] = None
+        self.connected = False
+        self.dropped = 0
+        self._warned = False
+        self.reconnect_seconds = reconnect_seconds
+        self._deliver: Optional[Deliver] = None
+        self._outbox: Deque[bytes] = deque()
+        self._max_outbox = max_outbox
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+    def attach(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self._deliver(message)
+        if len(self._outbox) >= self._max_outbox:
+            self._outbox.popleft()
+            self.dropped += 1
+        self._outbox.append(json.dumps({"origin": self.origin, "message": message}).encode() + b"\n")
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        # Chosen per worker at startup: with a preloaded app, workers share the
+        # master's import-time state and would otherwise ignore each other's events.
+        self.origin = uuid.uuid4().hex
+        self._runner = asyncio.create_task(self._run(), name="event-relay-client")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, writer = await _open_connection(self.url)
+            except OSError as exc:
+                if not self._warned:
+                    logger.warning("Event relay %s unreachable (%s); events stay local", self.url, exc)
+                    self._warned = True
+                await asyncio.sleep(self.reconnect_seconds)
+                continue
+            logger.info("Connected to event relay %s", self.url)
+            self.connected = True
+            self._warned = False
+            sender = asyncio.create_task(self._send(writer))
+            try:
+                await self._receive(reader)
+            finally:
+                self.connected = False
+                sender.cancel()
+                await asyncio.gather(sender, return_exceptions=True)
+                writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._outbox:
+                writer.write(self._outbox.popleft())
+            await writer.drain()
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            try:
+                line = await reader.readline()
+            except (OSError, asyncio.LimitOverrunError, ValueError):
+                return
+            if not line:
+                return
+            try:
+                envelope = json.loads(line)
+            except ValueError:
+                continue
+            if envelope.get("origin") != self.origin:
+                self._deliver(envelope["message"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"type": "relay", "url": self.url, "connected": self.connected, "dropped": self.dropped}
+
+
+class EventHub:
+    def __init__(self, buffer_size: int, broker=None):
+        self.buffer_size = buffer_size
+        self.broker = broker or LocalBroker()
+        self.broker.attach(self.deliver)
+        self.published = 0
+        self.delivered = 0
+        self.lagged = 0
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, workspace_id: Any) -> Subscription:
+        subscription = Subscription(str(workspace_id), self.buffer_size)
+        self._subscribers.setdefault(subscription.workspace_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.workspace_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.workspace_id]
+
+    def publish(self, workspace_id: Any, event_type: str, data: Dict[str, Any]) -> None:
+        """Send an event to the workspace's subscribers in every worker; never blocks."""
+        if workspace_id is None:
+            return
+        message = {
+            "id": uuid.uuid4().hex,
+            "workspace_id": str(workspace_id),
+            "type": event_type,
+            "data": json.loads(json.dumps(data, default=str)),
+        }
+        held = _held.get()
+        if held is not None:
+            held.append(message)
+            return
+        self.published += 1
+        self.broker.publish(message)
+
+    @contextmanager
+    def hold(self) -> Iterator[List[Dict[str, Any]]]:
+        """Collect the events published in this context instead of sending them.
+
+        For work whose commits are provisional (a transactional batch request):
+        pass the collected events to ``release`` once the outer transaction has
+        committed, or drop them if it rolled back.
+        """
+        held: List[Dict[str, Any]] = []
+        token = _held.set(held)
+        try:
+            yield held
+        finally:
+            _held.reset(token)
+
+    def release(self, messages: List[Dict[str, Any]]) -> None:
+        for message in messages:
+            self.published += 1
+            self.broker.publish(message)
+
+    def deliver(self, message: Dict[str, Any]) -> None:
+        for subscription in list(self._subscribers.get(message["workspace_id"], ())):
+            if subscription.lagged:
+                continue
+            if subscription.offer(message):
+                self.delivered += 1
+            else:
+                self.lagged += 1
+
+    def connections(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    async def start(self) -> None:
+        await self.broker.start()
+
+    async def stop(self) -> None:
+        await self.broker.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": self.connections(),
+            "published": self.published,
+            "delivered": self.delivered,
+            "lagged": self.lagged,
+            "broker": self.broker.stats(),
+        }
+
+
+async def serve_relay(url: str, max_buffer_bytes: int = 1 << 20) -> None:
+    """Forward every line received from one worker to all other connected workers."""
+    peers: Set[asyncio.StreamWriter] = set()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peers.add(writer)
+        try:
+            while line := await reader.readline():
+                for peer in list(peers):
+                    if peer is writer:
+                        continue
+                    if peer.transport.get_write_buffer_size() > max_buffer_bytes:
+                        # A worker that stopped reading must not grow the relay without bound.
+                        peers.discard(peer)
+                        peer.close()
+                    else:
+                        peer.write(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            peers.discard(writer)
+            writer.close()
+
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        server = await asyncio.start_unix_server(handle, parsed.path)
+    else:
+        server = await asyncio.start_server(handle, parsed.hostname, parsed.port)
+    async with server:
+        await server.serve_forever()
+
+
+def _build_hub() -> EventHub:
+    broker = RelayBroker(settings.REALTIME_BROKER_URL) if settings.REALTIME_BROKER_URL else LocalBroker()
+    return EventHub(settings.REALTIME_BUFFER_SIZE, broker)
+
+
+event_hub = _build_hub()
+metrics.register(metrics.Gauge(
+    "realtime_connections", "Open push-channel connections in this process.", event_hub.connections,
+))
+metrics.register(metrics.Gauge(
+    "realtime_lagged_total", "Connections dropped for falling behind.", lambda: event_hub.lagged, "counter",
+))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve_relay(sys.argv[1] if len(sys.argv) > 1 else settings.REALTIME_BROKER_URL))
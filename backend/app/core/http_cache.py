@@ -0,0 +1,71 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from starlette import status
+from typing import Any, Optional
+
+# Clients may keep a copy but must revalidate it (cheap 304) before every use.
+REVALIDATE = "private, no-cache"
+# Content addressed by an immutable key (e.g. a specific SOP version).
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def _digest(parts: Any) -> str:
+    return hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+
+
+def strong_etag(*parts: Any) -> str:
+    return f'"{_digest(parts)}"'
+
+
+def weak_etag(*parts: Any) -> str:
+    """Validator for derived representations such as list pages."""
+    return f'W/"{_digest(parts)}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison (RFC 9110 13.1.2); If-None-Match wins over If-Modified-Since.
+        candidates = {_opaque(tag) for tag in if_none_match.split(",")}
+        return "*" in candidates or _opaque(etag) in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps are stored as naive UTC (datetime.utcnow).
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def conditional(
+        request: Request,
+        response: Response,
+        etag: str,
+        last_modified: Optional[datetime] = None,
+        cache_control: str = REVALIDATE,
+) -> Optional[Response]:
+    """Attach validators to ``response``; return a 304 to send instead if the client is current.
+
+    Call it as soon as the validators are known so the handler can skip
+    loading and serializing the body.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    if request.method in ("GET", "HEAD") and _not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,216 @@
+"""
+In-process request instrumentation exported in Prometheus text format.
+
+``MetricsMiddleware`` times every request and attaches a ``RequestStats``
+to a context variable; the engine hooks in ``app.core.database`` and the
+password hasher add SQL and bcrypt time to it. Totals land in the
+histograms below, rendered by ``render()`` for the ``/metrics`` endpoint.
+Values are per worker process, as usual for Prometheus client libraries.
+"""
+
+import logging
+import threading
+from app.core.config import settings
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("app.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        # Per series: one counter per bucket (non-cumulative), then +Inf count and sum
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _labels(self.labelnames, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {_number(cumulative)}"
+            cumulative += series[len(self.buckets)]
+            le = _labels(self.labelnames, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{le} {_number(cumulative)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {_number(cumulative)}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Gauge:
+    """Value read from ``callback`` at scrape time."""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float], kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.kind = kind
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield f"{self.name} {_number(self.callback() or 0)}"
+
+
+REGISTRY: List[Any] = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+request_duration = register(Histogram(
+    "http_request_duration_seconds", "Request latency by route.", ("method", "route", "status"),
+))
+response_size = register(Histogram(
+    "http_response_size_bytes", "Response body size by route.", ("method", "route"), SIZE_BUCKETS,
+))
+request_queries = register(Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), COUNT_BUCKETS,
+))
+request_db_time = register(Histogram(
+    "http_request_db_seconds", "Cumulative SQL time per request.", ("method", "route"),
+))
+db_query_duration = register(Histogram(
+    "db_query_duration_seconds", "Duration of individual SQL statements.",
+))
+password_hash_duration = register(Histogram(
+    "password_hash_duration_seconds", "bcrypt time per operation, excluding pool queueing.",
+    ("operation",), (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+))
+_in_progress = 0
+register(Gauge("http_requests_in_progress", "Requests currently being handled.", lambda: _in_progress))
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    bcrypt_seconds: float = 0.0
+    statements: Optional[List[Tuple[float, str]]] = None
+    started: float = field(default_factory=perf_counter)
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def record_query(statement: str, seconds: float) -> None:
+    db_query_duration.observe(seconds)
+    stats = current_request.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_seconds += seconds
+    if stats.statements is not None and len(stats.statements) < settings.SLOW_REQUEST_MAX_STATEMENTS:
+        stats.statements.append((seconds, statement))
+
+
+def record_password_hash(operation: str, seconds: float) -> None:
+    password_hash_duration.observe(seconds, operation)
+    stats = current_request.get()
+    if stats is not None:
+        stats.bcrypt_seconds += seconds
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no extra task per request, unlike BaseHTTPMiddleware)."""
+
+    def __init__(self, app, slow_request_ms: float = 0):
+        self.app = app
+        self.slow_request_seconds = slow_request_ms / 1000 if slow_request_ms > 0 else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _in_progress
+        stats = RequestStats(statements=[] if self.slow_request_seconds else None)
+        token = current_request.set(stats)
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        _in_progress += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_progress -= 1
+            current_request.reset(token)
+            self._observe(scope, stats, status_code, size)
+
+    def _observe(self, scope, stats: RequestStats, status_code: int, size: int) -> None:
+        elapsed = perf_counter() - stats.started
+        method = scope["method"]
+        # The route template, not the raw path, keeps label cardinality bounded.
+        route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+        request_duration.observe(elapsed, method, route, str(status_code))
+        response_size.observe(size, method, route)
+        request_queries.observe(stats.queries, method, route)
+        request_db_time.observe(stats.db_seconds, method, route)
+        if self.slow_request_seconds is not None and elapsed >= self.slow_request_seconds:
+            logger.warning(
+                "Slow request %s %s -> %s in %.1f ms (%d queries, %.1f ms SQL, %.1f ms bcrypt)\n%s",
+                method, scope["path"], status_code, elapsed * 1000, stats.queries,
+                stats.db_seconds * 1000, stats.bcrypt_seconds * 1000,
+                "\n".join(f"  [{seconds * 1000:.1f} ms] {statement}" for seconds, statement in stats.statements),
+            )
@@ -0,0 +1,147 @@
+import itertools
+from app.core.config import settings
+from app.core.database import on_commit
+from app.models.user import User
+from collections import OrderedDict
+from dataclasses import dataclass
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+
+@dataclass
+class _Entry:
+    data: Dict[str, Any]
+    stamp: int
+    expires_at: float
+
+
+class PrincipalCache:
+    """Bounded LRU of authenticated users with a TTL and invalidation stamps.
+
+    Entries are stored as plain column snapshots so a cached principal is never
+    shared between requests. Stamps come from one increasing clock: a load takes
+    one before reading the user row, and ``invalidate`` records one per user, so
+    a load that was in flight while the user row changed is never stored.
+    Invalidations are remembered for at most ``max_size`` users; forgetting the
+    oldest raises a floor that every stamp must also exceed, which only rejects
+    loads begun before that (long past) invalidation.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[UUID, _Entry]" = OrderedDict()
+        self._invalidated: "OrderedDict[UUID, int]" = OrderedDict()
+        self._floor = 0
+        self._clock = itertools.count(1)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def stamp(self) -> int:
+        """Take before loading a user from the database and pass to ``set``."""
+        return next(self._clock)
+
+    def _valid_after(self, user_id: UUID) -> int:
+        return self._invalidated.get(user_id, self._floor)
+
+    def get(self, user_id: UUID) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.stamp <= self._valid_after(user_id) or entry.expires_at <= monotonic():
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+        user = User(**entry.data)
+        make_transient_to_detached(user)
+        return user
+
+    def set(self, user: User, stamp: int) -> None:
+        """Store ``user`` unless it was invalidated after ``stamp`` was taken."""
+        if self.max_size <= 0:
+            return
+        data = {key: getattr(user, key) for key in User.model_fields}
+        with self._lock:
+            if stamp <= self._valid_after(user.id):
+                return
+            self._entries[user.id] = _Entry(data, stamp, monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: UUID) -> None:
+        with self._lock:
+            self._invalidated[user_id] = next(self._clock)
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > max(self.max_size, 1):
+                _, self._floor = self._invalidated.popitem(last=False)
+            self._entries.pop(user_id, None)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._invalidated.clear()
+            self._floor = next(self._clock)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_user(user_id: UUID) -> None:
+    """Drop a cached principal, e.g. after deactivation, a role change or a new password."""
+    principal_cache.invalidate(user_id)
+
+
+# Any flushed change to a user row (status, role, password, ...) invalidates it
+# immediately and again once the transaction commits, so a concurrent request that
+# re-read the old row between flush and commit cannot keep it cached.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_flush(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("invalidated_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    user_ids = session.info.pop("invalidated_user_ids", ())
+
+    def invalidate() -> None:
+        for user_id in user_ids:
+            invalidate_user(user_id)
+
+    if user_ids:
+        on_commit(session, invalidate)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop("invalidated_user_ids", None)
@@ -0,0 +1,281 @@
+"""
+Routing of read-only requests to database read replicas.
+
+Endpoints that only read take ``deps.get_read_session``, which binds the
+session to a healthy replica chosen round-robin or by fewest open sessions.
+Everything else, and every read by a user who committed a write in the last
+``DB_READ_YOUR_WRITES_SECONDS``, stays on the primary so users always see
+their own changes despite replication lag. Each worker remembers its own
+writers, and responses to a committing request also carry a signed cookie
+(``ReadYourWritesMiddleware``) so that the user's next reads stay on the
+primary whichever worker serves them. A background task checks each
+replica's schema revision (and, on PostgreSQL, its replay lag), evicting it
+while it is unreachable, not migrated or too far behind; a connection error
+during a request evicts it immediately. With no healthy replica, reads fall
+back to the primary.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import itertools
+import logging
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SCHEMA_REVISION, create_engine, on_commit, schema_revision
+from contextvars import ContextVar
+from dataclasses import dataclass
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from time import monotonic, time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+# Set on a primary session by the auth dependencies; see _note_write below.
+PRINCIPAL_KEY = "principal_id"
+# Signed "<user id>:<until>" set after a committed write; honoured by every worker.
+STICKY_COOKIE = "read_primary_until"
+# Principals that committed a write during the current request; see ReadYourWritesMiddleware.
+_request_writers: ContextVar[Optional[List[UUID]]] = ContextVar("request_writers", default=None)
+
+
+@dataclass(eq=False)
+class Replica:
+    name: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker
+    healthy: bool = True
+    in_use: int = 0
+    sessions: int = 0
+    evictions: int = 0
+    lag_seconds: Optional[float] = None
+
+
+class ReplicaRouter:
+    def __init__(
+            self,
+            engines: List[AsyncEngine],
+            selection: str = ROUND_ROBIN,
+            sticky_seconds: float = 5.0,
+            health_check_interval: float = 10.0,
+            max_lag_seconds: float = 30.0,
+    ):
+        if selection not in (ROUND_ROBIN, LEAST_CONNECTIONS):
+            raise ValueError(f"Unknown replica selection strategy: {selection}")
+        self.replicas = [
+            Replica(
+                name=engine.url.render_as_string(hide_password=True),
+                engine=engine,
+                session_factory=async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+            )
+            for engine in engines
+        ]
+        self.selection = selection
+        self.sticky_seconds = sticky_seconds
+        self.health_check_interval = health_check_interval
+        self.max_lag_seconds = max_lag_seconds
+        self.primary_reads = 0
+        self._turn = itertools.count()
+        self._sticky: Dict[UUID, float] = {}
+        self._runner: Optional[asyncio.Task] = None
+
+    def choose(self, principal_id: Optional[UUID] = None, cookie: Optional[str] = None) -> Optional[Replica]:
+        """The replica to read from, or None to read from the primary."""
+        if principal_id is not None and (self.is_sticky(principal_id) or self.cookie_is_sticky(cookie, principal_id)):
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.selection == LEAST_CONNECTIONS:
+            return min(healthy, key=lambda replica: replica.in_use)
+        return healthy[next(self._turn) % len(healthy)]
+
+    def acquire(self, principal_id: Optional[UUID] = None, cookie: Optional[str] = None) -> Optional[Replica]:
+        replica = self.choose(principal_id, cookie)
+        if replica is None:
+            self.primary_reads += 1
+        else:
+            replica.in_use += 1
+            replica.sessions += 1
+        return replica
+
+    def release(self, replica: Replica) -> None:
+        replica.in_use -= 1
+
+    def note_write(self, principal_id: UUID) -> None:
+        """Send ``principal_id``'s reads to the primary until replicas have caught up."""
+        now = monotonic()
+        if len(self._sticky) > 1024:
+            self._sticky = {key: until for key, until in self._sticky.items() if until > now}
+        self._sticky[principal_id] = now + self.sticky_seconds
+        writers = _request_writers.get()
+        if writers is not None:
+            writers.append(principal_id)
+
+    def is_sticky(self, principal_id: UUID) -> bool:
+        until = self._sticky.get(principal_id)
+        return until is not None and until > monotonic()
+
+    def sticky_cookie(self, principal_id: UUID) -> str:
+        """Cookie value keeping ``principal_id`` on the primary, valid in any worker."""
+        payload = f"{principal_id.hex}:{time() + self.sticky_seconds:.3f}"
+        return f"{payload}:{_sign(payload)}"
+
+    def cookie_is_sticky(self, cookie: Optional[str], principal_id: UUID) -> bool:
+        payload, _, signature = (cookie or "").rpartition(":")
+        owner, _, until = payload.partition(":")
+        if owner != principal_id.hex or not hmac.compare_digest(signature, _sign(payload)):
+            return False
+        try:
+            return float(until) > time()
+        except ValueError:
+            return False
+
+    def evict(self, replica: Replica, reason: str) -> None:
+        if replica.healthy:
+            logger.warning("Evicting read replica %s: %s", replica.name, reason)
+            replica.healthy = False
+            replica.evictions += 1
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                revision = await schema_revision(conn)
+                lag = None
+                if conn.dialect.name == "postgresql":
+                    # The last replayed transaction only dates the lag while WAL is
+                    # still arriving; a replica that has replayed everything it
+                    # received is current even when the primary has been idle.
+                    lag = await conn.scalar(text(
+                        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+                        " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                    ))
+        except Exception as exc:
+            self.evict(replica, f"health check failed ({exc.__class__.__name__}: {exc})")
+            return
+        replica.lag_seconds = float(lag) if lag is not None else 0.0
+        if revision != SCHEMA_REVISION:
+            self.evict(replica, f"schema is at {revision or 'no revision'}, expected {SCHEMA_REVISION}")
+        elif replica.lag_seconds > self.max_lag_seconds:
+            self.evict(replica, f"replication lag {replica.lag_seconds:.1f}s")
+        elif not replica.healthy:
+            logger.info("Read replica %s is healthy again", replica.name)
+            replica.healthy = True
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def start(self) -> None:
+        if not self.replicas:
+            return
+        await self.check_all()
+        self._runner = asyncio.create_task(self._run(), name="replica-health")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.check_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "primary_reads": self.primary_reads,
+            "sticky_users": sum(1 for until in self._sticky.values() if until > monotonic()),
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "in_use": replica.in_use,
+                    "sessions": replica.sessions,
+                    "evictions": replica.evictions,
+                    "lag_seconds": replica.lag_seconds,
+                }
+                for replica in self.replicas
+            ],
+        }
+
+
+def _sign(payload: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+class ReadYourWritesMiddleware:
+    """Sets the sticky cookie on responses to requests that committed a user's write.
+
+    Pure ASGI, like MetricsMiddleware: the endpoint runs in this task, so the
+    writers it records are seen here when the response starts.
+    """
+
+    def __init__(self, app, path: str = "/"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writers: List[UUID] = []
+        token = _request_writers.set(writers)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and writers:
+                MutableHeaders(scope=message).append("set-cookie", (
+                    f"{STICKY_COOKIE}={replica_router.sticky_cookie(writers[-1])}; "
+                    f"Max-Age={int(replica_router.sticky_seconds) + 1}; Path={self.path}; HttpOnly; SameSite=Lax"
+                ))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_writers.reset(token)
+
+
+replica_router = ReplicaRouter(
+    [create_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+    selection=settings.DB_REPLICA_SELECTION,
+    sticky_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+    health_check_interval=settings.DB_REPLICA_HEALTH_CHECK_SECONDS,
+    max_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS,
+)
+metrics.register(metrics.Gauge(
+    "db_replicas_healthy", "Read replicas currently accepting reads.",
+    lambda: sum(1 for replica in replica_router.replicas if replica.healthy),
+))
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_writes(session: Session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_bulk_writes(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _note_write(session: Session) -> None:
+    principal_id = session.info.get(PRINCIPAL_KEY)
+    if session.info.pop("wrote", False) and principal_id is not None:
+        on_commit(session, lambda: replica_router.note_write(principal_id))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_writes(session: Session, previous_transaction) -> None:
+    session.info.pop("wrote", None)
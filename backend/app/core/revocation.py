@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from app.core.config import settings
+from app.core.database import on_commit
+from app.models.user import TokenRevocation, User
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, inspect, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+# Changing any of these bumps the user's token_version, revoking outstanding tokens.
+# (The password hash is excluded: login re-hashes it transparently on BCRYPT_ROUNDS
+# changes; endpoints that change a password bump the version explicitly.)
+REVOKING_FIELDS = ("role", "status", "is_active", "workspace_id")
+
+
+class RevocationFilter:
+    """Lowest still-valid token version per recently revoked user.
+
+    A stateless access token outlives a revocation by at most its own lifetime,
+    so only revocations younger than ``retention`` need to be kept; the set stays
+    as small as the number of users revoked in that window. It is refreshed
+    incrementally from ``token_revocations`` (rows newer than the last watermark,
+    with some overlap for late commits and clock skew) by a background task.
+    """
+
+    def __init__(self, retention_seconds: float, refresh_interval: float):
+        self.retention = timedelta(seconds=retention_seconds)
+        self.refresh_interval = refresh_interval
+        self.refreshes = 0
+        self.rejected = 0
+        self._revoked: Dict[UUID, Tuple[int, datetime]] = {}
+        self._watermark: Optional[datetime] = None
+        self._refreshed_at: Optional[float] = None
+        self._lock = Lock()
+        self._session_factory: Optional[async_sessionmaker] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    def is_revoked(self, user_id: UUID, token_version: int) -> bool:
+        entry = self._revoked.get(user_id)
+        if entry is not None and token_version < entry[0]:
+            self.rejected += 1
+            return True
+        return False
+
+    def add(self, user_id: UUID, token_version: int, revoked_at: datetime) -> None:
+        with self._lock:
+            current = self._revoked.get(user_id)
+            if current is None or token_version > current[0]:
+                self._revoked[user_id] = (token_version, revoked_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._revoked.clear()
+            self._watermark = None
+
+    async def refresh(self) -> None:
+        now = datetime.utcnow()
+        horizon = now - self.retention
+        overlap = timedelta(seconds=max(self.refresh_interval * 3, 30))
+        since = max(self._watermark - overlap, horizon) if self._watermark else horizon
+        async with self._session_factory() as session:
+            rows = (await session.execute(
+                select(TokenRevocation.user_id, TokenRevocation.token_version, TokenRevocation.revoked_at)
+                .where(TokenRevocation.revoked_at >= since)
+            )).all()
+            # Rows older than every token they could affect are dead weight.
+            await session.execute(delete(TokenRevocation).where(TokenRevocation.revoked_at < horizon - overlap))
+            await session.commit()
+        for row in rows:
+            self.add(row.user_id, row.token_version, row.revoked_at)
+        with self._lock:
+            for user_id in [key for key, (_, at) in self._revoked.items() if at < horizon]:
+                del self._revoked[user_id]
+        self._watermark = now
+        self._refreshed_at = monotonic()
+        self.refreshes += 1
+
+    async def start(self, session_factory: async_sessionmaker) -> None:
+        """Load current revocations (before serving any request), then keep refreshing."""
+        self._session_factory = session_factory
+        await self.refresh()
+        self._runner = asyncio.create_task(self._run(), name="token-revocation-refresh")
+
+    async def stop(self) -> None:
+        if self._runner is None:
+            return
+        self._runner.cancel()
+        await asyncio.gather(self._runner, return_exceptions=True)
+        self._runner = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Token revocation refresh failed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "revoked_users": len(self._revoked),
+            "refreshes": self.refreshes,
+            "rejected": self.rejected,
+            "seconds_since_refresh": (
+                round(monotonic() - self._refreshed_at, 1) if self._refreshed_at is not None else None
+            ),
+        }
+
+
+revocation_filter = RevocationFilter(
+    retention_seconds=settings.STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    refresh_interval=settings.TOKEN_REVOCATION_REFRESH_SECONDS,
+)
+
+
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if state.attrs.token_version.history.has_changes():
+        return
+    if any(state.attrs[name].history.has_changes() for name in REVOKING_FIELDS):
+        target.token_version = (target.token_version or 0) + 1
+
+
+@event.listens_for(User, "after_update")
+def _record_revocation(mapper, connection, target: User) -> None:
+    if not inspect(target).attrs.token_version.history.has_changes():
+        return
+    revoked_at = datetime.utcnow()
+    connection.execute(TokenRevocation.__table__.insert().values(
+        user_id=target.id, token_version=target.token_version, revoked_at=revoked_at,
+    ))
+    session = Session.object_session(target)
+    if session is not None:
+        pending: Set[Tuple[UUID, int, datetime]] = session.info.setdefault("revoked_tokens", set())
+        pending.add((target.id, target.token_version, revoked_at))
+
+
+# This worker applies its own revocations as soon as they commit; other workers
+# pick them up on their next refresh.
+@event.listens_for(Session, "after_commit")
+def _apply_on_commit(session: Session) -> None:
+    revoked = session.info.pop("revoked_tokens", ())
+
+    def apply() -> None:
+        for user_id, token_version, revoked_at in revoked:
+            revocation_filter.add(user_id, token_version, revoked_at)
+
+    if revoked:
+        on_commit(session, apply)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop("revoked_tokens", None)
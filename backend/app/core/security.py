@@ -1,21 +1,54 @@
+import asyncio
+from app.core import metrics
 from app.core.config import settings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from jose import jwt
 from passlib.context import CryptContext
-from typing import Any, Optional, Union
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar, Union
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Changing BCRYPT_ROUNDS makes existing hashes "need update"; they are
+# transparently re-hashed the next time their owner logs in.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
 ALGORITHM = "HS256"
+INVITE_TOKEN_TYPE = "invite"
+REFRESH_TOKEN_TYPE = "refresh"
+# Stored for invited users who have not chosen a password yet; never matches a login.
+UNUSABLE_PASSWORD = "!"
+
+T = TypeVar("T")
 
 
 def create_access_token(
         subject: Union[str, Any],
         expires_delta: Optional[timedelta] = None,
+        claims: Optional[Dict[str, Any]] = None,
 ) -> str:
+    """``claims`` (role, workspace_id, status, token_version) make the token self-contained."""
     expire = datetime.now(timezone.utc) + (
             expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
+def create_refresh_token(subject: Union[str, Any], token_version: int, token_id: Union[str, Any]) -> str:
+    expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode = {
+        "exp": expire, "sub": str(subject), "type": REFRESH_TOKEN_TYPE, "token_version": token_version,
+        "jti": str(token_id),
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
+def create_invite_token(subject: Union[str, Any]) -> str:
+    expire = datetime.now(timezone.utc) + timedelta(hours=settings.INVITE_TOKEN_EXPIRE_HOURS)
+    to_encode = {"exp": expire, "sub": str(subject), "type": INVITE_TOKEN_TYPE}
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -25,3 +58,87 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password pool's queue is full; mapped to 503 + Retry-After."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing capacity exhausted")
+        self.retry_after = retry_after
+
+
+def _timed(fn: Callable[..., T], *args: Any) -> Tuple[T, float]:
+    started = perf_counter()
+    result = fn(*args)
+    return result, perf_counter() - started
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool so it never blocks the event loop.
+
+    At most ``max_workers`` operations run at once and at most ``max_pending``
+    wait behind them; anything beyond that is shed immediately with
+    ``PasswordHasherBusy`` instead of queueing up latency for every caller.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, retry_after: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hasher",
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self.in_flight >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy(self.retry_after)
+        self.in_flight += 1
+        try:
+            result, seconds = await asyncio.get_running_loop().run_in_executor(self.executor, _timed, fn, *args)
+        finally:
+            self.in_flight -= 1
+        metrics.record_password_hash(fn.__name__, seconds)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
+metrics.register(metrics.Gauge(
+    "password_hash_in_flight", "bcrypt operations running or queued.", lambda: password_hasher.in_flight,
+))
+metrics.register(metrics.Gauge(
+    "password_hash_rejected_total", "bcrypt operations shed with 503.", lambda: password_hasher.rejected, "counter",
+))
+
+
+async def verify_and_update_password(
+        plain_password: str,
+        hashed_password: str,
+) -> Tuple[bool, Optional[str]]:
+    """Verify off the event loop; also returns a new hash if the stored one is outdated."""
+    if hashed_password.startswith(UNUSABLE_PASSWORD):
+        return False, None
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
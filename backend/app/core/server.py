@@ -0,0 +1,68 @@
+"""
+Production server settings shared by ``run.py`` and the gunicorn worker class.
+"""
+
+import os
+import sys
+from app.core.config import settings
+from importlib.util import find_spec
+
+
+def worker_count(configured: int = settings.SERVER_WORKERS) -> int:
+    if configured > 0:
+        return configured
+    try:
+        # CPUs this process may actually run on (container/cgroup affinity)
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def resolve_loop(configured: str = settings.SERVER_LOOP) -> str:
+    if configured != "auto":
+        return configured
+    return "uvloop" if sys.platform != "win32" and find_spec("uvloop") else "asyncio"
+
+
+def resolve_http(configured: str = settings.SERVER_HTTP) -> str:
+    if configured != "auto":
+        return configured
+    return "httptools" if find_spec("httptools") else "h11"
+
+
+def uvicorn_options() -> dict:
+    """Per-worker uvicorn settings that gunicorn has no option for."""
+    return {
+        "loop": resolve_loop(),
+        "http": resolve_http(),
+        "limit_concurrency": settings.SERVER_LIMIT_CONCURRENCY or None,
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    }
+
+
+def gunicorn_options() -> dict:
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": worker_count(),
+        "worker_class": "app.core.server.UvicornWorker",
+        "preload_app": settings.SERVER_PRELOAD_APP,
+        # Jitter staggers restarts so workers are recycled one at a time
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER if settings.SERVER_MAX_REQUESTS else 0,
+        "keepalive": settings.SERVER_KEEPALIVE_SECONDS,
+        "backlog": settings.SERVER_BACKLOG,
+        "timeout": settings.SERVER_WORKER_TIMEOUT_SECONDS,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        "loglevel": settings.SERVER_LOG_LEVEL,
+    }
+
+
+try:
+    from uvicorn.workers import UvicornWorker as _UvicornWorker
+except ImportError:  # gunicorn is not installed (it does not run on Windows)
+    _UvicornWorker = None
+
+if _UvicornWorker is not None:
+    class UvicornWorker(_UvicornWorker):
+        # Keep-alive, backlog and max requests come from gunicorn's own config.
+        CONFIG_KWARGS = uvicorn_options()
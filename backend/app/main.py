@@ -1,8 +1,26 @@
+import logging
+from app import IMPORT_STARTED
 from app.api.v1.api import api_router
+from app.core import metrics, security
 from app.core.config import settings
-from fastapi import FastAPI
+from app.core.events import event_hub
+from app.core.principal_cache import principal_cache
+from app.core.replicas import ReadYourWritesMiddleware, replica_router
+from app.core.revocation import revocation_filter
+from app.services.activity import activity_tracker
+from app.services.dashboard import dashboard_reconciler
+from app.services.outbox import outbox_dispatcher
+from app.services.pdf import pdf_worker
+from app.services.trash import trash_purger
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import RedirectResponse
+from starlette.responses import JSONResponse, PlainTextResponse, RedirectResponse
+from time import perf_counter
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+# Boot phases in milliseconds, filled in by on_startup and reported by /health
+startup_report: Dict[str, float] = {}
 
 
 def create_application() -> FastAPI:
@@ -18,6 +36,19 @@ def create_application() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if settings.DATABASE_REPLICA_URLS:
+        application.add_middleware(ReadYourWritesMiddleware, path=settings.API_V1_STR)
+    if settings.METRICS_ENABLED:
+        # Added last so it is outermost and times everything, including CORS.
+        application.add_middleware(metrics.MetricsMiddleware, slow_request_ms=settings.SLOW_REQUEST_THRESHOLD_MS)
+
+    @application.exception_handler(security.PasswordHasherBusy)
+    async def password_hasher_busy(request: Request, exc: security.PasswordHasherBusy):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Authentication is temporarily overloaded, retry shortly"},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
 
     @application.get("/", include_in_schema=False)
     def root():
@@ -25,16 +56,84 @@ def create_application() -> FastAPI:
 
     @application.get("/health")
     def health_check():
-        return {"status": "ok", "project": settings.PROJECT_NAME}
+        return {
+            "status": "ok",
+            "project": settings.PROJECT_NAME,
+            "principal_cache": principal_cache.stats(),
+            "token_revocations": revocation_filter.stats(),
+            "read_replicas": replica_router.stats(),
+            "user_activity": activity_tracker.stats(),
+            "pdf_queue": pdf_worker.stats(),
+            "outbox": outbox_dispatcher.stats(),
+            "trash_purge": trash_purger.stats(),
+            "dashboard_reconcile": dashboard_reconciler.stats(),
+            "realtime": event_hub.stats(),
+            "startup_ms": startup_report,
+        }
+
+    if settings.METRICS_ENABLED:
+        @application.get("/metrics", include_in_schema=False)
+        def prometheus_metrics():
+            return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
     application.include_router(api_router, prefix=settings.API_V1_STR)
     return application
 
 
 app = create_application()
+_imported = perf_counter()
 
 
 @app.on_event("startup")
 async def on_startup():
-    from app.core.database import init_db
+    from app.core.database import async_session_factory, init_db
+
+    started = perf_counter()
     await init_db()
+    schema_checked = perf_counter()
+    await replica_router.start()
+    if settings.AUTH_STATELESS_TOKENS:
+        await revocation_filter.start(async_session_factory)
+    if settings.ACTIVITY_TRACKING_ENABLED:
+        activity_tracker.start(async_session_factory)
+    if settings.PDF_WORKER_ENABLED:
+        pdf_worker.start(async_session_factory)
+    if settings.OUTBOX_DISPATCHER_ENABLED:
+        outbox_dispatcher.start(async_session_factory)
+    if settings.TRASH_PURGE_ENABLED:
+        trash_purger.start(async_session_factory)
+    if settings.DASHBOARD_RECONCILE_ENABLED:
+        dashboard_reconciler.start(async_session_factory)
+    if settings.REALTIME_ENABLED:
+        await event_hub.start()
+    finished = perf_counter()
+
+    startup_report.update(
+        imports=round((_imported - IMPORT_STARTED) * 1000, 1),
+        schema=round((schema_checked - started) * 1000, 1),
+        workers=round((finished - schema_checked) * 1000, 1),
+        total=round((_imported - IMPORT_STARTED + finished - started) * 1000, 1),
+    )
+    over_budget = startup_report["total"] > settings.STARTUP_TIME_BUDGET_MS
+    logger.log(
+        logging.WARNING if over_budget else logging.INFO,
+        "Startup took %(total).0f ms (imports %(imports).0f ms, schema %(schema).0f ms, workers %(workers).0f ms)"
+        + (f" - over the {settings.STARTUP_TIME_BUDGET_MS} ms budget" if over_budget else ""),
+        startup_report,
+    )
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    from app.core.database import engine
+
+    await revocation_filter.stop()
+    await replica_router.stop()
+    await activity_tracker.stop()
+    await outbox_dispatcher.stop()
+    await pdf_worker.stop()
+    await trash_purger.stop()
+    await dashboard_reconciler.stop()
+    await event_hub.stop()
+    security.password_hasher.shutdown()
+    await engine.dispose()
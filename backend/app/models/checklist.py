@@ -0,0 +1,75 @@
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+from enum import Enum
+from sqlmodel import SQLModel, Field
+from sqlalchemy import JSON, Column, Index
+import uuid
+
+class ChecklistStatus(str, Enum):
+    ACTIVE = "ACTIVE"
+    COMPLETED = "COMPLETED"
+    RESOLVED = "RESOLVED"
+
+class SOPAssignment(SQLModel, table=True):
+    __tablename__ = "sop_assignments"
+    sop_id: uuid.UUID = Field(foreign_key="sops.id", primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id", primary_key=True, index=True)
+    assigned_at: datetime = Field(default_factory=datetime.utcnow)
+    assigned_by: Optional[uuid.UUID] = Field(default=None, foreign_key="users.id")
+
+class SOPSnapshot(SQLModel, table=True):
+    """The steps of one SOP version, stored once and shared by every checklist created from it."""
+    __tablename__ = "sop_snapshots"
+    __table_args__ = (
+        Index("ix_sop_snapshots_sop_hash", "sop_id", "content_hash", unique=True),
+    )
+    id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Cleared (not cascaded) when the SOP is purged, so finished checklists keep their steps
+    sop_id: Optional[uuid.UUID] = Field(default=None, foreign_key="sops.id")
+    sop_version: int
+    content_hash: str
+    steps: List[Dict[str, Any]] = Field(default=[], sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Checklist(SQLModel, table=True):
+    """A user's instance of an SOP; the steps live in the shared ``snapshot_id`` row."""
+    __tablename__ = "checklists"
+    __table_args__ = (
+        # One checklist per user per SOP version: re-running an assignment is a no-op
+        Index("ix_checklists_snapshot_user", "snapshot_id", "user_id", unique=True),
+        Index("ix_checklists_user_status", "user_id", "status"),
+    )
+    id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    name: str
+    sop_id: Optional[uuid.UUID] = Field(default=None, foreign_key="sops.id", index=True)
+    sop_version: Optional[int] = None
+    snapshot_id: uuid.UUID = Field(foreign_key="sop_snapshots.id")
+    user_id: uuid.UUID = Field(foreign_key="users.id")
+    workspace_id: Optional[uuid.UUID] = Field(default=None, foreign_key="workspaces.id")
+    status: ChecklistStatus = Field(default=ChecklistStatus.ACTIVE)
+    # progress (percent) is kept in step with completed_count / item_count by every
+    # item change; version is bumped with it for optimistic concurrency.
+    progress: int = 0
+    item_count: int = 0
+    completed_count: int = 0
+    version: int = 1
+    due_date: Optional[datetime] = None
+    notes: Optional[str] = None
+    final_notes: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_by: Optional[uuid.UUID] = Field(default=None, foreign_key="users.id")
+    resolved_at: Optional[datetime] = None
+    resolved_by: Optional[uuid.UUID] = Field(default=None, foreign_key="users.id")
+
+class ChecklistItem(SQLModel, table=True):
+    """State of one snapshot step in a checklist; created the first time the step is toggled."""
+    __tablename__ = "checklist_items"
+    __table_args__ = (
+        Index("ix_checklist_items_checklist_step", "checklist_id", "step_id", unique=True),
+    )
+    id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    checklist_id: uuid.UUID = Field(foreign_key="checklists.id")
+    step_id: str
+    is_completed: bool = False
+    completed_at: Optional[datetime] = None
+    completed_by: Optional[uuid.UUID] = Field(default=None, foreign_key="users.id")
@@ -0,0 +1,15 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+import uuid
+
+class WorkspaceCounter(SQLModel, table=True):
+    """One dashboard counter, e.g. (workspace, "sop_status", "PUBLISHED") -> 42.
+
+    Kept current by app.services.dashboard in the transaction of every change.
+    """
+    __tablename__ = "workspace_counters"
+    workspace_id: uuid.UUID = Field(foreign_key="workspaces.id", primary_key=True)
+    dimension: str = Field(primary_key=True)
+    key: str = Field(primary_key=True)
+    count: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -2,6 +2,8 @@
 from typing import Optional
 from datetime import datetime
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Index, String
+from sqlmodel.sql.sqltypes import AutoString
 import uuid
 
 class FolderBase(SQLModel):
@@ -14,6 +16,22 @@ class FolderBase(SQLModel):
 
 class Folder(FolderBase, table=True):
     __tablename__ = "folders"
+    __table_args__ = (
+        # Materialized path ("/<root hex>/.../<own hex>/"): a subtree is one index range scan
+        Index("ix_folders_workspace_path", "workspace_id", "path"),
+    )
     id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Byte-order comparison keeps the range scan exact; locale collations (PostgreSQL's
+    # default) ignore the "/" separators. SQLite compares bytes already.
+    path: str = Field(
+        default="",
+        sa_column=Column(AutoString().with_variant(String(collation="C"), "postgresql"), nullable=False),
+    )
+    depth: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SOPFolder(SQLModel, table=True):
+    __tablename__ = "sop_folders"
+    sop_id: uuid.UUID = Field(foreign_key="sops.id", primary_key=True)
+    folder_id: uuid.UUID = Field(foreign_key="folders.id", primary_key=True, index=True)
@@ -0,0 +1,31 @@
+from typing import Optional, Dict, Any
+from datetime import datetime
+from enum import Enum
+from sqlmodel import SQLModel, Field
+from sqlalchemy import JSON, Column, Index
+
+class OutboxStatus(str, Enum):
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    DEAD = "DEAD"
+
+class OutboxEvent(SQLModel, table=True):
+    """A domain event waiting for its handlers; deleted once they have all succeeded."""
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Oldest unfinished event per aggregate, which alone may be dispatched
+        Index("ix_outbox_events_aggregate", "aggregate_type", "aggregate_id", "id"),
+        Index("ix_outbox_events_status_available", "status", "available_at"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    event_type: str
+    aggregate_type: str
+    aggregate_id: str
+    payload: Dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+    status: OutboxStatus = Field(default=OutboxStatus.PENDING)
+    attempts: int = 0
+    available_at: datetime = Field(default_factory=datetime.utcnow)
+    claimed_at: Optional[datetime] = None
+    claimed_by: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,25 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+from sqlalchemy import BigInteger, Column, Index, LargeBinary
+import uuid
+
+class SOPSignature(SQLModel, table=True):
+    """MinHash signature of an SOP's step text (little-endian uint32 per permutation)."""
+    __tablename__ = "sop_signatures"
+    sop_id: uuid.UUID = Field(foreign_key="sops.id", primary_key=True)
+    workspace_id: Optional[uuid.UUID] = Field(default=None, foreign_key="workspaces.id")
+    signature: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    shingle_count: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SOPSimilarityBucket(SQLModel, table=True):
+    """LSH band bucket: SOPs of a workspace sharing (band, bucket) are similarity candidates."""
+    __tablename__ = "sop_lsh_buckets"
+    __table_args__ = (
+        Index("ix_sop_lsh_buckets_sop", "sop_id"),
+    )
+    workspace_id: uuid.UUID = Field(foreign_key="workspaces.id", primary_key=True)
+    band: int = Field(primary_key=True)
+    bucket: int = Field(sa_column=Column(BigInteger, primary_key=True))
+    sop_id: uuid.UUID = Field(foreign_key="sops.id", primary_key=True)
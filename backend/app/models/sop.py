@@ -3,7 +3,7 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
 from sqlmodel import SQLModel, Field
-from sqlalchemy import JSON, Column
+from sqlalchemy import JSON, Column, Index, text
 import uuid
 
 class SOPStatus(str, Enum):
@@ -20,6 +20,12 @@ class DifficultyLevel(str, Enum):
     INTERMEDIATE = "INTERMEDIATE"
     ADVANCED = "ADVANCED"
 
+class PDFGenerationStatus(str, Enum):
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
 class SOPBase(SQLModel):
     title: str = Field(index=True)
     short_description: Optional[str] = None
@@ -39,6 +45,22 @@ class SOPBase(SQLModel):
 
 class SOP(SOPBase, table=True):
     __tablename__ = "sops"
+    __table_args__ = (
+        # Keyset listing: (workspace, [status,] updated_at DESC, id DESC). The INCLUDE
+        # columns let Postgres answer list pages from the index alone.
+        Index(
+            "ix_sops_workspace_status_updated",
+            "workspace_id", "status", "updated_at", "id",
+            postgresql_include=["title", "step_count", "version", "difficulty"],
+        ),
+        Index("ix_sops_workspace_updated", "workspace_id", "updated_at", "id"),
+        # Trash purge scan; only trashed rows have a purge date, so the index stays small.
+        Index(
+            "ix_sops_permanent_delete_at", "permanent_delete_at",
+            postgresql_where=text("permanent_delete_at IS NOT NULL"),
+            sqlite_where=text("permanent_delete_at IS NOT NULL"),
+        ),
+    )
     id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -52,5 +74,55 @@ class SOP(SOPBase, table=True):
     delete_reason: Optional[str] = None
     permanent_delete_at: Optional[datetime] = None
     
-    pdf_status: Optional[str] = None
+    pdf_status: Optional[PDFGenerationStatus] = None
     pdf_url: Optional[str] = None
+    pdf_content_hash: Optional[str] = None
+
+class SOPVersion(SQLModel, table=True):
+    """One entry of an SOP's history.
+
+    Every ``SOP_VERSION_SNAPSHOT_INTERVAL``-th version (and the first) stores the
+    full ``content``; the others store only ``delta``, a JSON Patch from the
+    previous version. Any version is rebuilt from the nearest snapshot below it.
+    """
+    __tablename__ = "sop_versions"
+    __table_args__ = (
+        Index("ix_sop_versions_sop_version", "sop_id", "version_number", unique=True),
+    )
+    id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    sop_id: uuid.UUID = Field(foreign_key="sops.id")
+    version_number: int
+    note: Optional[str] = None
+    is_snapshot: bool = False
+    content: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    delta: Optional[List[Dict[str, Any]]] = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_by: Optional[uuid.UUID] = Field(default=None, foreign_key="users.id")
+
+class PDFJob(SQLModel, table=True):
+    """Durable PDF render queue entry; rows survive restarts and are claimed by the worker."""
+    __tablename__ = "pdf_jobs"
+    __table_args__ = (
+        Index("ix_pdf_jobs_status_created", "status", "created_at"),
+    )
+    id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    sop_id: uuid.UUID = Field(foreign_key="sops.id", index=True)
+    content_hash: str
+    status: PDFGenerationStatus = Field(default=PDFGenerationStatus.PENDING)
+    attempts: int = 0
+    error: Optional[str] = None
+    render_ms: Optional[float] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class Comment(SQLModel, table=True):
+    __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_sop_created", "sop_id", "created_at", "id"),
+    )
+    id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    sop_id: uuid.UUID = Field(foreign_key="sops.id")
+    user_id: uuid.UUID = Field(foreign_key="users.id")
+    text: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
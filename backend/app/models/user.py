@@ -2,6 +2,7 @@
 from typing import Optional
 from datetime import datetime
 from enum import Enum
+from sqlalchemy import CheckConstraint
 from sqlmodel import SQLModel, Field, Relationship
 import uuid
 from .workspace import Workspace
@@ -18,6 +19,10 @@ class UserStatus(str, Enum):
     DEACTIVATED = "DEACTIVATED"
     SUSPENDED = "SUSPENDED"
 
+def normalize_email(email: str) -> str:
+    """The stored form of an address: lookups and writes must all go through this."""
+    return email.strip().lower()
+
 class UserBase(SQLModel):
     email: str = Field(unique=True, index=True)
     first_name: str
@@ -35,12 +40,37 @@ class UserBase(SQLModel):
 
 class User(UserBase, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        # Emails are stored normalized, so the unique index also rejects case variants
+        CheckConstraint("email = lower(trim(email))", name="ck_users_email_normalized"),
+    )
     id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
     last_active_at: Optional[datetime] = None
     login_count: int = Field(default=0)
+    # Embedded in stateless access/refresh tokens; bumping it revokes all older tokens
+    token_version: int = Field(default=0)
 
     # Relationships (Optional for now, but good to have placeholders)
     # workspace: Optional[Workspace] = Relationship()
+
+class TokenRevocation(SQLModel, table=True):
+    """Tokens of ``user_id`` older than ``token_version`` are revoked (feeds app.core.revocation)."""
+    __tablename__ = "token_revocations"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: uuid.UUID = Field(index=True)
+    token_version: int
+    revoked_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class RefreshToken(SQLModel, table=True):
+    """An issued refresh token (its ``jti``). Exchanging it sets ``used_at``; presenting it again revokes the user's tokens."""
+    __tablename__ = "refresh_tokens"
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(index=True)
+    expires_at: datetime
+    used_at: Optional[datetime] = None
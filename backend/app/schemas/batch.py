@@ -0,0 +1,33 @@
+from typing import Optional, List, Dict, Any, Literal
+from pydantic import BaseModel, Field, field_validator
+
+class BatchOperation(BaseModel):
+    """One API call. ``path`` is relative to /api/v1 and may include a query string."""
+    id: Optional[str] = Field(default=None, max_length=100)  # echoed back; defaults to the index
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(..., min_length=1, max_length=2_000)
+    body: Optional[Any] = None
+
+    @field_validator("path")
+    @classmethod
+    def api_path(cls, value: str) -> str:
+        if not value.startswith("/") or value.startswith("//"):
+            raise ValueError("path must start with a single '/'")
+        if value.split("?", 1)[0].rstrip("/") == "/batch":
+            raise ValueError("batch requests cannot be nested")
+        return value
+
+class BatchRequest(BaseModel):
+    requests: List[BatchOperation] = Field(..., min_length=1, max_length=50)
+    # All-or-nothing: run in order in one database transaction, committed only if every call succeeds
+    transaction: bool = False
+
+class BatchResult(BaseModel):
+    id: str
+    status: int
+    headers: Dict[str, str] = Field(default_factory=dict)
+    body: Any = None  # JSON when the response is JSON, else text (base64 for binary content)
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+    committed: Optional[bool] = None  # transactional batches only
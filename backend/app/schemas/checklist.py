@@ -0,0 +1,77 @@
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+from pydantic import BaseModel, Field, model_validator
+import uuid
+from app.models.checklist import ChecklistStatus
+from app.models.user import UserRole
+
+class SOPAssignmentRequest(BaseModel):
+    """Users matching any of the selectors are assigned; at least one is required."""
+    user_ids: List[uuid.UUID] = Field(default_factory=list, max_length=10_000)
+    roles: List[UserRole] = Field(default_factory=list)
+    departments: List[str] = Field(default_factory=list, max_length=1_000)
+    manager_ids: List[uuid.UUID] = Field(default_factory=list, max_length=1_000)
+    due_date: Optional[datetime] = None
+    notes: Optional[str] = None
+
+    @model_validator(mode="after")
+    def require_selector(self):
+        if not (self.user_ids or self.roles or self.departments or self.manager_ids):
+            raise ValueError("Select users by user_ids, roles, departments or manager_ids")
+        return self
+
+class SOPAssignmentReport(BaseModel):
+    sop_id: uuid.UUID
+    sop_version: int
+    snapshot_id: uuid.UUID
+    matched: int = 0
+    assigned: int = 0  # new assignments; the rest were already assigned
+    checklists_created: int = 0
+
+class ChecklistItemRead(BaseModel):
+    step_id: str
+    completed_at: Optional[datetime] = None
+    completed_by: Optional[uuid.UUID] = None
+
+class ChecklistRead(BaseModel):
+    id: uuid.UUID
+    name: str
+    sop_id: Optional[uuid.UUID] = None
+    sop_version: Optional[int] = None
+    user_id: uuid.UUID
+    workspace_id: Optional[uuid.UUID] = None
+    status: ChecklistStatus
+    progress: int
+    item_count: int
+    completed_count: int
+    version: int
+    due_date: Optional[datetime] = None
+    notes: Optional[str] = None
+    final_notes: Optional[str] = None
+    created_at: datetime
+    created_by: Optional[uuid.UUID] = None
+    resolved_at: Optional[datetime] = None
+    resolved_by: Optional[uuid.UUID] = None
+    steps: List[Dict[str, Any]]
+    completed_items: List[ChecklistItemRead]
+
+class ChecklistItemChange(BaseModel):
+    step_id: str
+    completed: bool
+
+class ChecklistItemsUpdate(BaseModel):
+    """Applied all-or-nothing, and only if the checklist is still at ``version``."""
+    version: int
+    items: List[ChecklistItemChange] = Field(..., min_length=1, max_length=1_000)
+
+class ChecklistProgress(BaseModel):
+    id: uuid.UUID
+    status: ChecklistStatus
+    progress: int
+    item_count: int
+    completed_count: int
+    version: int
+    changed: int = 0  # items whose state actually changed
+
+    class Config:
+        from_attributes = True
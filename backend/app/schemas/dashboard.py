@@ -0,0 +1,11 @@
+from typing import Dict
+from pydantic import BaseModel
+import uuid
+
+class DashboardCounters(BaseModel):
+    """Precomputed workspace counters; trashed SOPs only appear under status DELETED."""
+    workspace_id: uuid.UUID
+    sops_by_status: Dict[str, int]
+    sops_by_difficulty: Dict[str, int]
+    sops_by_folder: Dict[uuid.UUID, int]
+    users_by_status: Dict[str, int]
@@ -0,0 +1,34 @@
+
+from typing import Optional, List
+from datetime import datetime
+from pydantic import BaseModel
+import uuid
+
+class FolderBase(BaseModel):
+    name: str
+    description: Optional[str] = None
+    color: Optional[str] = "#808080"
+    is_open: bool = False
+
+class FolderCreate(FolderBase):
+    parent_id: Optional[uuid.UUID] = None
+
+class FolderMove(BaseModel):
+    parent_id: Optional[uuid.UUID] = None
+
+class FolderRead(FolderBase):
+    id: uuid.UUID
+    parent_id: Optional[uuid.UUID]
+    workspace_id: Optional[uuid.UUID]
+    path: str
+    depth: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class FolderTreeNode(FolderRead):
+    sop_count: int = 0
+    total_sop_count: int = 0
+    children: List["FolderTreeNode"] = []
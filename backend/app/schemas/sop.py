@@ -0,0 +1,140 @@
+
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+from pydantic import BaseModel, Field
+import uuid
+from app.models.sop import SOPStatus, DifficultyLevel, PDFGenerationStatus
+
+class SOPBase(BaseModel):
+    title: str
+    short_description: Optional[str] = None
+    difficulty: DifficultyLevel = DifficultyLevel.BEGINNER
+    estimated_time: Optional[int] = None
+    cover_image_url: Optional[str] = None
+
+class SOPCreate(SOPBase):
+    content: Dict[str, Any] = Field(default_factory=lambda: {"steps": []})
+
+class SOPUpdate(BaseModel):
+    version_note: Optional[str] = None
+    title: Optional[str] = None
+    short_description: Optional[str] = None
+    content: Optional[Dict[str, Any]] = None
+    status: Optional[SOPStatus] = None
+    difficulty: Optional[DifficultyLevel] = None
+    estimated_time: Optional[int] = None
+    cover_image_url: Optional[str] = None
+    rejection_reason: Optional[str] = None
+
+class SOPRead(SOPBase):
+    id: uuid.UUID
+    content: Dict[str, Any]
+    step_count: int
+    status: SOPStatus
+    version: int
+    workspace_id: Optional[uuid.UUID]
+    created_by: Optional[uuid.UUID]
+    rejection_reason: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    submitted_at: Optional[datetime] = None
+    approved_at: Optional[datetime] = None
+    published_at: Optional[datetime] = None
+    deleted_at: Optional[datetime] = None
+    permanent_delete_at: Optional[datetime] = None
+    pdf_status: Optional[PDFGenerationStatus] = None
+    pdf_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class SimilarSOP(BaseModel):
+    id: uuid.UUID
+    title: str
+    status: SOPStatus
+    similarity: float  # estimated Jaccard similarity of the step text, 0..1
+
+class SOPCreated(SOPRead):
+    """The new SOP, plus existing SOPs of the workspace it nearly duplicates."""
+    similar_sops: List[SimilarSOP] = []
+
+class SOPSummary(BaseModel):
+    """List representation: everything except the heavy ``content`` body."""
+    id: uuid.UUID
+    title: str
+    short_description: Optional[str] = None
+    status: SOPStatus
+    difficulty: DifficultyLevel
+    step_count: int
+    version: int
+    estimated_time: Optional[int] = None
+    cover_image_url: Optional[str] = None
+    workspace_id: Optional[uuid.UUID]
+    created_by: Optional[uuid.UUID]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class SOPPage(BaseModel):
+    items: List[SOPSummary]
+    next_cursor: Optional[str] = None
+
+class SOPSearchHit(BaseModel):
+    id: uuid.UUID
+    title: str
+    short_description: Optional[str] = None
+    status: SOPStatus
+    title_highlight: str
+    snippet: str
+    rank: float
+
+class SOPSearchResults(BaseModel):
+    query: str
+    results: List[SOPSearchHit]
+
+class SOPVersionRead(BaseModel):
+    id: uuid.UUID
+    sop_id: uuid.UUID
+    version_number: int
+    note: Optional[str] = None
+    is_snapshot: bool
+    created_at: datetime
+    created_by: Optional[uuid.UUID] = None
+
+    class Config:
+        from_attributes = True
+
+class SOPVersionContent(BaseModel):
+    sop_id: uuid.UUID
+    version_number: int
+    content: Dict[str, Any]
+
+class SOPVersionDiff(BaseModel):
+    sop_id: uuid.UUID
+    from_version: int
+    to_version: int
+    operations: List[Dict[str, Any]]
+
+class SOPPDFStatus(BaseModel):
+    sop_id: uuid.UUID
+    pdf_status: Optional[PDFGenerationStatus] = None
+    pdf_url: Optional[str] = None
+
+class CommentCreate(BaseModel):
+    text: str = Field(..., min_length=1, max_length=10_000)
+
+class CommentRead(BaseModel):
+    id: uuid.UUID
+    sop_id: uuid.UUID
+    user_id: uuid.UUID
+    text: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CommentPage(BaseModel):
+    items: List[CommentRead]
+    next_cursor: Optional[str] = None
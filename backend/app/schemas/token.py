@@ -1,11 +1,43 @@
+from app.models.user import UserRole, UserStatus
 from pydantic import BaseModel
 from typing import Optional
+from uuid import UUID
 
 
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
 
 
 class TokenPayload(BaseModel):
     sub: Optional[str] = None
+    type: Optional[str] = None
+    exp: Optional[int] = None  # seconds since the epoch
+    jti: Optional[UUID] = None  # refresh tokens: the refresh_tokens row
+    # Present only in stateless tokens (AUTH_STATELESS_TOKENS)
+    role: Optional[UserRole] = None
+    workspace_id: Optional[UUID] = None
+    status: Optional[UserStatus] = None
+    token_version: Optional[int] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
+class InviteAccept(BaseModel):
+    token: str
+    password: str
+
+
+class Principal(BaseModel):
+    """Who is calling: everything most endpoints need, without the full user row."""
+    id: UUID
+    workspace_id: Optional[UUID] = None
+    role: UserRole
+    status: UserStatus
+    is_active: bool = True
+
+    class Config:
+        from_attributes = True
@@ -1,8 +1,9 @@
 
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+from typing import Optional, List
+from pydantic import BaseModel, EmailStr, field_validator
 import uuid
-from app.models.user import UserRole, UserStatus
+from app.models.user import UserRole, UserStatus, normalize_email
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -13,10 +14,33 @@ class UserBase(BaseModel):
     is_active: bool = True
     job_title: Optional[str] = None
 
+    @field_validator("email")
+    @classmethod
+    def normalized_email(cls, value: str) -> str:
+        return normalize_email(value)
+
 class UserCreate(UserBase):
     password: str
     workspace_id: Optional[uuid.UUID] = None
 
+class UserImportRow(UserBase):
+    """One CSV/NDJSON row; users without a password are invited instead."""
+    password: Optional[str] = None
+    department: Optional[str] = None
+
+class UserImportResult(BaseModel):
+    row: int
+    email: Optional[str] = None
+    status: str  # created | invited | exists | duplicate | invalid
+    detail: Optional[str] = None
+    invite_token: Optional[str] = None
+
+class UserImportReport(BaseModel):
+    created: int = 0
+    invited: int = 0
+    failed: int = 0
+    results: List[UserImportResult] = []
+
 class UserUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -30,3 +54,12 @@ class UserRead(UserBase):
 
     class Config:
         from_attributes = True
+
+class UserActivityRead(UserRead):
+    """Admin view of a user, including activity the tracker has not written yet."""
+    last_active_at: Optional[datetime] = None
+    login_count: int = 0
+
+class UserPage(BaseModel):
+    items: List[UserActivityRead]
+    next_cursor: Optional[str] = None
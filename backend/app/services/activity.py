@@ -0,0 +1,171 @@
+"""
+Write-behind tracking of ``User.last_active_at`` and ``User.login_count``.
+
+Authenticated requests and logins only update an in-memory map keyed by
+user id; a background task writes it out as one batched UPDATE every
+``ACTIVITY_FLUSH_INTERVAL_SECONDS`` (or as soon as
+``ACTIVITY_FLUSH_MAX_PENDING`` users are pending), and once more on shutdown.
+Each worker process flushes its own share: login counts are added, and the
+last-active timestamp only ever moves forward.
+"""
+
+import asyncio
+import logging
+from app.core import metrics
+from app.core.config import settings
+from app.models.user import User
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import bindparam, case, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+_users = User.__table__
+# Executed once per batch with one parameter set per user (executemany).
+# updated_at is pinned so activity does not count as a profile change (ETags).
+_FLUSH_STATEMENT = (
+    update(_users)
+    .where(_users.c.id == bindparam("user_id"))
+    .values(
+        last_active_at=case(
+            (_users.c.last_active_at.is_(None), bindparam("last_active_at")),
+            (_users.c.last_active_at < bindparam("last_active_at"), bindparam("last_active_at")),
+            else_=_users.c.last_active_at,
+        ),
+        login_count=_users.c.login_count + bindparam("logins"),
+        updated_at=_users.c.updated_at,
+    )
+)
+
+
+@dataclass
+class Activity:
+    last_active_at: datetime
+    logins: int = 0
+
+
+class ActivityTracker:
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, 1)
+        self.flushes = 0
+        self.flushed_users = 0
+        self.failed_flushes = 0
+        self._pending: Dict[UUID, Activity] = {}
+        # The batch being written, still visible to pending() until it commits
+        self._flushing: Dict[UUID, Activity] = {}
+        self._session_factory: Optional[async_sessionmaker] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    def touch(self, user_id: UUID, at: Optional[datetime] = None) -> None:
+        """Record that ``user_id`` made a request; no I/O."""
+        at = at or datetime.utcnow()
+        activity = self._pending.get(user_id)
+        if activity is None:
+            self._pending[user_id] = Activity(at)
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+        elif at > activity.last_active_at:
+            activity.last_active_at = at
+
+    def record_login(self, user_id: UUID, at: Optional[datetime] = None) -> None:
+        self.touch(user_id, at)
+        self._pending[user_id].logins += 1
+
+    def pending(self, user_id: UUID) -> Optional[Activity]:
+        """Activity not yet written to the database, to overlay on rows read from it."""
+        current, flushing = self._pending.get(user_id), self._flushing.get(user_id)
+        if current is None or flushing is None:
+            return current or flushing
+        return Activity(max(current.last_active_at, flushing.last_active_at), current.logins + flushing.logins)
+
+    async def flush(self) -> int:
+        """Write every pending update in one statement; returns the number of users."""
+        async with self._flush_lock:
+            if not self._pending or self._session_factory is None:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            params = [
+                {"user_id": user_id, "last_active_at": activity.last_active_at, "logins": activity.logins}
+                for user_id, activity in batch.items()
+            ]
+            try:
+                async with self._session_factory() as session:
+                    await session.execute(_FLUSH_STATEMENT, params)
+                    await session.commit()
+                    # Before any further await, so readers never count a batch twice
+                    self._flushing = {}
+            except Exception:
+                self._flushing = {}
+                self.failed_flushes += 1
+                self._restore(batch)
+                raise
+            self.flushes += 1
+            self.flushed_users += len(batch)
+            return len(batch)
+
+    def _restore(self, batch: Dict[UUID, Activity]) -> None:
+        # Merge a failed batch back so the next flush retries it.
+        for user_id, activity in batch.items():
+            current = self._pending.get(user_id)
+            if current is None:
+                self._pending[user_id] = activity
+            else:
+                current.last_active_at = max(current.last_active_at, activity.last_active_at)
+                current.logins += activity.logins
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._runner = asyncio.create_task(self._run(), name="activity-flush")
+
+    async def stop(self) -> None:
+        """Cancel the timer and write out whatever is still pending."""
+        if self._runner is None:
+            return
+        self._runner.cancel()
+        await asyncio.gather(self._runner, return_exceptions=True)
+        self._runner = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final activity flush failed; %d users' activity lost", len(self._pending))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Activity flush failed; will retry")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_users": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_users": self.flushed_users,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+activity_tracker = ActivityTracker(
+    flush_interval=settings.ACTIVITY_FLUSH_INTERVAL_SECONDS,
+    max_pending=settings.ACTIVITY_FLUSH_MAX_PENDING,
+)
+metrics.register(metrics.Gauge(
+    "user_activity_pending", "Users with activity not yet written.", lambda: len(activity_tracker._pending),
+))
+metrics.register(metrics.Gauge(
+    "user_activity_flushed_total", "User activity rows written by this process.",
+    lambda: activity_tracker.flushed_users, "counter",
+))
@@ -0,0 +1,131 @@
+"""
+Bulk assignment of an SOP to many users.
+
+Targets are resolved in one query (explicit ids, roles, departments or
+direct reports of managers, OR-ed together within the workspace). The
+assignment rows and one checklist per user are then written with
+multi-row ``INSERT ... ON CONFLICT DO NOTHING`` statements of at most
+``ASSIGNMENT_INSERT_BATCH_SIZE`` rows, so re-running an assignment only
+adds the users who are new. Checklists point at a single ``SOPSnapshot``
+of the SOP's steps instead of each carrying its own copy.
+"""
+
+import hashlib
+import json
+import uuid
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.models.checklist import Checklist, ChecklistStatus, SOPAssignment, SOPSnapshot
+from app.models.sop import SOP
+from app.models.user import User, UserStatus
+from app.schemas.checklist import SOPAssignmentReport, SOPAssignmentRequest
+from app.services.checklists import step_ids
+from datetime import datetime
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+
+
+def _insert_ignoring_conflicts(session: AsyncSession, model, rows: List[Dict[str, Any]]):
+    return dialect_insert(session, model).values(rows).on_conflict_do_nothing()
+
+
+def steps_hash(steps: List[Dict[str, Any]]) -> str:
+    return hashlib.sha256(json.dumps(steps, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def sop_steps(sop: SOP) -> List[Dict[str, Any]]:
+    return (sop.content or {}).get("steps") or []
+
+
+async def get_snapshot_id(session: AsyncSession, sop: SOP) -> uuid.UUID:
+    """The snapshot of ``sop``'s current steps, stored on first use."""
+    steps = sop_steps(sop)
+    digest = steps_hash(steps)
+    await session.execute(_insert_ignoring_conflicts(session, SOPSnapshot, [{
+        "id": uuid.uuid4(),
+        "sop_id": sop.id,
+        "sop_version": sop.version,
+        "content_hash": digest,
+        "steps": steps,
+        "created_at": datetime.utcnow(),
+    }]))
+    return (await session.execute(
+        select(SOPSnapshot.id).where(SOPSnapshot.sop_id == sop.id, SOPSnapshot.content_hash == digest)
+    )).scalar_one()
+
+
+async def resolve_targets(
+        session: AsyncSession,
+        workspace_id: Optional[uuid.UUID],
+        request: SOPAssignmentRequest,
+) -> List[uuid.UUID]:
+    """Ids of the active workspace users matched by any selector of ``request``."""
+    selectors = []
+    if request.user_ids:
+        selectors.append(User.id.in_(request.user_ids))
+    if request.roles:
+        selectors.append(User.role.in_(request.roles))
+    if request.departments:
+        selectors.append(User.department.in_(request.departments))
+    if request.manager_ids:
+        selectors.append(User.manager_id.in_(request.manager_ids))
+    return list((await session.execute(
+        select(User.id)
+        .where(
+            User.workspace_id == workspace_id,
+            User.is_active.is_(True),
+            User.status.not_in((UserStatus.DEACTIVATED, UserStatus.SUSPENDED)),
+            or_(*selectors),
+        )
+        .order_by(User.id)
+    )).scalars())
+
+
+async def assign_sop(
+        session: AsyncSession,
+        sop: SOP,
+        request: SOPAssignmentRequest,
+        assigned_by: uuid.UUID,
+) -> SOPAssignmentReport:
+    """Assign ``sop`` to every matched user and open their checklists, in one transaction."""
+    user_ids = await resolve_targets(session, sop.workspace_id, request)
+    snapshot_id = await get_snapshot_id(session, sop)
+    item_count = len(set(step_ids(sop_steps(sop))))
+    now = datetime.utcnow()
+    report = SOPAssignmentReport(
+        sop_id=sop.id, sop_version=sop.version, snapshot_id=snapshot_id, matched=len(user_ids),
+    )
+
+    batch_size = max(settings.ASSIGNMENT_INSERT_BATCH_SIZE, 1)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        result = await session.execute(_insert_ignoring_conflicts(session, SOPAssignment, [
+            {"sop_id": sop.id, "user_id": user_id, "assigned_at": now, "assigned_by": assigned_by}
+            for user_id in batch
+        ]))
+        report.assigned += max(result.rowcount, 0)
+        result = await session.execute(_insert_ignoring_conflicts(session, Checklist, [
+            {
+                "id": uuid.uuid4(),
+                "name": sop.title,
+                "sop_id": sop.id,
+                "sop_version": sop.version,
+                "snapshot_id": snapshot_id,
+                "user_id": user_id,
+                "workspace_id": sop.workspace_id,
+                "status": ChecklistStatus.ACTIVE,
+                "progress": 0,
+                "item_count": item_count,
+                "completed_count": 0,
+                "version": 1,
+                "due_date": request.due_date,
+                "notes": request.notes,
+                "created_at": now,
+                "created_by": assigned_by,
+            }
+            for user_id in batch
+        ]))
+        report.checklists_created += max(result.rowcount, 0)
+    await session.commit()
+    return report
@@ -0,0 +1,151 @@
+"""
+Checklist reads and batched item updates.
+
+Progress is never recounted. Each checklist stores ``item_count`` (steps in
+its snapshot) and ``completed_count``; an update applies many item toggles
+in one transaction, adjusts the count by the number of items that actually
+changed and bumps ``version``. The update only lands if the checklist is
+still at the version the client read, so concurrent edits from two devices
+surface as a conflict instead of silently overwriting each other.
+
+A checklist is read in one query: its row, the snapshot's steps and its
+completed items aggregated into JSON by a correlated subquery.
+"""
+
+import json
+import uuid
+from app.core.database import dialect_insert
+from app.models.checklist import Checklist, ChecklistItem, ChecklistStatus, SOPSnapshot
+from app.schemas.checklist import ChecklistItemChange, ChecklistProgress, ChecklistRead
+from datetime import datetime
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Any, Dict, List, Optional
+
+
+class ChecklistConflict(Exception):
+    """The checklist changed since the client read it, or is closed for edits."""
+
+
+class UnknownSteps(ValueError):
+    pass
+
+
+def step_ids(steps: List[Dict[str, Any]]) -> List[str]:
+    """Item keys of a snapshot: each step's ``id``, or its position when it has none."""
+    return [
+        str(step.get("id", index)) if isinstance(step, dict) else str(index)
+        for index, step in enumerate(steps)
+    ]
+
+
+def percent(completed: int, total: int) -> int:
+    return completed * 100 // total if total else 0
+
+
+def _completed_items(dialect_name: str):
+    if dialect_name == "postgresql":
+        build, aggregate = func.json_build_object, func.json_agg
+    else:
+        build, aggregate = func.json_object, func.json_group_array
+    return (
+        select(aggregate(build(
+            "step_id", ChecklistItem.step_id,
+            "completed_at", ChecklistItem.completed_at,
+            "completed_by", ChecklistItem.completed_by,
+        )))
+        .where(ChecklistItem.checklist_id == Checklist.id, ChecklistItem.is_completed.is_(True))
+        .scalar_subquery()
+    )
+
+
+async def read_checklist(session: AsyncSession, checklist_id: uuid.UUID) -> Optional[ChecklistRead]:
+    row = (await session.execute(
+        select(Checklist, SOPSnapshot.steps, _completed_items(session.bind.dialect.name))
+        .join(SOPSnapshot, SOPSnapshot.id == Checklist.snapshot_id)
+        .where(Checklist.id == checklist_id)
+    )).first()
+    if row is None:
+        return None
+    checklist, steps, items = row
+    if isinstance(items, str):
+        items = json.loads(items)
+    return ChecklistRead(
+        **checklist.model_dump(exclude={"snapshot_id"}),
+        steps=steps or [],
+        completed_items=items or [],
+    )
+
+
+async def update_items(
+        session: AsyncSession,
+        checklist: Checklist,
+        expected_version: int,
+        changes: List[ChecklistItemChange],
+        user_id: uuid.UUID,
+) -> ChecklistProgress:
+    """Apply ``changes`` to ``checklist`` if it is still at ``expected_version``; commits."""
+    if checklist.status == ChecklistStatus.RESOLVED:
+        raise ChecklistConflict("Checklist is resolved")
+    if checklist.version != expected_version:
+        raise ChecklistConflict(f"Checklist is at version {checklist.version}, not {expected_version}")
+
+    wanted = {change.step_id: change.completed for change in changes}
+    steps = (await session.execute(
+        select(SOPSnapshot.steps).where(SOPSnapshot.id == checklist.snapshot_id)
+    )).scalar_one()
+    unknown = wanted.keys() - set(step_ids(steps or []))
+    if unknown:
+        raise UnknownSteps(f"Unknown steps: {', '.join(sorted(unknown))}")
+
+    current = dict((await session.execute(
+        select(ChecklistItem.step_id, ChecklistItem.is_completed)
+        .where(ChecklistItem.checklist_id == checklist.id, ChecklistItem.step_id.in_(wanted))
+    )).all())
+    changed = {step_id: done for step_id, done in wanted.items() if bool(current.get(step_id)) != done}
+    now = datetime.utcnow()
+    if changed:
+        statement = dialect_insert(session, ChecklistItem).values([
+            {
+                "id": uuid.uuid4(),
+                "checklist_id": checklist.id,
+                "step_id": step_id,
+                "is_completed": done,
+                "completed_at": now if done else None,
+                "completed_by": user_id if done else None,
+            }
+            for step_id, done in changed.items()
+        ])
+        await session.execute(statement.on_conflict_do_update(
+            index_elements=["checklist_id", "step_id"],
+            set_={
+                "is_completed": statement.excluded.is_completed,
+                "completed_at": statement.excluded.completed_at,
+                "completed_by": statement.excluded.completed_by,
+            },
+        ))
+
+    completed = checklist.completed_count + sum(1 if done else -1 for done in changed.values())
+    complete = checklist.item_count > 0 and completed >= checklist.item_count
+    values = {
+        "completed_count": completed,
+        "progress": percent(completed, checklist.item_count),
+        "status": ChecklistStatus.COMPLETED if complete else ChecklistStatus.ACTIVE,
+        "version": expected_version + 1,
+    }
+    # Guarded on the version read above: a concurrent update that committed first
+    # makes this match no row, and everything written here is rolled back.
+    result = await session.execute(
+        update(Checklist)
+        .where(Checklist.id == checklist.id, Checklist.version == expected_version)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await session.rollback()
+        raise ChecklistConflict("Checklist was modified concurrently")
+    await session.commit()
+    for field, value in values.items():
+        set_committed_value(checklist, field, value)
+    return ChecklistProgress(id=checklist.id, item_count=checklist.item_count, changed=len(changed), **values)
@@ -0,0 +1,370 @@
+"""
+Per-workspace dashboard counters.
+
+``workspace_counters`` holds one row per (workspace, dimension, key): SOPs
+per status, live SOPs per difficulty and per folder (trashed SOPs excluded,
+as in the folder tree), and users per status. Mapper events on SOPs, folder
+links and users add the difference each ORM write makes inside the same
+transaction, the way the search index is maintained; the bulk statements
+that bypass the ORM (trash purge, folder deletion, user import) apply
+theirs explicitly. The mapper events only collect their differences on the
+session; all changes of one flush go out after it as a single upsert in key
+order, so concurrent writers queue on a counter row instead of deadlocking.
+
+``DashboardReconciler`` periodically recomputes every workspace with
+``GROUP BY`` queries and corrects counters that drifted, e.g. after rows
+were changed by hand in SQL.
+"""
+
+import asyncio
+import logging
+import uuid
+from app.core import metrics
+from app.core.config import settings
+from app.models.dashboard import WorkspaceCounter
+from app.models.folder import SOPFolder
+from app.models.sop import SOP
+from app.models.user import User
+from collections import Counter, defaultdict
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import delete, event, func, inspect, select, tuple_, union
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOP_STATUS = "sop_status"
+SOP_DIFFICULTY = "sop_difficulty"
+SOP_FOLDER = "sop_folder"
+USER_STATUS = "user_status"
+
+# (workspace_id, dimension, key) -> change in count
+Deltas = Counter
+_SOP_FIELDS = ("workspace_id", "status", "difficulty", "deleted_at")
+_USER_FIELDS = ("workspace_id", "status")
+# session.info key collecting the deltas of the flush in progress
+_PENDING_KEY = "dashboard_deltas"
+
+
+def counter_key(value: Any) -> str:
+    if isinstance(value, uuid.UUID):
+        return value.hex
+    return value.value if isinstance(value, Enum) else str(value)
+
+
+def sop_deltas(
+        deltas: Deltas,
+        workspace_id: Optional[uuid.UUID],
+        status: Any,
+        difficulty: Any,
+        live: bool,
+        folder_ids: Iterable[uuid.UUID],
+        sign: int,
+) -> None:
+    if workspace_id is None:
+        return
+    deltas[(workspace_id, SOP_STATUS, counter_key(status))] += sign
+    if live:
+        deltas[(workspace_id, SOP_DIFFICULTY, counter_key(difficulty))] += sign
+        for folder_id in folder_ids:
+            deltas[(workspace_id, SOP_FOLDER, counter_key(folder_id))] += sign
+
+
+def user_deltas(deltas: Deltas, workspace_id: Optional[uuid.UUID], status: Any, sign: int) -> None:
+    if workspace_id is not None:
+        deltas[(workspace_id, USER_STATUS, counter_key(status))] += sign
+
+
+def _upsert(dialect_name: str, rows: List[Dict[str, Any]], add: bool):
+    """Multi-row upsert; ``add`` increments existing counters instead of overwriting them."""
+    statement = (postgresql if dialect_name == "postgresql" else sqlite).insert(WorkspaceCounter).values(rows)
+    count = WorkspaceCounter.count + statement.excluded.count if add else statement.excluded.count
+    return statement.on_conflict_do_update(
+        index_elements=["workspace_id", "dimension", "key"],
+        set_={"count": count, "updated_at": statement.excluded.updated_at},
+    )
+
+
+def apply_deltas(connection: Connection, deltas: Deltas) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {"workspace_id": workspace_id, "dimension": dimension, "key": key, "count": change, "updated_at": now}
+        for (workspace_id, dimension, key), change in sorted(deltas.items())
+        if change
+    ]
+    if rows:
+        connection.execute(_upsert(connection.dialect.name, rows, add=True))
+
+
+def _collect(connection: Connection, target: Any, deltas: Deltas) -> None:
+    """Add a mapper event's deltas to its session's flush; written once the flush ends."""
+    session = Session.object_session(target)
+    if session is None:
+        apply_deltas(connection, deltas)
+    else:
+        session.info.setdefault(_PENDING_KEY, Deltas()).update(deltas)
+
+
+@event.listens_for(Session, "after_flush")
+def _write_flush_deltas(session: Session, flush_context) -> None:
+    deltas = session.info.pop(_PENDING_KEY, None)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_flush_deltas(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _folder_ids(connection: Connection, sop_id: uuid.UUID) -> List[uuid.UUID]:
+    return connection.execute(select(SOPFolder.folder_id).where(SOPFolder.sop_id == sop_id)).scalars().all()
+
+
+def _previous(state, name: str) -> Any:
+    history = state.attrs[name].history
+    return history.deleted[0] if history.deleted else state.attrs[name].value
+
+
+def remove_sops(connection: Connection, sop_ids: Iterable[uuid.UUID]) -> None:
+    """Uncount SOPs about to be deleted in bulk; call while their folder links still exist."""
+    rows = connection.execute(
+        select(SOP.id, SOP.workspace_id, SOP.status, SOP.difficulty, SOP.deleted_at).where(SOP.id.in_(list(sop_ids)))
+    ).all()
+    links = defaultdict(list)
+    live_ids = [row.id for row in rows if row.deleted_at is None]
+    if live_ids:
+        for sop_id, folder_id in connection.execute(
+                select(SOPFolder.sop_id, SOPFolder.folder_id).where(SOPFolder.sop_id.in_(live_ids))
+        ):
+            links[sop_id].append(folder_id)
+    deltas = Deltas()
+    for row in rows:
+        sop_deltas(deltas, row.workspace_id, row.status, row.difficulty, row.deleted_at is None, links[row.id], -1)
+    apply_deltas(connection, deltas)
+
+
+def remove_folders(connection: Connection, workspace_id: uuid.UUID, folder_ids: Iterable[uuid.UUID]) -> None:
+    connection.execute(delete(WorkspaceCounter).where(
+        WorkspaceCounter.workspace_id == workspace_id,
+        WorkspaceCounter.dimension == SOP_FOLDER,
+        WorkspaceCounter.key.in_([counter_key(folder_id) for folder_id in folder_ids]),
+    ))
+
+
+def add_users(connection: Connection, users: Iterable[Dict[str, Any]]) -> None:
+    """Count users inserted in bulk (column dicts with ``workspace_id`` and ``status``)."""
+    deltas = Deltas()
+    for user in users:
+        user_deltas(deltas, user["workspace_id"], user["status"], 1)
+    apply_deltas(connection, deltas)
+
+
+@event.listens_for(SOP, "after_insert")
+def _count_inserted_sop(mapper, connection: Connection, target: SOP) -> None:
+    # Folder links are inserted after their SOP and counted by their own event.
+    deltas = Deltas()
+    sop_deltas(deltas, target.workspace_id, target.status, target.difficulty, target.deleted_at is None, (), 1)
+    _collect(connection, target, deltas)
+
+
+@event.listens_for(SOP, "after_update")
+def _count_updated_sop(mapper, connection: Connection, target: SOP) -> None:
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in _SOP_FIELDS):
+        return
+    workspace_id, status, difficulty, deleted_at = (_previous(state, name) for name in _SOP_FIELDS)
+    # Folder counters only move when the SOP enters or leaves the trash or changes workspace.
+    refiled = workspace_id != target.workspace_id or (deleted_at is None) != (target.deleted_at is None)
+    folder_ids = _folder_ids(connection, target.id) if refiled else ()
+    deltas = Deltas()
+    sop_deltas(deltas, workspace_id, status, difficulty, deleted_at is None, folder_ids, -1)
+    sop_deltas(
+        deltas, target.workspace_id, target.status, target.difficulty, target.deleted_at is None, folder_ids, 1,
+    )
+    _collect(connection, target, deltas)
+
+
+@event.listens_for(SOP, "after_delete")
+def _count_deleted_sop(mapper, connection: Connection, target: SOP) -> None:
+    deltas = Deltas()
+    sop_deltas(
+        deltas, target.workspace_id, target.status, target.difficulty, target.deleted_at is None,
+        _folder_ids(connection, target.id), -1,
+    )
+    _collect(connection, target, deltas)
+
+
+def _count_link(connection: Connection, link: SOPFolder, sign: int) -> None:
+    sop = connection.execute(select(SOP.workspace_id, SOP.deleted_at).where(SOP.id == link.sop_id)).first()
+    if sop is not None and sop.workspace_id is not None and sop.deleted_at is None:
+        _collect(connection, link, Deltas({(sop.workspace_id, SOP_FOLDER, counter_key(link.folder_id)): sign}))
+
+
+@event.listens_for(SOPFolder, "after_insert")
+def _count_filed_sop(mapper, connection: Connection, target: SOPFolder) -> None:
+    _count_link(connection, target, 1)
+
+
+@event.listens_for(SOPFolder, "after_delete")
+def _count_unfiled_sop(mapper, connection: Connection, target: SOPFolder) -> None:
+    _count_link(connection, target, -1)
+
+
+@event.listens_for(User, "after_insert")
+def _count_inserted_user(mapper, connection: Connection, target: User) -> None:
+    deltas = Deltas()
+    user_deltas(deltas, target.workspace_id, target.status, 1)
+    _collect(connection, target, deltas)
+
+
+@event.listens_for(User, "after_update")
+def _count_updated_user(mapper, connection: Connection, target: User) -> None:
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in _USER_FIELDS):
+        return
+    deltas = Deltas()
+    user_deltas(deltas, _previous(state, "workspace_id"), _previous(state, "status"), -1)
+    user_deltas(deltas, target.workspace_id, target.status, 1)
+    _collect(connection, target, deltas)
+
+
+@event.listens_for(User, "after_delete")
+def _count_deleted_user(mapper, connection: Connection, target: User) -> None:
+    deltas = Deltas()
+    user_deltas(deltas, target.workspace_id, target.status, -1)
+    _collect(connection, target, deltas)
+
+
+async def read_counters(session: AsyncSession, workspace_id: uuid.UUID) -> Dict[str, Dict[str, int]]:
+    """All counters of the workspace by dimension, from one indexed read."""
+    counters: Dict[str, Dict[str, int]] = {SOP_STATUS: {}, SOP_DIFFICULTY: {}, SOP_FOLDER: {}, USER_STATUS: {}}
+    rows = await session.execute(
+        select(WorkspaceCounter.dimension, WorkspaceCounter.key, WorkspaceCounter.count)
+        .where(WorkspaceCounter.workspace_id == workspace_id)
+    )
+    for dimension, key, count in rows:
+        if count:
+            counters.setdefault(dimension, {})[key] = count
+    return counters
+
+
+async def compute_counters(session: AsyncSession, workspace_id: uuid.UUID) -> Dict[Tuple[str, str], int]:
+    """Recount the workspace from the source tables."""
+    live = SOP.deleted_at.is_(None)
+    queries = (
+        (SOP_STATUS, select(SOP.status, func.count()).where(SOP.workspace_id == workspace_id).group_by(SOP.status)),
+        (SOP_DIFFICULTY, select(SOP.difficulty, func.count())
+            .where(SOP.workspace_id == workspace_id, live).group_by(SOP.difficulty)),
+        (SOP_FOLDER, select(SOPFolder.folder_id, func.count())
+            .join(SOP, SOP.id == SOPFolder.sop_id)
+            .where(SOP.workspace_id == workspace_id, live)
+            .group_by(SOPFolder.folder_id)),
+        (USER_STATUS, select(User.status, func.count()).where(User.workspace_id == workspace_id).group_by(User.status)),
+    )
+    counters: Dict[Tuple[str, str], int] = {}
+    for dimension, query in queries:
+        for value, count in await session.execute(query):
+            counters[(dimension, counter_key(value))] = count
+    return counters
+
+
+async def reconcile(session: AsyncSession, workspace_id: uuid.UUID) -> int:
+    """Overwrite the workspace's counters with a fresh recount; returns how many were wrong. Commits."""
+    # Locking the stored counters first makes concurrent writers wait until the
+    # recount has committed, so none of their increments is overwritten.
+    stored = {
+        (dimension, key): count
+        for dimension, key, count in await session.execute(
+            select(WorkspaceCounter.dimension, WorkspaceCounter.key, WorkspaceCounter.count)
+            .where(WorkspaceCounter.workspace_id == workspace_id)
+            .with_for_update()
+        )
+    }
+    expected = await compute_counters(session, workspace_id)
+    now = datetime.utcnow()
+    wrong = [
+        {"workspace_id": workspace_id, "dimension": dimension, "key": key, "count": count, "updated_at": now}
+        for (dimension, key), count in sorted(expected.items())
+        if stored.get((dimension, key)) != count
+    ]
+    stale = [key for key in stored if key not in expected]
+    if wrong:
+        await session.execute(_upsert(session.bind.dialect.name, wrong, add=False))
+    if stale:
+        await session.execute(delete(WorkspaceCounter).where(
+            WorkspaceCounter.workspace_id == workspace_id,
+            tuple_(WorkspaceCounter.dimension, WorkspaceCounter.key).in_(stale),
+        ))
+    await session.commit()
+    return len(wrong) + sum(1 for key in stale if stored[key])
+
+
+class DashboardReconciler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.runs = 0
+        self.corrected = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._session_factory: Optional[async_sessionmaker] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """Reconcile every workspace, one short transaction each; returns the counters corrected."""
+        started = perf_counter()
+        async with self._session_factory() as session:
+            workspace_ids = (await session.execute(union(
+                select(SOP.workspace_id).where(SOP.workspace_id.is_not(None)),
+                select(User.workspace_id).where(User.workspace_id.is_not(None)),
+                select(WorkspaceCounter.workspace_id),
+            ))).scalars().all()
+        corrected = 0
+        for workspace_id in workspace_ids:
+            async with self._session_factory() as session:
+                corrected += await reconcile(session, workspace_id)
+
+        self.runs += 1
+        self.corrected += corrected
+        self.last_run = {
+            "finished_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "workspaces": len(workspace_ids),
+            "corrected": corrected,
+            "seconds": round(perf_counter() - started, 3),
+        }
+        if corrected:
+            logger.warning("Corrected %d drifted dashboard counters", corrected)
+        return corrected
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._runner = asyncio.create_task(self._run(), name="dashboard-reconcile")
+
+    async def stop(self) -> None:
+        if self._runner is None:
+            return
+        self._runner.cancel()
+        await asyncio.gather(self._runner, return_exceptions=True)
+        self._runner = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Dashboard reconciliation failed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"runs": self.runs, "corrected": self.corrected, "last_run": self.last_run}
+
+
+dashboard_reconciler = DashboardReconciler(interval=settings.DASHBOARD_RECONCILE_INTERVAL_SECONDS)
+metrics.register(metrics.Gauge(
+    "dashboard_counters_corrected_total", "Dashboard counters found wrong and fixed by reconciliation.",
+    lambda: dashboard_reconciler.corrected, "counter",
+))
@@ -0,0 +1,117 @@
+"""
+Folder hierarchy helpers built on the materialized ``Folder.path``.
+
+A folder's path is the chain of ancestor ids ending with its own,
+e.g. ``/<root>/<child>/``, so every descendant's path starts with it and
+a whole subtree is a single index range scan on ``(workspace_id, path)``.
+The range relies on byte ordering, hence the C collation of ``path`` on
+PostgreSQL.
+"""
+
+import uuid
+from app.models.folder import Folder, SOPFolder
+from app.models.sop import SOP
+from app.services import dashboard
+from datetime import datetime
+from sqlalchemy import and_, delete, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+
+PATH_SEPARATOR = "/"
+# Smallest string greater than every "<prefix>..." path: "/" (0x2F) + 1 == "0"
+_PATH_UPPER = chr(ord(PATH_SEPARATOR) + 1)
+
+
+def child_path(parent: Optional[Folder], folder_id: uuid.UUID) -> str:
+    prefix = parent.path if parent else PATH_SEPARATOR
+    return f"{prefix}{folder_id.hex}{PATH_SEPARATOR}"
+
+
+def subtree_filter(folder: Folder):
+    """Range predicate matching ``folder`` and all of its descendants."""
+    return and_(
+        Folder.workspace_id == folder.workspace_id,
+        Folder.path >= folder.path,
+        Folder.path < folder.path[:-1] + _PATH_UPPER,
+    )
+
+
+async def load_tree(
+        session: AsyncSession,
+        workspace_id: Optional[uuid.UUID],
+        root: Optional[Folder] = None,
+) -> List[Dict[str, Any]]:
+    """Return the workspace hierarchy (or ``root``'s subtree) as nested dicts in one query.
+
+    Each node carries ``sop_count`` (SOPs filed directly in it, excluding the
+    trash) and ``total_sop_count`` (including descendants).
+    """
+    counts = (
+        select(SOPFolder.folder_id, func.count().label("sop_count"))
+        .join(SOP, SOP.id == SOPFolder.sop_id)
+        .where(SOP.workspace_id == workspace_id, SOP.deleted_at.is_(None))
+        .group_by(SOPFolder.folder_id)
+        .subquery()
+    )
+    statement = (
+        select(Folder, func.coalesce(counts.c.sop_count, 0))
+        .outerjoin(counts, counts.c.folder_id == Folder.id)
+        .order_by(Folder.path)
+    )
+    if root is not None:
+        statement = statement.where(subtree_filter(root))
+    else:
+        statement = statement.where(Folder.workspace_id == workspace_id)
+
+    nodes: Dict[uuid.UUID, Dict[str, Any]] = {}
+    roots: List[Dict[str, Any]] = []
+    for folder, sop_count in (await session.execute(statement)).all():
+        node = folder.model_dump()
+        node.update(sop_count=sop_count, total_sop_count=sop_count, children=[])
+        nodes[folder.id] = node
+        # Ordering by path guarantees parents are seen before their children.
+        parent = nodes.get(folder.parent_id)
+        if parent is not None:
+            parent["children"].append(node)
+        else:
+            roots.append(node)
+
+    for node in sorted(nodes.values(), key=lambda n: n["depth"], reverse=True):
+        parent = nodes.get(node["parent_id"])
+        if parent is not None:
+            parent["total_sop_count"] += node["total_sop_count"]
+    return roots
+
+
+async def move_subtree(session: AsyncSession, folder: Folder, new_parent: Optional[Folder]) -> None:
+    """Re-parent ``folder``, rewriting every descendant's path with one bulk UPDATE."""
+    if new_parent is not None and new_parent.path.startswith(folder.path):
+        raise ValueError("Cannot move a folder into its own subtree")
+
+    old_path = folder.path
+    new_path = child_path(new_parent, folder.id)
+    depth_delta = (new_parent.depth + 1 if new_parent else 0) - folder.depth
+    await session.execute(
+        update(Folder)
+        .where(subtree_filter(folder))
+        .values(
+            path=literal(new_path) + func.substr(Folder.path, len(old_path) + 1),
+            depth=Folder.depth + depth_delta,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    folder.parent_id = new_parent.id if new_parent else None
+    folder.path = new_path
+    folder.depth += depth_delta
+    folder.updated_at = datetime.utcnow()
+
+
+async def delete_subtree(session: AsyncSession, folder: Folder) -> None:
+    """Delete ``folder`` and its descendants; SOPs filed in them are unfiled, not deleted."""
+    subtree_ids = (await session.execute(select(Folder.id).where(subtree_filter(folder)))).scalars().all()
+    connection = await session.connection()
+    await connection.run_sync(dashboard.remove_folders, folder.workspace_id, subtree_ids)
+    await session.execute(delete(SOPFolder).where(SOPFolder.folder_id.in_(subtree_ids)))
+    await session.execute(
+        delete(Folder).where(subtree_filter(folder)).execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,267 @@
+"""
+Transactional outbox for the side effects of write requests.
+
+A request handler calls ``append`` to add an ``OutboxEvent`` in the same
+transaction as its own changes, so an event exists exactly when the change
+committed, and returns as soon as the commit lands. ``OutboxDispatcher``
+claims due events in batches and runs the async handlers registered for
+each event type with ``@handler``. Every event is handled in its own
+transaction, which also deletes the event, so database writes made by the
+handlers commit together with its completion.
+
+Events of one aggregate (e.g. one SOP) are dispatched strictly in order:
+only its oldest unfinished event is eligible. A failing event is retried
+with exponential backoff, holding back later events of its aggregate, and
+after ``OUTBOX_MAX_ATTEMPTS`` it is dead-lettered: kept with its error as
+``DEAD`` and no longer blocking the aggregate.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from app.core import metrics
+from app.core.config import settings
+from app.models.outbox import OutboxEvent, OutboxStatus
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+USER_CREATED = "user.created"
+SOP_UPDATED = "sop.updated"
+
+Handler = Callable[[AsyncSession, OutboxEvent], Awaitable[None]]
+_handlers: Dict[str, List[Handler]] = {}
+
+_AFTER_COMMIT_KEY = "outbox_after_commit"
+
+dispatch_duration = metrics.register(metrics.Histogram(
+    "outbox_dispatch_seconds", "Time from an outbox event's creation to its successful dispatch.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 30, 120, 600),
+))
+
+
+def handler(event_type: str) -> Callable[[Handler], Handler]:
+    """Register an async ``(session, event)`` handler; it should be idempotent (events may be retried)."""
+    def register(function: Handler) -> Handler:
+        _handlers.setdefault(event_type, []).append(function)
+        return function
+    return register
+
+
+def append(
+        session: AsyncSession,
+        event_type: str,
+        aggregate_type: str,
+        aggregate_id: Any,
+        payload: Optional[Dict[str, Any]] = None,
+) -> OutboxEvent:
+    """Add an event to the caller's transaction; it is dispatched only if that commits."""
+    event = OutboxEvent(
+        event_type=event_type,
+        aggregate_type=aggregate_type,
+        aggregate_id=str(aggregate_id),
+        payload=json.loads(json.dumps(payload or {}, default=str)),
+    )
+    session.add(event)
+    return event
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the dispatcher has committed the current event."""
+    session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+
+def retry_delay(attempts: int, base: float) -> float:
+    return base * 2 ** max(attempts - 1, 0)
+
+
+class OutboxDispatcher:
+    def __init__(
+            self,
+            batch_size: int,
+            concurrency: int,
+            poll_interval: float,
+            max_attempts: int,
+            retry_base_seconds: float,
+            claim_timeout_seconds: float,
+    ):
+        self.batch_size = max(batch_size, 1)
+        self.concurrency = max(concurrency, 1)
+        self.poll_interval = poll_interval
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_base_seconds = retry_base_seconds
+        self.claim_timeout_seconds = claim_timeout_seconds
+        self.backlog = 0
+        self.dispatched = 0
+        self.retried = 0
+        self.dead = 0
+        self._session_factory: Optional[async_sessionmaker] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._runner = asyncio.create_task(self._run(), name="outbox-dispatcher")
+
+    async def stop(self) -> None:
+        if self._runner is None:
+            return
+        self._runner.cancel()
+        await asyncio.gather(self._runner, return_exceptions=True)
+        self._runner = None
+
+    def notify(self) -> None:
+        """Dispatch now instead of at the next poll (same process only)."""
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backlog": self.backlog,
+            "dispatched": self.dispatched,
+            "retried": self.retried,
+            "dead": self.dead,
+        }
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Claim one batch of due events and dispatch it; returns how many were claimed."""
+        now = now or datetime.utcnow()
+        claimed = await self._claim(now)
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def dispatch(event_id: int) -> None:
+            async with limit:
+                await self._dispatch(event_id)
+
+        await asyncio.gather(*(dispatch(event_id) for event_id in claimed))
+        return len(claimed)
+
+    async def _run(self) -> None:
+        while True:
+            claimed = 0
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def _claim(self, now: datetime) -> List[int]:
+        claim_id = uuid.uuid4().hex
+        async with self._session_factory() as session:
+            # Release claims of a process that died mid-dispatch.
+            await session.execute(
+                update(OutboxEvent)
+                .where(
+                    OutboxEvent.status == OutboxStatus.PROCESSING,
+                    OutboxEvent.claimed_at < now - timedelta(seconds=self.claim_timeout_seconds),
+                )
+                .values(status=OutboxStatus.PENDING)
+            )
+            self.backlog = await session.scalar(
+                select(func.count()).select_from(OutboxEvent).where(OutboxEvent.status != OutboxStatus.DEAD)
+            )
+            heads = (
+                select(func.min(OutboxEvent.id))
+                .where(OutboxEvent.status != OutboxStatus.DEAD)
+                .group_by(OutboxEvent.aggregate_type, OutboxEvent.aggregate_id)
+            )
+            candidates = (await session.execute(
+                select(OutboxEvent.id)
+                .where(
+                    OutboxEvent.id.in_(heads),
+                    OutboxEvent.status == OutboxStatus.PENDING,
+                    OutboxEvent.available_at <= now,
+                )
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+            )).scalars().all()
+            if not candidates:
+                await session.rollback()
+                return []
+            # Conditional on still being PENDING, so concurrent dispatchers never share an event.
+            await session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(candidates), OutboxEvent.status == OutboxStatus.PENDING)
+                .values(
+                    status=OutboxStatus.PROCESSING,
+                    claimed_at=now,
+                    claimed_by=claim_id,
+                    attempts=OutboxEvent.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            claimed = (await session.execute(
+                select(OutboxEvent.id)
+                .where(OutboxEvent.id.in_(candidates), OutboxEvent.claimed_by == claim_id)
+                .order_by(OutboxEvent.id)
+            )).scalars().all()
+            await session.commit()
+            return list(claimed)
+
+    async def _dispatch(self, event_id: int) -> None:
+        async with self._session_factory() as session:
+            event = await session.get(OutboxEvent, event_id)
+            attempts, created_at = event.attempts, event.created_at
+            try:
+                for function in _handlers.get(event.event_type, ()):
+                    await function(session, event)
+                await session.execute(delete(OutboxEvent).where(OutboxEvent.id == event_id))
+                await session.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.exception("Outbox event %s (%s) failed, attempt %d", event_id, event.event_type, attempts)
+                await session.rollback()
+                session.info.pop(_AFTER_COMMIT_KEY, None)
+                await self._fail(session, event_id, attempts, exc)
+                return
+            self.dispatched += 1
+            dispatch_duration.observe((datetime.utcnow() - created_at).total_seconds())
+            for callback in session.info.pop(_AFTER_COMMIT_KEY, ()):
+                callback()
+
+    async def _fail(self, session: AsyncSession, event_id: int, attempts: int, exc: Exception) -> None:
+        values: Dict[str, Any] = {"last_error": f"{exc.__class__.__name__}: {exc}"[:1000], "claimed_by": None}
+        if attempts >= self.max_attempts:
+            values["status"] = OutboxStatus.DEAD
+            self.dead += 1
+            logger.error("Outbox event %s dead-lettered after %d attempts", event_id, attempts)
+        else:
+            values["status"] = OutboxStatus.PENDING
+            values["available_at"] = datetime.utcnow() + timedelta(
+                seconds=retry_delay(attempts, self.retry_base_seconds)
+            )
+            self.retried += 1
+        await session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id == event_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+outbox_dispatcher = OutboxDispatcher(
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    concurrency=settings.OUTBOX_CONCURRENCY,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    retry_base_seconds=settings.OUTBOX_RETRY_BASE_SECONDS,
+    claim_timeout_seconds=settings.OUTBOX_CLAIM_TIMEOUT_SECONDS,
+)
+metrics.register(metrics.Gauge(
+    "outbox_backlog", "Outbox events not yet dispatched (excluding dead letters).",
+    lambda: outbox_dispatcher.backlog,
+))
+metrics.register(metrics.Gauge(
+    "outbox_dead_letters_total", "Outbox events dead-lettered by this process.", lambda: outbox_dispatcher.dead, "counter",
+))
@@ -0,0 +1,31 @@
+"""
+Opaque keyset-pagination cursors.
+
+A cursor encodes the sort key of the last row on a page; the next page is
+fetched with a row-value comparison against it, so page N costs the same
+index seek as page 1 regardless of how deep the client has scrolled.
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort_value: datetime, row_id: uuid.UUID) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id.hex], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), uuid.UUID(hex=row_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("Malformed pagination cursor") from exc
@@ -0,0 +1,309 @@
+"""
+Background PDF rendering for SOPs.
+
+Jobs live in the ``pdf_jobs`` table, so queued work survives restarts. An
+in-process worker claims pending jobs and renders them on a process pool
+(``pdf_render`` is CPU-bound pure Python), writing ``<content hash>.pdf``
+into ``PDF_STORAGE_DIR``. The hash covers title, description, version and
+content, so unchanged SOPs are never rendered twice and identical content
+shares one file.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from app.core import metrics
+from app.core.config import settings
+from app.models.outbox import OutboxEvent
+from app.models.sop import PDFGenerationStatus, PDFJob, SOP, SOPStatus
+from app.services import outbox
+from app.services.pdf_render import Block, render_pdf
+from app.services.search import extract_text
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from time import perf_counter
+from typing import Any, Deque, Dict, List, Optional, Set
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+_ACTIVE = (PDFGenerationStatus.PENDING, PDFGenerationStatus.PROCESSING)
+
+
+def content_hash(sop: SOP) -> str:
+    payload = {
+        "title": sop.title,
+        "short_description": sop.short_description,
+        "version": sop.version,
+        "content": sop.content,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def pdf_path(digest: str) -> Path:
+    return Path(settings.PDF_STORAGE_DIR) / f"{digest}.pdf"
+
+
+def pdf_url(sop_id: UUID) -> str:
+    return f"{settings.API_V1_STR}/sops/{sop_id}/pdf"
+
+
+def build_blocks(sop: SOP) -> List[Block]:
+    blocks: List[Block] = [("title", sop.title), ("body", f"Version {sop.version}")]
+    if sop.short_description:
+        blocks.append(("body", sop.short_description))
+    steps = sorted(sop.content.get("steps") or [], key=lambda step: step.get("order") or 0)
+    for number, step in enumerate(steps, start=1):
+        blocks.append(("heading", f"{number}. {step.get('title') or ''}"))
+        description = extract_text(step.get("description"))
+        if description:
+            blocks.append(("body", description))
+    return blocks
+
+
+async def enqueue(session: AsyncSession, sop: SOP) -> bool:
+    """Queue a render unless an identical PDF exists or is already queued. Caller commits."""
+    digest = content_hash(sop)
+    if (
+            sop.pdf_status == PDFGenerationStatus.COMPLETED
+            and sop.pdf_content_hash == digest
+            and pdf_path(digest).exists()
+    ):
+        return False
+    queued = await session.scalar(
+        select(PDFJob.id)
+        .where(PDFJob.sop_id == sop.id, PDFJob.content_hash == digest, PDFJob.status.in_(_ACTIVE))
+        .limit(1)
+    )
+    if queued:
+        return False
+    session.add(PDFJob(sop_id=sop.id, content_hash=digest))
+    sop.pdf_status = PDFGenerationStatus.PENDING
+    return True
+
+
+@outbox.handler(outbox.SOP_UPDATED)
+async def render_published(session: AsyncSession, event: OutboxEvent) -> None:
+    """Queue a render for an updated SOP that is (still) published."""
+    sop = await session.get(SOP, UUID(event.aggregate_id))
+    if sop is None or sop.deleted_at is not None or sop.status != SOPStatus.PUBLISHED:
+        return
+    if await enqueue(session, sop):
+        outbox.after_commit(session, pdf_worker.notify)
+
+
+class PDFWorker:
+    def __init__(self, workers: int, poll_interval: float, max_attempts: int):
+        self.workers = max(workers, 1)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.queue_depth = 0
+        self.rendered = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self.render_ms: Deque[float] = deque(maxlen=500)
+        self._session_factory: Optional[async_sessionmaker] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        Path(settings.PDF_STORAGE_DIR).mkdir(parents=True, exist_ok=True)
+        self._session_factory = session_factory
+        self._pool = self._new_pool()
+        self._wakeup = asyncio.Event()
+        self._runner = asyncio.create_task(self._run(), name="pdf-worker")
+
+    async def stop(self) -> None:
+        if self._runner is None:
+            return
+        self._runner.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(self._runner, *self._tasks, return_exceptions=True)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._runner = self._pool = None
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def notify(self) -> None:
+        """Wake the worker now instead of at the next poll (same process only)."""
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        timings = sorted(self.render_ms)
+
+        def percentile(p: float) -> Optional[float]:
+            return round(timings[min(int(len(timings) * p), len(timings) - 1)], 1) if timings else None
+
+        return {
+            "queue_depth": self.queue_depth,
+            "in_progress": len(self._tasks),
+            "rendered": self.rendered,
+            "deduplicated": self.deduplicated,
+            "failed": self.failed,
+            "render_ms_p50": percentile(0.5),
+            "render_ms_p95": percentile(0.95),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            claimed: List[UUID] = []
+            try:
+                await self._recover()
+                if len(self._tasks) < self.workers:
+                    claimed = await self._claim(self.workers - len(self._tasks))
+                for job_id in claimed:
+                    task = asyncio.create_task(self._process(job_id))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            except Exception:
+                logger.exception("PDF worker failed to claim jobs")
+            if len(self._tasks) >= self.workers:
+                await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+            elif not claimed:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def _recover(self) -> None:
+        # Requeue jobs left PROCESSING by a process that died (or hung) mid-render; a job
+        # that has used up its attempts fails instead, so a render that always hangs ends.
+        now = datetime.utcnow()
+        stale = (
+            PDFJob.status == PDFGenerationStatus.PROCESSING,
+            PDFJob.started_at < now - timedelta(seconds=settings.PDF_JOB_TIMEOUT_SECONDS),
+        )
+        async with self._session_factory() as session:
+            exhausted = (await session.execute(
+                select(PDFJob.id, PDFJob.sop_id).where(*stale, PDFJob.attempts >= self.max_attempts)
+            )).all()
+            if exhausted:
+                failed = await session.execute(
+                    update(PDFJob)
+                    .where(PDFJob.id.in_([job.id for job in exhausted]), *stale)
+                    .values(status=PDFGenerationStatus.FAILED, error="Render timed out", finished_at=now)
+                )
+                await session.execute(
+                    update(SOP)
+                    .where(SOP.id.in_([job.sop_id for job in exhausted]),
+                           SOP.pdf_status == PDFGenerationStatus.PROCESSING)
+                    .values(pdf_status=PDFGenerationStatus.FAILED)
+                )
+                self.failed += failed.rowcount
+            await session.execute(update(PDFJob).where(*stale).values(status=PDFGenerationStatus.PENDING))
+            await session.commit()
+
+    async def _claim(self, limit: int) -> List[UUID]:
+        async with self._session_factory() as session:
+            self.queue_depth = await session.scalar(
+                select(func.count()).select_from(PDFJob).where(PDFJob.status == PDFGenerationStatus.PENDING)
+            )
+            candidates = (await session.execute(
+                select(PDFJob.id)
+                .where(PDFJob.status == PDFGenerationStatus.PENDING)
+                .order_by(PDFJob.created_at)
+                .limit(limit)
+            )).scalars().all()
+            claimed = []
+            for job_id in candidates:
+                # Conditional update so concurrent workers never claim the same job.
+                result = await session.execute(
+                    update(PDFJob)
+                    .where(PDFJob.id == job_id, PDFJob.status == PDFGenerationStatus.PENDING)
+                    .values(
+                        status=PDFGenerationStatus.PROCESSING,
+                        started_at=datetime.utcnow(),
+                        attempts=PDFJob.attempts + 1,
+                    )
+                )
+                if result.rowcount:
+                    claimed.append(job_id)
+            await session.commit()
+            return claimed
+
+    async def _process(self, job_id: UUID) -> None:
+        async with self._session_factory() as session:
+            job = await session.get(PDFJob, job_id)
+            if job is None:
+                # Purged with its SOP (trash) after being claimed.
+                return
+            sop = await session.get(SOP, job.sop_id)
+            attempts = job.attempts
+            try:
+                if sop is None:
+                    raise LookupError("SOP no longer exists")
+                sop.pdf_status = PDFGenerationStatus.PROCESSING
+                await session.commit()
+
+                digest = content_hash(sop)
+                path = pdf_path(digest)
+                if path.exists():
+                    self.deduplicated += 1
+                else:
+                    started = perf_counter()
+                    data = await asyncio.get_running_loop().run_in_executor(
+                        self._pool, render_pdf, build_blocks(sop)
+                    )
+                    tmp_path = path.with_suffix(f".{job_id.hex}.tmp")
+                    tmp_path.write_bytes(data)
+                    os.replace(tmp_path, path)
+                    job.render_ms = (perf_counter() - started) * 1000
+                    self.render_ms.append(job.render_ms)
+                    self.rendered += 1
+
+                job.status = PDFGenerationStatus.COMPLETED
+                job.content_hash = digest
+                job.finished_at = datetime.utcnow()
+                newer = await session.scalar(
+                    select(PDFJob.id)
+                    .where(PDFJob.sop_id == sop.id, PDFJob.id != job.id,
+                           PDFJob.status == PDFGenerationStatus.PENDING)
+                    .limit(1)
+                )
+                sop.pdf_status = PDFGenerationStatus.PENDING if newer else PDFGenerationStatus.COMPLETED
+                sop.pdf_url = pdf_url(sop.id)
+                sop.pdf_content_hash = digest
+                await session.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if isinstance(exc, BrokenProcessPool):
+                    # A renderer died (e.g. OOM-killed); replace the pool for later jobs.
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = self._new_pool()
+                logger.exception("PDF render failed for job %s", job_id)
+                await session.rollback()
+                if await session.get(PDFJob, job_id) is None:
+                    return
+                retry = attempts < self.max_attempts
+                job.status = PDFGenerationStatus.PENDING if retry else PDFGenerationStatus.FAILED
+                job.error = str(exc)[:500]
+                job.finished_at = None if retry else datetime.utcnow()
+                if sop is not None and not retry:
+                    sop.pdf_status = PDFGenerationStatus.FAILED
+                    self.failed += 1
+                await session.commit()
+
+
+pdf_worker = PDFWorker(
+    workers=settings.PDF_WORKERS,
+    poll_interval=settings.PDF_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.PDF_MAX_ATTEMPTS,
+)
+metrics.register(metrics.Gauge("pdf_queue_depth", "Pending PDF render jobs.", lambda: pdf_worker.queue_depth))
+metrics.register(metrics.Gauge(
+    "pdf_rendered_total", "PDFs rendered by this process.", lambda: pdf_worker.rendered, "counter",
+))
@@ -0,0 +1,88 @@
+"""
+Minimal text PDF writer used by the PDF worker processes.
+
+Kept free of application imports so spawned renderer processes start fast.
+Produces a PDF 1.4 document with the standard Helvetica fonts (no embedding),
+wrapping text to the page width and paginating as needed.
+"""
+
+import textwrap
+from typing import List, Sequence, Tuple
+
+PAGE_WIDTH = 595  # A4 in points
+PAGE_HEIGHT = 842
+MARGIN = 56
+
+# (font resource, size, leading, wrap width in characters)
+STYLES = {
+    "title": ("F2", 18, 26, 48),
+    "heading": ("F2", 12, 18, 80),
+    "body": ("F1", 10, 14, 95),
+}
+
+Block = Tuple[str, str]  # (style, text)
+
+
+def _escape(text: str) -> str:
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _layout(blocks: Sequence[Block]) -> List[List[Tuple[str, int, int, str]]]:
+    pages: List[List[Tuple[str, int, int, str]]] = [[]]
+    y = PAGE_HEIGHT - MARGIN
+    for style, text in blocks:
+        font, size, leading, width = STYLES[style]
+        lines = []
+        for paragraph in (text or "").splitlines() or [""]:
+            lines.extend(textwrap.wrap(paragraph, width) or [""])
+        for line in lines:
+            if y - leading < MARGIN:
+                pages.append([])
+                y = PAGE_HEIGHT - MARGIN
+            y -= leading
+            pages[-1].append((font, size, y, line))
+        y -= leading // 2
+    return pages
+
+
+def render_pdf(blocks: Sequence[Block]) -> bytes:
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree id is known
+    pages_id = add(b"")
+    regular = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    bold = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+    resources = f"<< /Font << /F1 {regular} 0 R /F2 {bold} 0 R >> >>".encode()
+
+    page_ids = []
+    for page in _layout(blocks):
+        stream = "\n".join(
+            f"BT /{font} {size} Tf {MARGIN} {y} Td ({_escape(line)}) Tj ET" for font, size, y, line in page
+        ).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, resources, content_id)
+        ))
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, xref,
+    )
+    return bytes(output)
@@ -0,0 +1,280 @@
+"""
+Full-text index over SOP titles, descriptions and step content.
+
+SQLite uses an FTS5 virtual table; PostgreSQL uses a side table with a
+weighted ``tsvector`` column and a GIN index. Both are kept in sync from
+SOP mapper events, so every ORM insert/update/delete reindexes the row
+inside the same transaction.
+"""
+
+import re
+import uuid
+from app.models.sop import SOP, SOPStatus
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Iterable, List, Optional
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+SNIPPET_TOKENS = 16
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_INDEXED_FIELDS = ("title", "short_description", "content", "status", "workspace_id")
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS sop_search USING fts5(
+        sop_id UNINDEXED,
+        workspace_id UNINDEXED,
+        status UNINDEXED,
+        title,
+        description,
+        body,
+        tokenize = 'porter unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """,
+]
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS sop_search (
+        sop_id UUID PRIMARY KEY REFERENCES sops(id) ON DELETE CASCADE,
+        workspace_id UUID,
+        status TEXT NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        document TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_sop_search_document ON sop_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_sop_search_workspace_status ON sop_search (workspace_id, status)",
+]
+
+
+def extract_text(content: Any) -> str:
+    """Flatten the step tree (titles, plain descriptions and rich-text nodes) into text."""
+    parts: List[str] = []
+
+    def walk(node: Any) -> None:
+        if isinstance(node, str):
+            parts.append(node)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key in ("title", "description", "text", "content", "steps", "children"):
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(content)
+    return " ".join(part.strip() for part in parts if part and part.strip())
+
+
+def tokenize(query: str) -> List[str]:
+    return _TOKEN_RE.findall(query.lower())
+
+
+def _fts_rowid(sop_id: uuid.UUID) -> int:
+    # FTS5 rows are keyed by integer rowid; deriving it from the UUID keeps
+    # reindex/delete a point lookup instead of a scan on an UNINDEXED column.
+    return sop_id.int >> 65
+
+
+def _workspace_key(workspace_id: Optional[uuid.UUID]) -> str:
+    return workspace_id.hex if workspace_id else ""
+
+
+def create_search_index(connection: Connection) -> None:
+    statements = SQLITE_DDL if connection.dialect.name == "sqlite" else POSTGRES_DDL
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def index_sop(connection: Connection, sop: SOP) -> None:
+    index_sops(connection, [sop])
+
+
+def index_sops(connection: Connection, sops: Iterable[SOP]) -> None:
+    """(Re)index many SOPs with one executemany per statement, e.g. after bulk loads."""
+    rows = []
+    for sop in sops:
+        rows.append({
+            "sop_id": sop.id,
+            "workspace_id": sop.workspace_id,
+            "status": sop.status.value if isinstance(sop.status, SOPStatus) else sop.status,
+            "title": sop.title or "",
+            "description": sop.short_description or "",
+            "body": extract_text(sop.content),
+        })
+    if not rows:
+        return
+
+    if connection.dialect.name == "sqlite":
+        for params in rows:
+            params.update(
+                rowid=_fts_rowid(params["sop_id"]),
+                sop_id=str(params["sop_id"]),
+                workspace_id=_workspace_key(params["workspace_id"]),
+            )
+        connection.execute(text("DELETE FROM sop_search WHERE rowid = :rowid"), rows)
+        connection.execute(
+            text(
+                "INSERT INTO sop_search (rowid, sop_id, workspace_id, status, title, description, body) "
+                "VALUES (:rowid, :sop_id, :workspace_id, :status, :title, :description, :body)"
+            ),
+            rows,
+        )
+        return
+
+    connection.execute(
+        text(
+            """
+            INSERT INTO sop_search (sop_id, workspace_id, status, title, description, body, document)
+            VALUES (
+                :sop_id, :workspace_id, :status, :title, :description, :body,
+                setweight(to_tsvector('english', :title), 'A')
+                || setweight(to_tsvector('english', :description), 'B')
+                || setweight(to_tsvector('english', :body), 'C')
+            )
+            ON CONFLICT (sop_id) DO UPDATE SET
+                workspace_id = EXCLUDED.workspace_id,
+                status = EXCLUDED.status,
+                title = EXCLUDED.title,
+                description = EXCLUDED.description,
+                body = EXCLUDED.body,
+                document = EXCLUDED.document
+            """
+        ),
+        rows,
+    )
+
+
+def remove_sops(connection: Connection, sop_ids: Iterable[uuid.UUID]) -> None:
+    sop_ids = list(sop_ids)
+    if not sop_ids:
+        return
+    if connection.dialect.name == "sqlite":
+        connection.execute(
+            text("DELETE FROM sop_search WHERE rowid = :rowid"),
+            [{"rowid": _fts_rowid(sop_id)} for sop_id in sop_ids],
+        )
+    else:
+        connection.execute(
+            text("DELETE FROM sop_search WHERE sop_id = :sop_id"),
+            [{"sop_id": sop_id} for sop_id in sop_ids],
+        )
+
+
+@event.listens_for(SOP, "after_insert")
+def _index_on_insert(mapper, connection: Connection, target: SOP) -> None:
+    index_sop(connection, target)
+
+
+@event.listens_for(SOP, "after_update")
+def _index_on_update(mapper, connection: Connection, target: SOP) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _INDEXED_FIELDS):
+        index_sop(connection, target)
+
+
+@event.listens_for(SOP, "after_delete")
+def _index_on_delete(mapper, connection: Connection, target: SOP) -> None:
+    remove_sops(connection, [target.id])
+
+
+async def search_sops(
+        session: AsyncSession,
+        query: str,
+        workspace_id: Optional[uuid.UUID],
+        statuses: Optional[List[SOPStatus]] = None,
+        limit: int = 20,
+        offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """Ranked, prefix-matching search; every term must match. Deleted SOPs are excluded."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    status_values = [s.value for s in statuses] if statuses else [
+        s.value for s in SOPStatus if s != SOPStatus.DELETED
+    ]
+    status_params = {f"status_{i}": value for i, value in enumerate(status_values)}
+    status_clause = ", ".join(f":{name}" for name in status_params)
+
+    if session.bind.dialect.name == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        statement = text(
+            f"""
+            SELECT sop_id, title, description, status,
+                   highlight(sop_search, 3, :hl_start, :hl_end) AS title_highlight,
+                   snippet(sop_search, -1, :hl_start, :hl_end, '…', :snippet_tokens) AS snippet,
+                   bm25(sop_search, 0.0, 0.0, 0.0, 10.0, 4.0, 1.0) AS rank
+            FROM sop_search
+            WHERE sop_search MATCH :match
+              AND workspace_id = :workspace_id
+              AND status IN ({status_clause})
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+            """
+        )
+        params: Dict[str, Any] = {"match": match, "workspace_id": _workspace_key(workspace_id)}
+    else:
+        statement = text(
+            f"""
+            SELECT hits.sop_id, hits.title, hits.description, hits.status, hits.rank,
+                   ts_headline('english', hits.title, hits.query, :title_options) AS title_highlight,
+                   ts_headline('english', hits.description || ' ' || hits.body, hits.query,
+                               :snippet_options) AS snippet
+            FROM (
+                SELECT s.sop_id, s.title, s.description, s.body, s.status, q.query,
+                       ts_rank_cd(s.document, q.query) AS rank
+                FROM sop_search s, to_tsquery('english', :match) AS q(query)
+                WHERE s.document @@ q.query
+                  AND s.workspace_id IS NOT DISTINCT FROM :workspace_id
+                  AND s.status IN ({status_clause})
+                ORDER BY rank DESC
+                LIMIT :limit OFFSET :offset
+            ) AS hits
+            ORDER BY hits.rank DESC
+            """
+        )
+        # Options are built here: asyncpg binds every parameter of a || chain as text and rejects ints.
+        selectors = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}"
+        params = {
+            "match": " & ".join(f"{term}:*" for term in terms),
+            "workspace_id": workspace_id,
+            "title_options": f"{selectors}, HighlightAll=true",
+            "snippet_options": f"{selectors}, MaxWords={SNIPPET_TOKENS}, MinWords=5",
+        }
+
+    params.update(
+        status_params,
+        hl_start=HIGHLIGHT_START,
+        hl_end=HIGHLIGHT_END,
+        snippet_tokens=SNIPPET_TOKENS,
+        limit=limit,
+        offset=offset,
+    )
+    rows = (await session.execute(statement, params)).mappings().all()
+    return [_hit(row, session.bind.dialect.name) for row in rows]
+
+
+def _hit(row, dialect: str) -> Dict[str, Any]:
+    if dialect == "sqlite":
+        # bm25() is "lower is better"; flip it so callers always sort descending.
+        rank = -row["rank"]
+        sop_id = uuid.UUID(row["sop_id"])
+    else:
+        rank = row["rank"]
+        sop_id = row["sop_id"]
+    return {
+        "id": sop_id,
+        "title": row["title"],
+        "short_description": row["description"] or None,
+        "status": row["status"],
+        "title_highlight": row["title_highlight"],
+        "snippet": row["snippet"],
+        "rank": rank,
+    }
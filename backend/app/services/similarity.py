@@ -0,0 +1,239 @@
+"""
+Near-duplicate detection for SOPs with MinHash and LSH.
+
+An SOP's step text is cut into overlapping shingles of
+``SIMILARITY_SHINGLE_SIZE`` words. The share of shingles two SOPs have in
+common (their Jaccard similarity) is estimated from MinHash signatures: for
+each of ``SIMILARITY_NUM_PERM`` hash permutations, the smallest hash of any
+shingle. Two signatures agree at a position with probability equal to the
+Jaccard similarity. NumPy computes the signatures of many SOPs at once.
+
+To avoid comparing an SOP with every other SOP of the workspace, the
+signature is split into ``SIMILARITY_BANDS`` bands and every band is hashed
+into ``sop_lsh_buckets``; SOPs sharing a bucket in any band are candidates
+and only their signatures are compared. A pair at Jaccard ``s`` becomes a
+candidate with probability ``1 - (1 - s**rows)**bands``. With 32 bands of 4
+rows that is ~99.98% at 0.7, ~95% at 0.55 and ~23% at 0.3. Below
+``MIN_THRESHOLD`` (the 95% point, 0.55 here) true matches would silently go
+missing, so lower thresholds are rejected.
+
+Like the search index, signatures are kept in sync from SOP mapper events
+inside the writing transaction. ``rebuild`` recomputes every SOP in batches
+(``python -m app.services.similarity``), which is needed after changing the
+number of permutations, bands or the shingle size.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import numpy as np
+import uuid
+import zlib
+from app.core.config import settings
+from app.models.similarity import SOPSignature, SOPSimilarityBucket
+from app.models.sop import SOP
+from app.services.search import extract_text, tokenize
+from datetime import datetime
+from sqlalchemy import delete, event, inspect, select, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_PRIME = (1 << 31) - 1
+# Columns (permutations x shingles) evaluated per NumPy step; bounds memory to ~16 MB.
+_MAX_CELLS = 1 << 21
+_INDEXED_FIELDS = ("content", "workspace_id")
+
+if settings.SIMILARITY_NUM_PERM % settings.SIMILARITY_BANDS:
+    raise ValueError("SIMILARITY_NUM_PERM must be a multiple of SIMILARITY_BANDS")
+
+_ROWS = settings.SIMILARITY_NUM_PERM // settings.SIMILARITY_BANDS
+# Lowest similarity (two decimals, rounded up) found as a candidate at least 95% of the time.
+MIN_THRESHOLD = math.ceil((1 - 0.05 ** (1 / settings.SIMILARITY_BANDS)) ** (1 / _ROWS) * 100) / 100
+
+if settings.SIMILARITY_THRESHOLD < MIN_THRESHOLD:
+    raise ValueError(f"SIMILARITY_THRESHOLD is below the LSH recall floor {MIN_THRESHOLD}; use more bands")
+
+
+def _permutations(count: int):
+    # Derived from a hash rather than an RNG so signatures stay comparable across NumPy versions.
+    def draw(label: str) -> int:
+        return int.from_bytes(hashlib.blake2b(label.encode(), digest_size=8).digest(), "little") % (_PRIME - 1) + 1
+    a = np.array([draw(f"a{index}") for index in range(count)], dtype=np.uint64)
+    b = np.array([draw(f"b{index}") for index in range(count)], dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+_A, _B = _permutations(settings.SIMILARITY_NUM_PERM)
+
+
+def shingle_hashes(content: Any, size: int = settings.SIMILARITY_SHINGLE_SIZE) -> np.ndarray:
+    """Distinct hashes of the ``size``-word shingles of the step text (a shorter text is one shingle)."""
+    words = tokenize(extract_text(content))
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    shingles = [" ".join(words[index:index + size]) for index in range(max(len(words) - size + 1, 1))]
+    return np.unique(np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64))
+
+
+def signatures(documents: Sequence[np.ndarray]) -> List[Optional[np.ndarray]]:
+    """MinHash signature (uint32 per permutation) of each shingle set; None for empty ones."""
+    result: List[Optional[np.ndarray]] = [None] * len(documents)
+    chunk: List[int] = []
+    cells = 0
+
+    def flush() -> None:
+        hashes = np.concatenate([documents[index] for index in chunk])
+        offsets = np.cumsum([0] + [len(documents[index]) for index in chunk[:-1]])
+        values = (_A * hashes[None, :] + _B) % _PRIME
+        minima = np.minimum.reduceat(values, offsets, axis=1).astype(np.uint32)
+        for column, index in enumerate(chunk):
+            result[index] = minima[:, column]
+
+    for index, document in enumerate(documents):
+        if not len(document):
+            continue
+        if chunk and cells + len(document) * len(_A) > _MAX_CELLS:
+            flush()
+            chunk, cells = [], 0
+        chunk.append(index)
+        cells += len(document) * len(_A)
+    if chunk:
+        flush()
+    return result
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket per band."""
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in signature.astype("<u4").reshape(settings.SIMILARITY_BANDS, -1)
+    ]
+
+
+def _unpack(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4")
+
+
+def remove_sops(connection: Connection, sop_ids: Iterable[uuid.UUID]) -> None:
+    sop_ids = list(sop_ids)
+    connection.execute(delete(SOPSimilarityBucket).where(SOPSimilarityBucket.sop_id.in_(sop_ids)))
+    connection.execute(delete(SOPSignature).where(SOPSignature.sop_id.in_(sop_ids)))
+
+
+def index_sops(connection: Connection, sops: Iterable[Any]) -> None:
+    """(Re)compute signatures and buckets of ``sops`` (anything with id, workspace_id and content)."""
+    sops = list(sops)
+    if not sops:
+        return
+    documents = [shingle_hashes(sop.content) for sop in sops]
+    now = datetime.utcnow()
+    signature_rows: List[Dict[str, Any]] = []
+    bucket_rows: List[Dict[str, Any]] = []
+    for sop, document, signature in zip(sops, documents, signatures(documents)):
+        # SOPs outside a workspace, or without step text, are never reported as similar.
+        if signature is None or sop.workspace_id is None:
+            continue
+        signature_rows.append({
+            "sop_id": sop.id, "workspace_id": sop.workspace_id, "signature": signature.astype("<u4").tobytes(),
+            "shingle_count": len(document), "updated_at": now,
+        })
+        bucket_rows.extend(
+            {"workspace_id": sop.workspace_id, "band": band, "bucket": bucket, "sop_id": sop.id}
+            for band, bucket in enumerate(band_buckets(signature))
+        )
+    remove_sops(connection, [sop.id for sop in sops])
+    if signature_rows:
+        connection.execute(SOPSignature.__table__.insert(), signature_rows)
+        connection.execute(SOPSimilarityBucket.__table__.insert(), bucket_rows)
+
+
+@event.listens_for(SOP, "after_insert")
+def _index_on_insert(mapper, connection: Connection, target: SOP) -> None:
+    index_sops(connection, [target])
+
+
+@event.listens_for(SOP, "after_update")
+def _index_on_update(mapper, connection: Connection, target: SOP) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _INDEXED_FIELDS):
+        index_sops(connection, [target])
+
+
+@event.listens_for(SOP, "before_delete")
+def _remove_on_delete(mapper, connection: Connection, target: SOP) -> None:
+    remove_sops(connection, [target.id])
+
+
+async def find_similar(
+        session: AsyncSession,
+        sop_id: uuid.UUID,
+        threshold: float = settings.SIMILARITY_THRESHOLD,
+        limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """Live SOPs of the same workspace whose estimated Jaccard similarity reaches ``threshold``."""
+    own = (await session.execute(
+        select(SOPSignature.workspace_id, SOPSignature.signature).where(SOPSignature.sop_id == sop_id)
+    )).first()
+    if own is None:
+        return []
+    signature = _unpack(own.signature)
+    if len(signature) != settings.SIMILARITY_NUM_PERM:
+        return []
+    pairs = [(band, bucket) for band, bucket in enumerate(band_buckets(signature))]
+    candidates = (
+        select(SOPSimilarityBucket.sop_id)
+        .where(
+            SOPSimilarityBucket.workspace_id == own.workspace_id,
+            tuple_(SOPSimilarityBucket.band, SOPSimilarityBucket.bucket).in_(pairs),
+        )
+        .distinct()
+    )
+    rows = (await session.execute(
+        select(SOPSignature.signature, SOP.id, SOP.title, SOP.status)
+        .join(SOP, SOP.id == SOPSignature.sop_id)
+        .where(SOPSignature.sop_id.in_(candidates), SOPSignature.sop_id != sop_id, SOP.deleted_at.is_(None))
+    )).all()
+    rows = [row for row in rows if len(row.signature) == len(own.signature)]
+    if not rows:
+        return []
+    scores = (np.stack([_unpack(row.signature) for row in rows]) == signature).mean(axis=1)
+    ranked = sorted(
+        (index for index in range(len(rows)) if scores[index] >= threshold),
+        key=lambda index: -scores[index],
+    )
+    return [
+        {"id": rows[index].id, "title": rows[index].title, "status": rows[index].status,
+         "similarity": round(float(scores[index]), 3)}
+        for index in ranked[:limit]
+    ]
+
+
+async def rebuild(session_factory: async_sessionmaker, batch_size: int = settings.SIMILARITY_REBUILD_BATCH_SIZE) -> int:
+    """Recompute every SOP's signature, one transaction per batch; returns the number of SOPs."""
+    total = 0
+    after: Optional[uuid.UUID] = None
+    while True:
+        async with session_factory() as session:
+            statement = select(SOP.id, SOP.workspace_id, SOP.content).order_by(SOP.id).limit(batch_size)
+            if after is not None:
+                statement = statement.where(SOP.id > after)
+            rows = (await session.execute(statement)).all()
+            if not rows:
+                return total
+            connection = await session.connection()
+            await connection.run_sync(index_sops, rows)
+            await session.commit()
+        total += len(rows)
+        after = rows[-1].id
+        logger.info("Similarity index: %d SOPs rebuilt", total)
+
+
+if __name__ == "__main__":
+    from app.core.database import async_session_factory
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(rebuild(async_session_factory))
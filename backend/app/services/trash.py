@@ -0,0 +1,162 @@
+"""
+Permanent deletion of SOPs whose trash retention has expired.
+
+``purge_batch`` removes up to ``TRASH_PURGE_BATCH_SIZE`` expired SOPs together
+with everything that references them (versions, PDF jobs, folder links,
+comments, assignments, search and similarity index entries and dashboard
+counts) in one short transaction, found through the partial index on
+``permanent_delete_at``; checklists are kept, detached from the SOP.
+``TrashPurger`` runs batches until nothing is left, sleeping between them so
+the purge uses at most ``TRASH_PURGE_DUTY_CYCLE`` of the database time and
+ordinary requests are never queued behind one long delete.
+"""
+
+import asyncio
+import logging
+from app.core import metrics
+from app.core.config import settings
+from app.models.checklist import Checklist, SOPAssignment, SOPSnapshot
+from app.models.folder import SOPFolder
+from app.models.similarity import SOPSignature, SOPSimilarityBucket
+from app.models.sop import Comment, PDFJob, SOP, SOPVersion
+from app.services import dashboard, search
+from datetime import datetime
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+purge_run_sops = metrics.register(metrics.Histogram(
+    "trash_purge_run_sops", "SOPs permanently deleted per purge run.",
+    buckets=(0, 1, 10, 100, 1_000, 10_000, 100_000),
+))
+purge_batch_duration = metrics.register(metrics.Histogram(
+    "trash_purge_batch_seconds", "Duration of one purge transaction.",
+))
+
+# Checklists outlive their SOP (ON DELETE SET NULL); their snapshot keeps the steps.
+_DETACHED = (
+    (Checklist, Checklist.sop_id),
+    (SOPSnapshot, SOPSnapshot.sop_id),
+)
+# Children first, so foreign keys hold at every statement.
+_DEPENDENTS = (
+    (SOPAssignment, SOPAssignment.sop_id),
+    (Comment, Comment.sop_id),
+    (SOPFolder, SOPFolder.sop_id),
+    (SOPSimilarityBucket, SOPSimilarityBucket.sop_id),
+    (SOPSignature, SOPSignature.sop_id),
+    (PDFJob, PDFJob.sop_id),
+    (SOPVersion, SOPVersion.sop_id),
+)
+
+
+async def purge_batch(session: AsyncSession, now: datetime, limit: int) -> int:
+    """Delete up to ``limit`` SOPs due before ``now``; returns how many, committed."""
+    # SKIP LOCKED lets several workers purge concurrently without waiting on each
+    # other (PostgreSQL; ignored by SQLite, where writers are serialized anyway).
+    sop_ids = (await session.execute(
+        select(SOP.id)
+        .where(SOP.permanent_delete_at.is_not(None), SOP.permanent_delete_at <= now)
+        .order_by(SOP.permanent_delete_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )).scalars().all()
+    if not sop_ids:
+        await session.rollback()
+        return 0
+
+    connection = await session.connection()
+    await connection.run_sync(dashboard.remove_sops, sop_ids)
+    for model, column in _DETACHED:
+        await session.execute(update(model).where(column.in_(sop_ids)).values({column: None}))
+    for model, column in _DEPENDENTS:
+        await session.execute(delete(model).where(column.in_(sop_ids)))
+    await connection.run_sync(search.remove_sops, sop_ids)
+    await session.execute(delete(SOP).where(SOP.id.in_(sop_ids)))
+    await session.commit()
+    return len(sop_ids)
+
+
+class TrashPurger:
+    def __init__(self, interval: float, batch_size: int, duty_cycle: float, min_pause: float):
+        self.interval = interval
+        self.batch_size = max(batch_size, 1)
+        self.duty_cycle = min(max(duty_cycle, 0.01), 1.0)
+        self.min_pause = min_pause
+        self.runs = 0
+        self.purged = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._session_factory: Optional[async_sessionmaker] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    def pause_after(self, batch_seconds: float) -> float:
+        """Idle time that keeps the purge's share of wall time at ``duty_cycle``."""
+        return max(batch_seconds * (1 - self.duty_cycle) / self.duty_cycle, self.min_pause)
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Purge everything due at ``now`` (default: the start of the run), batch by batch."""
+        now = now or datetime.utcnow()
+        started = perf_counter()
+        total = batches = 0
+        while True:
+            batch_started = perf_counter()
+            async with self._session_factory() as session:
+                purged = await purge_batch(session, now, self.batch_size)
+            elapsed = perf_counter() - batch_started
+            if not purged:
+                break
+            purge_batch_duration.observe(elapsed)
+            total += purged
+            batches += 1
+            if purged < self.batch_size:
+                break
+            await asyncio.sleep(self.pause_after(elapsed))
+
+        self.runs += 1
+        self.purged += total
+        purge_run_sops.observe(total)
+        self.last_run = {
+            "finished_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "purged": total,
+            "batches": batches,
+            "seconds": round(perf_counter() - started, 3),
+        }
+        if total:
+            logger.info("Purged %d expired SOPs from the trash in %d batches", total, batches)
+        return total
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._runner = asyncio.create_task(self._run(), name="trash-purge")
+
+    async def stop(self) -> None:
+        if self._runner is None:
+            return
+        self._runner.cancel()
+        await asyncio.gather(self._runner, return_exceptions=True)
+        self._runner = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Trash purge failed")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"runs": self.runs, "purged": self.purged, "last_run": self.last_run}
+
+
+trash_purger = TrashPurger(
+    interval=settings.TRASH_PURGE_INTERVAL_SECONDS,
+    batch_size=settings.TRASH_PURGE_BATCH_SIZE,
+    duty_cycle=settings.TRASH_PURGE_DUTY_CYCLE,
+    min_pause=settings.TRASH_PURGE_MIN_PAUSE_SECONDS,
+)
+metrics.register(metrics.Gauge(
+    "trash_purged_total", "SOPs permanently deleted by this process.", lambda: trash_purger.purged, "counter",
+))
@@ -0,0 +1,196 @@
+"""
+Streaming bulk user import.
+
+Rows are parsed incrementally from the request body (CSV with a header
+row, or NDJSON), validated against ``UserImportRow`` and processed in
+batches: one set-based duplicate check, bounded-parallel password hashing
+(or invite tokens for rows without a password) and one multi-row INSERT
+per batch. Emails are stored lowercased, and no row may grant a role above
+the importing user's own.
+"""
+
+import asyncio
+import codecs
+import csv
+import json
+import uuid
+from app.core import security
+from app.core.config import settings
+from app.models.user import User, UserRole, UserStatus
+from app.schemas.user import UserImportReport, UserImportResult, UserImportRow
+from app.services import dashboard
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+CSV_TYPES = ("text/csv", "application/csv")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+_USER_COLUMNS = [column.name for column in User.__table__.columns]
+# Most privileged first, as declared
+_ROLE_RANK = {role: rank for rank, role in enumerate(UserRole)}
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+async def _iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_records(chunks: AsyncIterable[bytes], content_type: str) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one dict per CSV/NDJSON record without buffering the whole upload."""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        async for line in _iter_lines(chunks):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = {"__error__": "Malformed JSON line"}
+                yield record if isinstance(record, dict) else {"__error__": "Expected a JSON object"}
+        return
+    if media_type not in CSV_TYPES:
+        raise UnsupportedFormat(f"Unsupported content type {media_type!r}; send text/csv or application/x-ndjson")
+
+    header: Optional[List[str]] = None
+    buffered = ""
+    async for line in _iter_lines(chunks):
+        # A quoted field may contain newlines: keep reading until quotes balance.
+        buffered = f"{buffered}\n{line}" if buffered else line
+        if buffered.count('"') % 2:
+            continue
+        values = next(csv.reader([buffered]), [])
+        buffered = ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        yield {key: value.strip() for key, value in zip(header, values) if value.strip()}
+
+
+def _error_detail(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors())
+
+
+async def _hash_password(password: str, limit: asyncio.Semaphore) -> str:
+    async with limit:
+        while True:
+            try:
+                return await security.get_password_hash_async(password)
+            except security.PasswordHasherBusy as exc:
+                # Interactive logins take priority; back off instead of failing the import.
+                await asyncio.sleep(exc.retry_after)
+
+
+async def _process_batch(
+        session: AsyncSession,
+        batch: List[Tuple[int, Dict[str, Any]]],
+        workspace_id: Optional[uuid.UUID],
+        seen_emails: Set[str],
+        report: UserImportReport,
+        hash_limit: asyncio.Semaphore,
+        max_role: UserRole,
+) -> None:
+    valid: List[Tuple[int, UserImportRow]] = []
+    for row_number, record in batch:
+        if "__error__" in record:
+            report.results.append(UserImportResult(row=row_number, status="invalid", detail=record["__error__"]))
+            continue
+        try:
+            row = UserImportRow.model_validate(record)
+        except ValidationError as exc:
+            report.results.append(UserImportResult(
+                row=row_number, email=record.get("email"), status="invalid", detail=_error_detail(exc),
+            ))
+            continue
+        if _ROLE_RANK[row.role] < _ROLE_RANK[max_role]:
+            report.results.append(UserImportResult(
+                row=row_number, email=row.email, status="invalid", detail=f"role: cannot grant {row.role.value}",
+            ))
+            continue
+        if row.email in seen_emails:
+            report.results.append(UserImportResult(
+                row=row_number, email=row.email, status="duplicate", detail="Email repeated in upload",
+            ))
+            continue
+        seen_emails.add(row.email)
+        valid.append((row_number, row))
+
+    if valid:
+        existing = set((await session.execute(
+            select(User.email).where(User.email.in_([row.email for _, row in valid]))
+        )).scalars())
+        for row_number, row in [item for item in valid if item[1].email in existing]:
+            report.results.append(UserImportResult(
+                row=row_number, email=row.email, status="exists", detail="User already exists",
+            ))
+        valid = [item for item in valid if item[1].email not in existing]
+
+    hashes = await asyncio.gather(*(
+        _hash_password(row.password, hash_limit) if row.password else asyncio.sleep(0, security.UNUSABLE_PASSWORD)
+        for _, row in valid
+    ))
+
+    values: List[Dict[str, Any]] = []
+    for (row_number, row), hashed_password in zip(valid, hashes):
+        user = User(
+            **row.model_dump(exclude={"password"}),
+            workspace_id=workspace_id,
+            hashed_password=hashed_password,
+        )
+        if not row.password:
+            user.status = UserStatus.PENDING
+        values.append({column: getattr(user, column) for column in _USER_COLUMNS})
+        if row.password:
+            report.created += 1
+            report.results.append(UserImportResult(row=row_number, email=row.email, status="created"))
+        else:
+            report.invited += 1
+            report.results.append(UserImportResult(
+                row=row_number, email=row.email, status="invited",
+                invite_token=security.create_invite_token(user.id),
+            ))
+    if values:
+        await session.execute(insert(User), values)
+        connection = await session.connection()
+        await connection.run_sync(dashboard.add_users, values)
+        await session.commit()
+
+
+async def import_users(
+        session: AsyncSession,
+        records: AsyncIterable[Dict[str, Any]],
+        workspace_id: Optional[uuid.UUID],
+        max_role: UserRole,
+) -> UserImportReport:
+    """Import ``records`` into the workspace; rows may not grant a role above ``max_role``."""
+    report = UserImportReport()
+    seen_emails: Set[str] = set()
+    hash_limit = asyncio.Semaphore(settings.USER_IMPORT_HASH_CONCURRENCY)
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    row_number = 0
+    async for record in records:
+        row_number += 1
+        batch.append((row_number, record))
+        if len(batch) >= settings.USER_IMPORT_BATCH_SIZE:
+            await _process_batch(session, batch, workspace_id, seen_emails, report, hash_limit, max_role)
+            batch = []
+    if batch:
+        await _process_batch(session, batch, workspace_id, seen_emails, report, hash_limit, max_role)
+
+    report.failed = row_number - report.created - report.invited
+    report.results.sort(key=lambda result: result.row)
+    return report
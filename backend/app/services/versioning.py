@@ -0,0 +1,162 @@
+"""
+Delta-compressed SOP version history.
+
+Versions are stored as periodic full snapshots plus JSON Patch (RFC 6902
+add/remove/replace) deltas between consecutive versions. Rebuilding any
+version loads the nearest snapshot at or below it and replays the deltas
+after it, all in one query.
+"""
+
+import copy
+import json
+import uuid
+from app.core.config import settings
+from app.models.sop import SOP, SOPVersion
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+
+Patch = List[Dict[str, Any]]
+
+
+class VersionNotFound(LookupError):
+    pass
+
+
+def _escape(token: Any) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(old: Any, new: Any, path: str = "") -> Patch:
+    """JSON Patch turning ``old`` into ``new``; recurses into dicts and lists."""
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: Patch = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            else:
+                ops.extend(make_patch(old[key], value, f"{path}/{_escape(key)}"))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for index in range(common):
+            ops.extend(make_patch(old[index], new[index], f"{path}/{index}"))
+        # Remove from the end so earlier indices stay valid while applying.
+        for index in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{index}"})
+        for index in range(common, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{index}", "value": new[index]})
+        return ops
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply_patch(document: Any, patch: Patch) -> Any:
+    document = copy.deepcopy(document)
+    for op in patch:
+        tokens = [_unescape(token) for token in op["path"].split("/")[1:]]
+        if not tokens:
+            document = copy.deepcopy(op["value"])
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(op["value"])
+        elif op["op"] == "remove":
+            del parent[last]
+        else:
+            parent[last] = copy.deepcopy(op["value"])
+    return document
+
+
+def record_version(
+        session: AsyncSession,
+        sop: SOP,
+        previous_content: Optional[Dict[str, Any]],
+        created_by: Optional[uuid.UUID] = None,
+        note: Optional[str] = None,
+) -> SOPVersion:
+    """Add the history entry for ``sop.version`` (call after bumping the version)."""
+    version = SOPVersion(sop_id=sop.id, version_number=sop.version, note=note, created_by=created_by)
+    interval = max(settings.SOP_VERSION_SNAPSHOT_INTERVAL, 1)
+    delta = None if previous_content is None else make_patch(previous_content, sop.content)
+    if (
+            delta is None
+            or (sop.version - 1) % interval == 0
+            # A delta bigger than the document itself is not worth replaying.
+            or len(json.dumps(delta)) >= len(json.dumps(sop.content))
+    ):
+        version.is_snapshot = True
+        version.content = copy.deepcopy(sop.content)
+    else:
+        version.delta = delta
+    session.add(version)
+    return version
+
+
+async def reconstruct(session: AsyncSession, sop_id: uuid.UUID, version_number: int) -> Dict[str, Any]:
+    snapshot_version = (
+        select(func.max(SOPVersion.version_number))
+        .where(
+            SOPVersion.sop_id == sop_id,
+            SOPVersion.is_snapshot.is_(True),
+            SOPVersion.version_number <= version_number,
+        )
+        .scalar_subquery()
+    )
+    rows = (await session.execute(
+        select(SOPVersion.version_number, SOPVersion.content, SOPVersion.delta)
+        .where(
+            SOPVersion.sop_id == sop_id,
+            SOPVersion.version_number >= snapshot_version,
+            SOPVersion.version_number <= version_number,
+        )
+        .order_by(SOPVersion.version_number)
+    )).all()
+    if not rows or rows[-1].version_number != version_number:
+        raise VersionNotFound(f"Version {version_number} not found")
+
+    document = rows[0].content
+    for row in rows[1:]:
+        document = apply_patch(document, row.delta)
+    return document
+
+
+async def diff_versions(session: AsyncSession, sop_id: uuid.UUID, from_version: int, to_version: int) -> Patch:
+    old = await reconstruct(session, sop_id, from_version)
+    new = await reconstruct(session, sop_id, to_version)
+    return make_patch(old, new)
+
+
+async def list_versions(session: AsyncSession, sop_id: uuid.UUID, limit: int, before: Optional[int] = None):
+    """History metadata, newest first, without loading content or deltas."""
+    statement = select(
+        SOPVersion.id,
+        SOPVersion.sop_id,
+        SOPVersion.version_number,
+        SOPVersion.note,
+        SOPVersion.is_snapshot,
+        SOPVersion.created_at,
+        SOPVersion.created_by,
+    ).where(SOPVersion.sop_id == sop_id)
+    if before is not None:
+        statement = statement.where(SOPVersion.version_number < before)
+    statement = statement.order_by(SOPVersion.version_number.desc()).limit(limit)
+    return (await session.execute(statement)).mappings().all()
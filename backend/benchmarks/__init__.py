@@ -0,0 +1,15 @@
+"""
+Load and latency benchmarks for the SOP Hub API.
+
+Run from ``backend/``::
+
+    python -m benchmarks seed --scale 100k
+    python -m benchmarks run --scale 100k --mode inprocess --output results.json
+    python -m benchmarks run --scale 100k --mode uvicorn --workers 4 --baseline benchmarks/baseline.json
+    python -m benchmarks compare results.json benchmarks/baseline.json --threshold 0.1
+
+``seed`` builds a deterministic synthetic dataset (see ``seed.SCALES``),
+``run`` drives the app with concurrent closed-loop clients and writes a JSON
+report, and ``compare`` flags scenarios whose throughput or tail latency
+regressed past the threshold (non-zero exit status).
+"""
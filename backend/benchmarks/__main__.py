@@ -0,0 +1,201 @@
+"""
+Command line entry point: ``python -m benchmarks {seed,run,compare}``.
+"""
+
+import argparse
+import asyncio
+import httpx
+import os
+import platform
+import socket
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+BACKEND_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = BACKEND_ROOT / "benchmarks" / ".data"
+
+
+def _default_url(scale: str) -> str:
+    return f"sqlite+aiosqlite:///{DATA_DIR / f'bench-{scale}.db'}"
+
+
+def _configure(args: argparse.Namespace) -> None:
+    # Settings are read at import time, so the app must only be imported after this.
+    args.database_url = args.database_url or _default_url(args.scale)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("PDF_WORKER_ENABLED", "false")
+    if str(BACKEND_ROOT) not in sys.path:
+        sys.path.insert(0, str(BACKEND_ROOT))
+
+
+async def _ensure_seeded(args: argparse.Namespace) -> None:
+    from benchmarks.seed import SCALES, seed, seeded_count
+
+    scale = SCALES[args.scale]
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    existing = await seeded_count(args.database_url)
+    if existing == scale.sops:
+        return
+    if existing:
+        raise SystemExit(f"{args.database_url} holds {existing} SOPs, expected {scale.sops}; drop it first")
+    print(f"Seeding {scale.name} dataset into {args.database_url}")
+    await seed(args.database_url, scale)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def _in_process() -> AsyncIterator[httpx.AsyncClient]:
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://bench",
+        ) as http:
+            yield http
+    finally:
+        await app.router.shutdown()
+
+
+@asynccontextmanager
+async def _uvicorn(concurrency: int, workers: int) -> AsyncIterator[httpx.AsyncClient]:
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_ROOT,
+        env={**os.environ, "PYTHONPATH": str(BACKEND_ROOT)},
+    )
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as http:
+            for _ in range(300):
+                if server.poll() is not None:
+                    raise SystemExit("uvicorn exited during startup")
+                try:
+                    if (await http.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise SystemExit("uvicorn did not become healthy within 30s")
+            yield http
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def _run(args: argparse.Namespace) -> int:
+    from benchmarks import load, report
+    from benchmarks.seed import SCALES
+
+    await _ensure_seeded(args)
+    scale = SCALES[args.scale]
+    names: List[str] = args.scenarios or list(load.SCENARIOS)
+    client = _uvicorn(args.concurrency, args.workers) if args.mode == "uvicorn" else _in_process()
+
+    result = {
+        "meta": {
+            "scale": scale.name,
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else 1,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "database": args.database_url.split("://", 1)[0],
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "commit": _git_commit(),
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        },
+        "scenarios": {},
+    }
+    async with client as http:
+        clients = await load.authenticate(http, scale, args.concurrency)
+        for name in names:
+            samples = await load.drive(http, load.SCENARIOS[name], clients, args.duration, args.warmup)
+            result["scenarios"][name] = report.summarize(samples.latencies_ms, samples.errors, samples.elapsed)
+            print(f"{name}: {result['scenarios'][name]['rps']} req/s", file=sys.stderr)
+
+    print(report.format_table(result))
+    if args.output:
+        report.save(result, args.output)
+    if args.baseline:
+        return _report_regressions(result, report.load(args.baseline), args.threshold)
+    return 0
+
+
+def _report_regressions(result, baseline, threshold: float) -> int:
+    from benchmarks import report
+
+    regressions = report.compare(result, baseline, threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_ROOT, capture_output=True, text=True,
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def dataset_options(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--scale", choices=("1k", "100k", "1m"), default="1k")
+        command.add_argument("--database-url", help="defaults to a SQLite file under benchmarks/.data/")
+
+    seed_command = commands.add_parser("seed", help="create the synthetic dataset")
+    dataset_options(seed_command)
+
+    run_command = commands.add_parser("run", help="seed if needed, then measure every scenario")
+    dataset_options(run_command)
+    run_command.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    run_command.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    run_command.add_argument("--concurrency", type=int, default=16)
+    run_command.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    run_command.add_argument("--warmup", type=float, default=2.0)
+    run_command.add_argument("--scenario", dest="scenarios", action="append", help="repeatable; default all")
+    run_command.add_argument("--output", type=Path, help="write the JSON result here")
+    run_command.add_argument("--baseline", type=Path, help="fail on regressions against this result")
+    run_command.add_argument("--threshold", type=float, default=0.10)
+
+    compare_command = commands.add_parser("compare", help="check a result against a baseline")
+    compare_command.add_argument("result", type=Path)
+    compare_command.add_argument("baseline", type=Path)
+    compare_command.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        sys.path.insert(0, str(BACKEND_ROOT))
+        from benchmarks import report
+        return _report_regressions(report.load(args.result), report.load(args.baseline), args.threshold)
+
+    _configure(args)
+    if args.command == "seed":
+        asyncio.run(_ensure_seeded(args))
+        return 0
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
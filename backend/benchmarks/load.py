@@ -0,0 +1,125 @@
+"""
+Closed-loop load driver.
+
+``concurrency`` clients each issue one request at a time for ``duration``
+seconds after a warm-up. Scenarios run one after another against the same
+client, so their numbers are comparable between runs on the same machine.
+"""
+
+import asyncio
+import httpx
+import random
+from benchmarks.seed import PASSWORD, Scale, VOCABULARY, user_email
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, List, Optional
+
+API = "/api/v1"
+
+
+@dataclass
+class Client:
+    """Per-connection state a scenario may carry between requests."""
+    rng: random.Random
+    email: str
+    headers: Dict[str, str]
+    cursor: Optional[str] = None
+    pages: int = 0
+
+
+@dataclass
+class Samples:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+
+Scenario = Callable[[httpx.AsyncClient, Client], Awaitable[httpx.Response]]
+
+
+async def login(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    return await http.post(f"{API}/login/access-token", data={"username": client.email, "password": PASSWORD})
+
+
+async def users_me(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    return await http.get(f"{API}/users/me", headers=client.headers)
+
+
+async def sop_list(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    # Walk up to 10 pages deep with the keyset cursor, then start over.
+    params = {"limit": 50}
+    if client.cursor:
+        params["cursor"] = client.cursor
+    response = await http.get(f"{API}/sops/", params=params, headers=client.headers)
+    if response.status_code == 200:
+        client.pages += 1
+        client.cursor = response.json()["next_cursor"] if client.pages < 10 else None
+        if client.cursor is None:
+            client.pages = 0
+    return response
+
+
+async def sop_search(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    query = " ".join(client.rng.sample(VOCABULARY, client.rng.randint(1, 2)))
+    return await http.get(f"{API}/sops/search", params={"q": query}, headers=client.headers)
+
+
+async def folder_tree(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    return await http.get(f"{API}/folders/tree", headers=client.headers)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "login": login,
+    "users_me": users_me,
+    "sop_list": sop_list,
+    "sop_search": sop_search,
+    "folder_tree": folder_tree,
+}
+
+
+async def authenticate(http: httpx.AsyncClient, scale: Scale, concurrency: int, seed: int = 7) -> List[Client]:
+    """One logged-in client per connection, spread over users of the first workspace."""
+    clients = []
+    for index in range(concurrency):
+        email = user_email(0, index % scale.users_per_workspace)
+        client = Client(rng=random.Random(seed + index), email=email, headers={})
+        response = await login(http, client)
+        response.raise_for_status()
+        client.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        clients.append(client)
+    return clients
+
+
+async def drive(
+        http: httpx.AsyncClient,
+        scenario: Scenario,
+        clients: List[Client],
+        duration: float,
+        warmup: float,
+) -> Samples:
+    samples = Samples()
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup
+    stop_at = measure_from + duration
+
+    async def worker(client: Client) -> None:
+        while True:
+            started = perf_counter()
+            if loop.time() >= stop_at:
+                return
+            try:
+                response = await scenario(http, client)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if loop.time() < measure_from:
+                continue
+            if failed:
+                samples.errors += 1
+            else:
+                samples.latencies_ms.append((perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker(client) for client in clients))
+    # Requests in flight at the deadline still complete and are counted.
+    samples.elapsed = loop.time() - measure_from
+    return samples
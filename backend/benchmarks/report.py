@@ -0,0 +1,74 @@
+"""
+Result summaries and baseline comparison.
+
+A result file is JSON: ``{"meta": {...}, "scenarios": {name: summary}}``
+where each summary holds ``requests``, ``errors``, ``rps`` and latency
+percentiles in milliseconds.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+PERCENTILES = (50, 95, 99)
+# Metrics compared against the baseline: (key, True if higher is better)
+COMPARED = (("rps", True), ("p95_ms", False), ("p99_ms", False))
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ms: Sequence[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies_ms)
+    summary: Dict[str, Any] = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = round(percentile(latencies, p), 2)
+    return summary
+
+
+def load(path: Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def save(result: Dict[str, Any], path: Path) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(result, indent=2, sort_keys=True) + "\n")
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions beyond ``threshold`` (a fraction, e.g. 0.1 for 10%) as readable lines."""
+    regressions = []
+    for name, current in result["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if current["errors"] > previous.get("errors", 0) and current["errors"] > 0:
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+        for key, higher_is_better in COMPARED:
+            old, new = previous.get(key), current.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{name}: {key} {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def format_table(result: Dict[str, Any]) -> str:
+    columns = ("requests", "errors", "rps") + tuple(f"p{p}_ms" for p in PERCENTILES)
+    lines = [f"{'scenario':<12}" + "".join(f"{column:>10}" for column in columns)]
+    for name, summary in result["scenarios"].items():
+        lines.append(f"{name:<12}" + "".join(f"{summary[column]:>10}" for column in columns))
+    return "\n".join(lines)
@@ -0,0 +1,229 @@
+"""
+Deterministic synthetic dataset for the benchmarks.
+
+Rows are generated from a seeded RNG and written with Core executemany
+batches (no ORM unit of work), then indexed for search and similarity and
+counted for the dashboard in bulk, so even the 1M-SOP scale loads in
+minutes. Every user's password is ``PASSWORD``.
+"""
+
+import random
+import uuid
+from app.core import security
+from app.core.database import create_engine
+from app.models.folder import Folder, SOPFolder
+from app.models.sop import DifficultyLevel, SOP, SOPStatus
+from app.models.user import User, UserRole, UserStatus
+from app.models.workspace import Workspace
+from app.services import dashboard, similarity
+from app.services.folders import child_path
+from app.services.search import create_search_index, index_sops
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import SQLModel
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PASSWORD = "benchmark"
+BATCH_SIZE = 5000
+EPOCH = datetime(2026, 1, 1)
+
+VOCABULARY = (
+    "safety inspection forklift onboarding invoice backup restore deploy audit checklist "
+    "sanitize calibrate escalate incident payroll warehouse shipping refund rotate credentials "
+    "lockout tagout firmware upgrade quarterly review vendor contract kitchen hygiene "
+    "emergency evacuation badge access printer network outage database migration"
+).split()
+
+
+@dataclass(frozen=True)
+class Scale:
+    name: str
+    sops: int
+    workspaces: int
+    users_per_workspace: int
+    folder_depth: int
+    folder_fanout: int
+
+
+SCALES = {
+    scale.name: scale for scale in (
+        Scale("1k", sops=1_000, workspaces=2, users_per_workspace=25, folder_depth=4, folder_fanout=3),
+        Scale("100k", sops=100_000, workspaces=10, users_per_workspace=200, folder_depth=6, folder_fanout=3),
+        Scale("1m", sops=1_000_000, workspaces=50, users_per_workspace=400, folder_depth=8, folder_fanout=3),
+    )
+}
+
+
+def user_email(workspace_index: int, user_index: int) -> str:
+    return f"user{user_index}@ws{workspace_index}.example.com"
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _phrase(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def _content(rng: random.Random) -> Dict[str, Any]:
+    steps = []
+    for order in range(1, rng.randint(3, 8) + 1):
+        steps.append({
+            "id": str(_uuid(rng)),
+            "order": order,
+            "title": _phrase(rng, 3).capitalize(),
+            "description": {"root": {"children": [{"type": "text", "text": _phrase(rng, 20)}]}},
+        })
+    return {"steps": steps}
+
+
+def _folders(rng: random.Random, workspace_id: uuid.UUID, scale: Scale) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    level: List[Optional[Folder]] = [None]
+    for depth in range(scale.folder_depth):
+        next_level = []
+        for parent in level:
+            for _ in range(scale.folder_fanout):
+                folder = Folder(
+                    id=_uuid(rng), name=_phrase(rng, 2).title(), workspace_id=workspace_id,
+                    parent_id=parent.id if parent else None, depth=depth,
+                )
+                folder.path = child_path(parent, folder.id)
+                next_level.append(folder)
+                rows.append({
+                    "id": folder.id, "name": folder.name, "workspace_id": workspace_id,
+                    "parent_id": folder.parent_id, "path": folder.path, "depth": depth,
+                    "created_at": EPOCH, "updated_at": EPOCH,
+                })
+        level = next_level
+    return rows
+
+
+def _sops(
+        rng: random.Random,
+        count: int,
+        workspace_id: uuid.UUID,
+        authors: List[uuid.UUID],
+        folder_ids: List[uuid.UUID],
+) -> Iterator[List[Tuple[SOP, uuid.UUID]]]:
+    """Batches of (SOP, folder id it is filed in)."""
+    statuses = list(SOPStatus)
+    weights = [60 if status == SOPStatus.PUBLISHED else 10 for status in statuses]
+    batch: List[Tuple[SOP, uuid.UUID]] = []
+    for _ in range(count):
+        updated_at = EPOCH + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        content = _content(rng)
+        status = rng.choices(statuses, weights)[0]
+        sop = SOP(
+            id=_uuid(rng),
+            title=_phrase(rng, 4).capitalize(),
+            short_description=_phrase(rng, 12),
+            content=content,
+            step_count=len(content["steps"]),
+            status=status,
+            difficulty=rng.choice(list(DifficultyLevel)),
+            version=rng.randint(1, 5),
+            workspace_id=workspace_id,
+            created_by=rng.choice(authors),
+            created_at=updated_at - timedelta(days=rng.randint(0, 90)),
+            updated_at=updated_at,
+            deleted_at=updated_at if status == SOPStatus.DELETED else None,
+        )
+        batch.append((sop, rng.choice(folder_ids)))
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_SOP_COLUMNS = [column.name for column in SOP.__table__.columns]
+
+
+async def seed(url: str, scale: Scale, rng_seed: int = 42, log=print) -> None:
+    """Create the schema at ``url`` and fill it for ``scale`` (the database must be empty)."""
+    rng = random.Random(rng_seed)
+    engine = create_engine(url)
+    hashed_password = security.get_password_hash(PASSWORD)
+    started = perf_counter()
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+            await conn.run_sync(create_search_index)
+
+        per_workspace = [scale.sops // scale.workspaces] * scale.workspaces
+        per_workspace[0] += scale.sops - sum(per_workspace)
+        for index, sop_count in enumerate(per_workspace):
+            async with engine.begin() as conn:
+                await _seed_workspace(conn, rng, scale, index, sop_count, hashed_password)
+            log(f"workspace {index + 1}/{scale.workspaces}: {sop_count} SOPs ({perf_counter() - started:.0f}s)")
+    finally:
+        await engine.dispose()
+
+
+async def _seed_workspace(
+        conn: AsyncConnection,
+        rng: random.Random,
+        scale: Scale,
+        index: int,
+        sop_count: int,
+        hashed_password: str,
+) -> None:
+    workspace_id = _uuid(rng)
+    await conn.execute(Workspace.__table__.insert(), [{
+        "id": workspace_id, "name": f"Bench workspace {index}", "slug": f"bench-{index}",
+        "created_at": EPOCH, "updated_at": EPOCH,
+    }])
+
+    users = []
+    for user_index in range(scale.users_per_workspace):
+        users.append({
+            "id": _uuid(rng), "email": user_email(index, user_index),
+            "first_name": "Bench", "last_name": f"User {user_index}",
+            "is_active": True, "role": UserRole.ADMIN if user_index == 0 else UserRole.MEMBER,
+            "status": UserStatus.ACTIVE, "workspace_id": workspace_id,
+            "hashed_password": hashed_password, "login_count": 0,
+            "created_at": EPOCH, "updated_at": EPOCH,
+        })
+    await conn.execute(User.__table__.insert(), users)
+    await conn.run_sync(dashboard.add_users, users)
+
+    folders = _folders(rng, workspace_id, scale)
+    await conn.execute(Folder.__table__.insert(), folders)
+
+    authors = [user["id"] for user in users]
+    # SOPs are filed into the deepest folders, like a real nested hierarchy.
+    leaves = [folder["id"] for folder in folders if folder["depth"] == scale.folder_depth - 1]
+    for batch in _sops(rng, sop_count, workspace_id, authors, leaves):
+        sops = [sop for sop, _ in batch]
+        await conn.execute(
+            SOP.__table__.insert(),
+            [{name: getattr(sop, name) for name in _SOP_COLUMNS} for sop in sops],
+        )
+        await conn.execute(
+            SOPFolder.__table__.insert(),
+            [{"sop_id": sop.id, "folder_id": folder_id} for sop, folder_id in batch],
+        )
+        await conn.run_sync(index_sops, sops)
+        await conn.run_sync(similarity.index_sops, sops)
+        deltas = dashboard.Deltas()
+        for sop, folder_id in batch:
+            dashboard.sop_deltas(
+                deltas, workspace_id, sop.status, sop.difficulty, sop.deleted_at is None, [folder_id], 1,
+            )
+        await conn.run_sync(dashboard.apply_deltas, deltas)
+
+
+async def seeded_count(url: str) -> int:
+    """Number of SOPs already at ``url`` (0 if the schema does not exist yet)."""
+    engine = create_engine(url)
+    try:
+        async with engine.connect() as conn:
+            has_table = await conn.run_sync(lambda sync: sync.dialect.has_table(sync, SOP.__tablename__))
+            return await conn.scalar(select(func.count()).select_from(SOP)) if has_table else 0
+    finally:
+        await engine.dispose()
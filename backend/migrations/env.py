@@ -0,0 +1,79 @@
+"""
+Alembic environment.
+
+Runs against ``settings.DATABASE_URL`` from the command line
+(``alembic upgrade head``), or on a connection handed over in
+``config.attributes["connection"]`` when the app migrates itself at startup.
+"""
+
+import asyncio
+from alembic import context
+from app.core.config import settings
+from app.models import checklist, dashboard, folder, outbox, similarity, sop, user, workspace  # noqa: F401  (registers every table)
+from logging.config import fileConfig
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = SQLModel.metadata
+
+
+def include_name(name, type_, parent_names) -> bool:
+    # The search index (FTS5 / tsvector side table) is raw DDL owned by app.services.search.
+    return not (type_ == "table" and name.startswith("sop_search"))
+
+
+def _database_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or settings.DATABASE_URL
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=_database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    # Batch mode lets ALTER-style operations work on SQLite by recreating the table.
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    from app.core.database import create_engine
+
+    connectable = create_engine(_database_url())
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+        await connection.commit()
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+    else:
+        asyncio.run(run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
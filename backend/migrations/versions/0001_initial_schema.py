@@ -0,0 +1,203 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 18:10:44.621442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from app.services.search import create_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def schema() -> sa.MetaData:
+    """The tables as of this revision; also used to adopt databases created before migrations."""
+    metadata = sa.MetaData()
+    sa.Table('workspaces', metadata,
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('slug', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('logo_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('size', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_workspaces_name', 'name', unique=False),
+    sa.Index('ix_workspaces_slug', 'slug', unique=True),
+    )
+    sa.Table('folders', metadata,
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('color', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('is_open', sa.Boolean(), nullable=False),
+    sa.Column('parent_id', sqlmodel.sql.sqltypes.GUID(), nullable=True),
+    sa.Column('workspace_id', sqlmodel.sql.sqltypes.GUID(), nullable=True),
+    sa.Column('id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('path', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['parent_id'], ['folders.id'], ),
+    sa.ForeignKeyConstraint(['workspace_id'], ['workspaces.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_folders_name', 'name', unique=False),
+    sa.Index('ix_folders_workspace_path', 'workspace_id', 'path', unique=False),
+    )
+    sa.Table('users', metadata,
+    sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('first_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('last_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('role', sa.Enum('SUPER_ADMIN', 'ADMIN', 'MANAGER', 'MEMBER', name='userrole'), nullable=False),
+    sa.Column('status', sa.Enum('ACTIVE', 'PENDING', 'DEACTIVATED', 'SUSPENDED', name='userstatus'), nullable=False),
+    sa.Column('job_title', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('department', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('phone', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('timezone', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('avatar_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('workspace_id', sqlmodel.sql.sqltypes.GUID(), nullable=True),
+    sa.Column('manager_id', sqlmodel.sql.sqltypes.GUID(), nullable=True),
+    sa.Column('id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('hashed_password', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('last_active_at', sa.DateTime(), nullable=True),
+    sa.Column('login_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['manager_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['workspace_id'], ['workspaces.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_users_email', 'email', unique=True),
+    )
+    sa.Table('sops', metadata,
+    sa.Column('title', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('short_description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('content', sa.JSON(), nullable=True),
+    sa.Column('step_count', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('DRAFT', 'PENDING_APPROVAL', 'APPROVED', 'PUBLISHED', 'REJECTED', 'ARCHIVED', 'DELETED', name='sopstatus'), nullable=False),
+    sa.Column('difficulty', sa.Enum('BEGINNER', 'INTERMEDIATE', 'ADVANCED', name='difficultylevel'), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('estimated_time', sa.Integer(), nullable=True),
+    sa.Column('cover_image_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('workspace_id', sqlmodel.sql.sqltypes.GUID(), nullable=True),
+    sa.Column('created_by', sqlmodel.sql.sqltypes.GUID(), nullable=True),
+    sa.Column('rejection_reason', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('active_approval_request_id', sqlmodel.sql.sqltypes.GUID(), nullable=True),
+    sa.Column('id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('submitted_at', sa.DateTime(), nullable=True),
+    sa.Column('approved_at', sa.DateTime(), nullable=True),
+    sa.Column('published_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_by_id', sqlmodel.sql.sqltypes.GUID(), nullable=True),
+    sa.Column('delete_reason', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('permanent_delete_at', sa.DateTime(), nullable=True),
+    sa.Column('pdf_status', sa.Enum('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', name='pdfgenerationstatus'), nullable=True),
+    sa.Column('pdf_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('pdf_content_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['deleted_by_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['workspace_id'], ['workspaces.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_sops_status', 'status', unique=False),
+    sa.Index('ix_sops_title', 'title', unique=False),
+    sa.Index('ix_sops_workspace_status_updated', 'workspace_id', 'status', 'updated_at', 'id', unique=False, postgresql_include=['title', 'step_count', 'version', 'difficulty']),
+    sa.Index('ix_sops_workspace_updated', 'workspace_id', 'updated_at', 'id', unique=False),
+    )
+    sa.Table('pdf_jobs', metadata,
+    sa.Column('id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('sop_id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', name='pdfgenerationstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('render_ms', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['sop_id'], ['sops.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_pdf_jobs_sop_id', 'sop_id', unique=False),
+    sa.Index('ix_pdf_jobs_status_created', 'status', 'created_at', unique=False),
+    )
+    sa.Table('sop_folders', metadata,
+    sa.Column('sop_id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('folder_id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.ForeignKeyConstraint(['folder_id'], ['folders.id'], ),
+    sa.ForeignKeyConstraint(['sop_id'], ['sops.id'], ),
+    sa.PrimaryKeyConstraint('sop_id', 'folder_id'),
+    sa.Index('ix_sop_folders_folder_id', 'folder_id', unique=False),
+    )
+    sa.Table('sop_versions', metadata,
+    sa.Column('id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('sop_id', sqlmodel.sql.sqltypes.GUID(), nullable=False),
+    sa.Column('version_number', sa.Integer(), nullable=False),
+    sa.Column('note', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('is_snapshot', sa.Boolean(), nullable=False),
+    sa.Column('content', sa.JSON(), nullable=True),
+    sa.Column('delta', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('created_by', sqlmodel.sql.sqltypes.GUID(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['sop_id'], ['sops.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_sop_versions_sop_version', 'sop_id', 'version_number', unique=True),
+    )
+    return metadata
+
+
+def upgrade() -> None:
+    schema().create_all(op.get_bind())
+    create_search_index(op.get_bind())
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS sop_search")
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('sop_versions', schema=None) as batch_op:
+        batch_op.drop_index('ix_sop_versions_sop_version')
+
+    op.drop_table('sop_versions')
+    with op.batch_alter_table('sop_folders', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sop_folders_folder_id'))
+
+    op.drop_table('sop_folders')
+    with op.batch_alter_table('pdf_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_pdf_jobs_status_created')
+        batch_op.drop_index(batch_op.f('ix_pdf_jobs_sop_id'))
+
+    op.drop_table('pdf_jobs')
+    with op.batch_alter_table('sops', schema=None) as batch_op:
+        batch_op.drop_index('ix_sops_workspace_updated')
+        batch_op.drop_index('ix_sops_workspace_status_updated', postgresql_include=['title', 'step_count', 'version', 'difficulty'])
+        batch_op.drop_index(batch_op.f('ix_sops_title'))
+        batch_op.drop_index(batch_op.f('ix_sops_status'))
+
+    op.drop_table('sops')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
+    with op.batch_alter_table('folders', schema=None) as batch_op:
+        batch_op.drop_index('ix_folders_workspace_path')
+        batch_op.drop_index(batch_op.f('ix_folders_name'))
+
+    op.drop_table('folders')
+    with op.batch_alter_table('workspaces', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_workspaces_slug'))
+        batch_op.drop_index(batch_op.f('ix_workspaces_name'))
+
+    op.drop_table('workspaces')
+    # ### end Alembic commands ###
+    for enum_name in ('userrole', 'userstatus', 'sopstatus', 'difficultylevel', 'pdfgenerationstatus'):
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,30 @@
+"""folder path byte collation
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 19:01:42.950850
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite already compares bytes; PostgreSQL rebuilds ix_folders_workspace_path with the new collation.
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column('folders', 'path', type_=sa.String(collation='C'), existing_nullable=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column('folders', 'path', type_=sqlmodel.sql.sqltypes.AutoString(), existing_nullable=False)
@@ -0,0 +1,49 @@
+"""normalize user emails
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 19:14:31.095325
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+users = sa.table(
+    'users',
+    sa.column('id', sqlmodel.sql.sqltypes.GUID()),
+    sa.column('email', sqlmodel.sql.sqltypes.AutoString()),
+)
+
+
+def upgrade() -> None:
+    # Normalized like app.models.user.normalize_email; in Python, since SQLite's lower() is ASCII-only.
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(users.c.id, users.c.email)).all()
+    owners = {}
+    for row in rows:
+        owners.setdefault(row.email.strip().lower(), []).append(row.email)
+    clashes = sorted(", ".join(emails) for emails in owners.values() if len(emails) > 1)
+    if clashes:
+        raise RuntimeError(f"Users whose emails differ only in case must be merged first: {'; '.join(clashes)}")
+    for row in rows:
+        if row.email != row.email.strip().lower():
+            bind.execute(users.update().where(users.c.id == row.id).values(email=row.email.strip().lower()))
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_check_constraint('ck_users_email_normalized', 'email = lower(trim(email))')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_users_email_normalized', type_='check')
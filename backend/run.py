@@ -1,37 +1,135 @@
 """
 SOP Hub Backend - Startup Script
+
+``python run.py`` serves according to ``SERVER_MODE`` (see ``app/core/config.py``);
+``--mode`` overrides it for one run.
 """
+import argparse
+import asyncio
+import atexit
 import os
+import subprocess
 import sys
 from pathlib import Path
 
 
-def main():
-    backend_root = Path(__file__).parent.resolve()
-    os.chdir(backend_root)
-    if str(backend_root) not in sys.path:
-        sys.path.insert(0, str(backend_root))
-    os.environ["PYTHONPATH"] = str(backend_root)
+def banner(lines) -> None:
+    width = max(len(line) for line in lines) + 2
+    print("╔" + "═" * width + "╗")
+    for line in lines:
+        print("║ " + line.ljust(width - 1) + "║")
+    print("╚" + "═" * width + "╝")
+
 
+def serve_development(settings) -> None:
     import uvicorn
 
-    print(
-        """
-╔════════════════════════════════════════════════╗
-║ SOP Hub Backend                                ║
-║ Running: http://0.0.0.0:8000                   ║
-╚════════════════════════════════════════════════╝
-"""
+    banner([
+        "SOP Hub Backend (development, auto-reload)",
+        f"Running: http://{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+    ])
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        reload=True,
+        log_level=settings.SERVER_LOG_LEVEL,
     )
 
+
+async def migrate_once() -> None:
+    # Run pending migrations in the master so workers booting in parallel never race
+    # on DDL; their own startup check then finds the schema current.
+    from app.core.database import engine, init_db
+
+    await init_db()
+    await engine.dispose()
+
+
+def start_event_relay(settings) -> bool:
+    # Workers reach each other's push-channel clients through this relay; it lives
+    # as long as the master. tcp:// brokers are expected to be run separately.
+    url = settings.REALTIME_BROKER_URL
+    if not settings.REALTIME_ENABLED or not url.startswith("unix://"):
+        return False
+    relay = subprocess.Popen([sys.executable, "-m", "app.core.events", url])
+    atexit.register(relay.terminate)
+    return True
+
+
+def serve_production(settings) -> None:
+    from app.core import server
+
+    asyncio.run(migrate_once())
+    relay = start_event_relay(settings)
+    options = server.uvicorn_options()
+    supervisor = "gunicorn" if hasattr(server, "UvicornWorker") else "uvicorn"
+    banner([
+        "SOP Hub Backend (production)",
+        f"Running: http://{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        f"{server.worker_count()} workers via {supervisor}, loop={options['loop']}, http={options['http']}",
+        *([f"Event relay: {settings.REALTIME_BROKER_URL}"] if relay else []),
+    ])
+    if supervisor == "gunicorn":
+        run_gunicorn(server.gunicorn_options())
+    else:
+        run_uvicorn(settings, server.worker_count(), options)
+
+
+def run_gunicorn(options: dict) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+
+            return app
+
+    Application().run()
+
+
+def run_uvicorn(settings, workers: int, options: dict) -> None:
+    import uvicorn
+
+    if settings.SERVER_MAX_REQUESTS:
+        # uvicorn's supervisor does not replace exited workers, so recycling would
+        # shrink the pool until nothing serves. (Its spawned workers cannot share a
+        # preloaded app either.)
+        print("Worker recycling (SERVER_MAX_REQUESTS) needs gunicorn; disabled")
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        log_level=settings.SERVER_LOG_LEVEL,
+        **options,
     )
 
 
+def main(argv=None):
+    backend_root = Path(__file__).parent.resolve()
+    os.chdir(backend_root)
+    if str(backend_root) not in sys.path:
+        sys.path.insert(0, str(backend_root))
+    os.environ["PYTHONPATH"] = str(backend_root)
+
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Run the SOP Hub backend")
+    parser.add_argument("--mode", choices=("development", "production"), default=settings.SERVER_MODE)
+    args = parser.parse_args(argv)
+
+    if args.mode == "production":
+        serve_production(settings)
+    else:
+        serve_development(settings)
+
+
 if __name__ == "__main__":
     main()
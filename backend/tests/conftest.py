@@ -0,0 +1,54 @@
+import pytest
+import pytest_asyncio
+import uuid
+from app.models.user import User, UserStatus
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+
+
+@pytest_asyncio.fixture
+async def engine():
+    """Fresh in-memory SQLite database with every model table created"""
+    import app.models.checklist  # noqa: F401  (registers the tables on SQLModel.metadata)
+    import app.models.dashboard  # noqa: F401
+    import app.models.folder  # noqa: F401
+    import app.models.outbox  # noqa: F401
+    import app.models.similarity  # noqa: F401
+    import app.models.user  # noqa: F401
+    from app.services.search import create_search_index
+
+    test_engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with test_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(create_search_index)
+    yield test_engine
+    await test_engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session(engine):
+    """Session bound to the in-memory test database"""
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+        yield db
+
+
+@pytest.fixture
+def make_user():
+    """Factory for unsaved active users with unique emails; any field can be overridden"""
+    def make(**overrides) -> User:
+        values = {
+            "id": uuid.uuid4(),
+            "email": f"{uuid.uuid4().hex}@example.com",
+            "first_name": "Test",
+            "last_name": "User",
+            "hashed_password": "x",
+            "status": UserStatus.ACTIVE,
+        }
+        values.update(overrides)
+        return User(**values)
+    return make
@@ -0,0 +1,120 @@
+"""
+Write-behind user activity tracking
+"""
+
+import pytest
+import uuid
+from app.models.user import User
+from app.services.activity import ActivityTracker
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+
+def tracker_for(engine, max_pending: int = 100) -> ActivityTracker:
+    tracker = ActivityTracker(flush_interval=60, max_pending=max_pending)
+    tracker._session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return tracker
+
+
+class TestActivityTracker:
+    """Coalescing in memory and batched flushes"""
+
+    def test_coalesces_per_user(self):
+        tracker = ActivityTracker(flush_interval=60, max_pending=100)
+        user_id = uuid.uuid4()
+        now = datetime.utcnow()
+        tracker.record_login(user_id, now)
+        tracker.touch(user_id, now + timedelta(seconds=5))
+        tracker.touch(user_id, now + timedelta(seconds=1))
+        tracker.record_login(user_id, now + timedelta(seconds=2))
+
+        pending = tracker.pending(user_id)
+        assert pending.last_active_at == now + timedelta(seconds=5)
+        assert pending.logins == 2
+        assert tracker.stats()["pending_users"] == 1
+
+    def test_threshold_wakes_flusher(self):
+        tracker = ActivityTracker(flush_interval=60, max_pending=2)
+        tracker.touch(uuid.uuid4())
+        assert not tracker._wakeup.is_set()
+        tracker.touch(uuid.uuid4())
+        assert tracker._wakeup.is_set()
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_all_users_in_one_batch(self, engine, session, make_user):
+        earlier = datetime(2026, 1, 1)
+        active, idle = make_user(login_count=3, last_active_at=earlier), make_user()
+        session.add_all([active, idle])
+        await session.commit()
+        updated_at = active.updated_at
+
+        tracker = tracker_for(engine)
+        seen = datetime(2026, 2, 1)
+        tracker.record_login(active.id, seen)
+        tracker.touch(idle.id, seen)
+        assert await tracker.flush() == 2
+        assert tracker.pending(active.id) is None
+
+        session.expire_all()
+        rows = {user.id: user for user in (await session.execute(select(User))).scalars()}
+        assert rows[active.id].login_count == 4
+        assert rows[active.id].last_active_at == seen
+        assert rows[active.id].updated_at == updated_at
+        assert rows[idle.id].login_count == 0
+        assert rows[idle.id].last_active_at == seen
+
+    @pytest.mark.asyncio
+    async def test_last_active_never_moves_backwards(self, engine, session, make_user):
+        later = datetime(2026, 3, 1)
+        user = make_user(last_active_at=later)
+        session.add(user)
+        await session.commit()
+
+        tracker = tracker_for(engine)
+        user_id = user.id
+        tracker.touch(user_id, datetime(2026, 2, 1))
+        await tracker.flush()
+
+        session.expire_all()
+        assert (await session.get(User, user_id)).last_active_at == later
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_pending(self, engine):
+        tracker = tracker_for(engine)
+        user_id = uuid.uuid4()
+        tracker.record_login(user_id)
+
+        tracker._session_factory = lambda: _BrokenSession()
+        with pytest.raises(RuntimeError):
+            await tracker.flush()
+        tracker.record_login(user_id)
+
+        assert tracker.pending(user_id).logins == 2
+        assert tracker.stats()["failed_flushes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_remaining(self, engine, session, make_user):
+        user = make_user()
+        session.add(user)
+        await session.commit()
+
+        tracker = ActivityTracker(flush_interval=60, max_pending=100)
+        tracker.start(async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+        user_id = user.id
+        tracker.record_login(user_id)
+        await tracker.stop()
+
+        session.expire_all()
+        assert (await session.get(User, user_id)).login_count == 1
+
+
+class _BrokenSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, *args, **kwargs):
+        raise RuntimeError("database down")
@@ -0,0 +1,129 @@
+"""
+Bulk SOP assignment and checklist fan-out
+"""
+
+import pytest
+import uuid
+from app.core.config import settings
+from app.models.checklist import Checklist, SOPAssignment, SOPSnapshot
+from app.models.sop import SOP
+from app.models.user import User, UserRole, UserStatus
+from app.schemas.checklist import SOPAssignmentRequest
+from app.services.assignments import assign_sop, resolve_targets
+from pydantic import ValidationError
+from sqlalchemy import event, func
+from sqlmodel import select
+
+WORKSPACE_ID = uuid.uuid4()
+
+
+async def _users(session, count: int, **fields) -> list:
+    fields = {"workspace_id": WORKSPACE_ID, "status": UserStatus.ACTIVE, **fields}
+    users = [
+        User(
+            email=f"{uuid.uuid4().hex}@example.com", first_name="U", last_name=str(index),
+            hashed_password="x", **fields,
+        )
+        for index in range(count)
+    ]
+    session.add_all(users)
+    await session.commit()
+    return users
+
+
+async def _sop(session, steps=None) -> SOP:
+    steps = steps if steps is not None else [{"id": "1", "title": "Lock out"}, {"id": "2", "title": "Tag out"}]
+    sop = SOP(title="Lockout", content={"steps": steps}, step_count=len(steps), workspace_id=WORKSPACE_ID)
+    session.add(sop)
+    await session.commit()
+    return sop
+
+
+async def _count(session, model) -> int:
+    return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+class TestResolveTargets:
+    """Selectors are OR-ed, scoped to the workspace and to active users"""
+
+    @pytest.mark.asyncio
+    async def test_selectors_union(self, session):
+        manager, picked = await _users(session, 2, role=UserRole.MANAGER)
+        reports = await _users(session, 2, manager_id=manager.id)
+        warehouse = await _users(session, 3, department="Warehouse")
+        await _users(session, 1, department="Warehouse", status=UserStatus.DEACTIVATED)
+        await _users(session, 1, department="Warehouse", workspace_id=uuid.uuid4())
+        await _users(session, 2, department="Office")
+
+        request = SOPAssignmentRequest(
+            user_ids=[picked.id], departments=["Warehouse"], manager_ids=[manager.id],
+        )
+        matched = await resolve_targets(session, WORKSPACE_ID, request)
+        assert set(matched) == {picked.id, *(user.id for user in reports + warehouse)}
+
+        by_role = await resolve_targets(session, WORKSPACE_ID, SOPAssignmentRequest(roles=[UserRole.MANAGER]))
+        assert set(by_role) == {manager.id, picked.id}
+
+    def test_a_selector_is_required(self):
+        with pytest.raises(ValidationError):
+            SOPAssignmentRequest(notes="nobody")
+
+
+class TestAssignSOP:
+    """Set-based inserts with one shared snapshot"""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_in_batched_statements(self, engine, session, monkeypatch):
+        monkeypatch.setattr(settings, "ASSIGNMENT_INSERT_BATCH_SIZE", 100)
+        users = await _users(session, 250, department="Warehouse")
+        manager_id = users[0].id
+        sop = await _sop(session)
+        inserts = []
+        event.listen(
+            engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: inserts.append(statement)
+            if statement.startswith("INSERT") else None,
+        )
+
+        report = await assign_sop(session, sop, SOPAssignmentRequest(departments=["Warehouse"]), manager_id)
+
+        assert (report.matched, report.assigned, report.checklists_created) == (250, 250, 250)
+        # One snapshot, then an assignment and a checklist statement per batch of 100
+        assert len(inserts) == 1 + 2 * 3
+        assert await _count(session, SOPAssignment) == 250
+        assert await _count(session, SOPSnapshot) == 1
+        checklists = (await session.execute(select(Checklist))).scalars().all()
+        assert {checklist.snapshot_id for checklist in checklists} == {report.snapshot_id}
+        assert {checklist.user_id for checklist in checklists} == {user.id for user in users}
+        snapshot = await session.get(SOPSnapshot, report.snapshot_id)
+        assert snapshot.steps == sop.content["steps"]
+
+    @pytest.mark.asyncio
+    async def test_rerun_only_adds_new_users(self, session):
+        first = await _users(session, 3, department="Warehouse")
+        sop = await _sop(session)
+        request = SOPAssignmentRequest(departments=["Warehouse"])
+        await assign_sop(session, sop, request, first[0].id)
+        await _users(session, 2, department="Warehouse")
+
+        report = await assign_sop(session, sop, request, first[0].id)
+
+        assert (report.matched, report.assigned, report.checklists_created) == (5, 2, 2)
+        assert await _count(session, Checklist) == 5
+        assert await _count(session, SOPSnapshot) == 1
+
+    @pytest.mark.asyncio
+    async def test_new_version_gets_new_snapshot_and_checklists(self, session):
+        users = await _users(session, 2, department="Warehouse")
+        sop = await _sop(session)
+        request = SOPAssignmentRequest(departments=["Warehouse"])
+        first = await assign_sop(session, sop, request, users[0].id)
+
+        sop.content = {"steps": [{"id": "1", "title": "Lock out"}]}
+        sop.version += 1
+        await session.commit()
+        second = await assign_sop(session, sop, request, users[0].id)
+
+        assert second.snapshot_id != first.snapshot_id
+        assert (second.assigned, second.checklists_created) == (0, 2)
+        assert await _count(session, SOPSnapshot) == 2
@@ -0,0 +1,167 @@
+"""
+Batch endpoint: many API calls in one round-trip
+"""
+
+import httpx
+import pytest
+import pytest_asyncio
+import uuid
+from app.api import deps
+from app.api.v1.api import api_router
+from app.core import security
+from app.core.config import settings
+from app.core.database import create_engine
+from app.core.events import EventHub
+from app.core.revocation import revocation_filter
+from app.models.sop import SOP
+from app.models.user import User, UserRole, UserStatus
+from app.services.search import create_search_index
+from fastapi import FastAPI
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import SQLModel, select
+
+WORKSPACE_ID = uuid.uuid4()
+
+
+@pytest_asyncio.fixture
+async def factory(tmp_path):
+    """Sessions on a file database (a transactional batch needs a connection of its own)"""
+    import app.models.checklist  # noqa: F401
+    import app.models.dashboard  # noqa: F401
+    import app.models.folder  # noqa: F401
+    import app.models.outbox  # noqa: F401
+    import app.models.similarity  # noqa: F401
+
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'batch.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(create_search_index)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def client(factory, monkeypatch):
+    """API client authenticated as a workspace admin"""
+    async def get_session():
+        async with factory() as session:
+            yield session
+
+    monkeypatch.setattr(deps, "_get_session", get_session)
+    async with factory() as session:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", first_name="B", last_name="R", hashed_password="x",
+                    role=UserRole.ADMIN, status=UserStatus.ACTIVE, workspace_id=WORKSPACE_ID)
+        session.add(user)
+        await session.commit()
+
+    application = FastAPI()
+    application.include_router(api_router, prefix=settings.API_V1_STR)
+    headers = {"Authorization": f"Bearer {security.create_access_token(user.id)}"}
+    async with httpx.AsyncClient(app=application, base_url="http://test", headers=headers) as http:
+        yield http
+
+
+async def _sop_count(factory) -> int:
+    async with factory() as session:
+        return (await session.execute(select(func.count()).select_from(SOP))).scalar_one()
+
+
+class TestBatch:
+    """Sub-requests go through the real routes with one authentication"""
+
+    @pytest.mark.asyncio
+    async def test_results_in_order(self, client, monkeypatch):
+        calls = []
+        authenticate = deps.authenticate
+
+        async def counting(session, token):
+            calls.append(token)
+            return await authenticate(session, token)
+
+        monkeypatch.setattr(deps, "authenticate", counting)
+        response = await client.post("/api/v1/batch/", json={"requests": [
+            {"id": "me", "path": "/users/me"},
+            {"id": "tree", "path": "/folders/tree"},
+            {"id": "create", "method": "POST", "path": "/sops/", "body": {"title": "Lockout"}},
+            {"path": "/sops/?limit=5"},
+            {"path": "/sops/search?q=lockout"},
+            {"path": "/missing"},
+        ]})
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [(result["id"], result["status"]) for result in results] == [
+            ("me", 200), ("tree", 200), ("create", 201), ("3", 200), ("4", 200), ("5", 404),
+        ]
+        assert results[0]["headers"]["etag"]
+        assert [item["title"] for item in results[3]["body"]["items"]] == ["Lockout"]
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_nested_batches_and_anonymous_callers(self, client):
+        nested = await client.post("/api/v1/batch/", json={"requests": [{"path": "/batch/"}]})
+        assert nested.status_code == 422
+        anonymous = await client.post("/api/v1/batch/", json={"requests": [{"path": "/users/me"}]},
+                                      headers={"Authorization": ""})
+        assert anonymous.status_code == 401
+
+
+class TestTransaction:
+    """All-or-nothing batches"""
+
+    @pytest.mark.asyncio
+    async def test_commits_when_every_call_succeeds(self, client, factory):
+        response = await client.post("/api/v1/batch/", json={"transaction": True, "requests": [
+            {"method": "POST", "path": "/sops/", "body": {"title": "First"}},
+            {"path": "/sops/"},
+        ]})
+        body = response.json()
+        assert body["committed"] is True
+        assert [item["title"] for item in body["results"][1]["body"]["items"]] == ["First"]  # sees its own write
+        assert await _sop_count(factory) == 1
+
+    @pytest.mark.asyncio
+    async def test_failure_rolls_back_and_skips_the_rest(self, client, factory):
+        response = await client.post("/api/v1/batch/", json={"transaction": True, "requests": [
+            {"method": "POST", "path": "/sops/", "body": {"title": "Kept only if all succeed"}},
+            {"method": "POST", "path": "/sops/", "body": {}},
+            {"path": "/users/me"},
+        ]})
+        body = response.json()
+        assert body["committed"] is False
+        assert [result["status"] for result in body["results"]] == [201, 422, 424]
+        assert await _sop_count(factory) == 0
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_commit_has_no_in_process_effects(self, client, factory):
+        user_id = uuid.UUID((await client.get("/api/v1/users/me")).json()["id"])
+        response = await client.post("/api/v1/batch/", json={"transaction": True, "requests": [
+            {"method": "POST", "path": "/login/revoke-tokens"},
+            {"method": "POST", "path": "/sops/", "body": {}},
+        ]})
+        assert [result["status"] for result in response.json()["results"]] == [204, 422]
+        async with factory() as session:
+            assert (await session.get(User, user_id)).token_version == 0
+        assert not revocation_filter.is_revoked(user_id, 0)
+
+        response = await client.post("/api/v1/batch/", json={"transaction": True, "requests": [
+            {"method": "POST", "path": "/login/revoke-tokens"},
+        ]})
+        assert response.json()["committed"] is True
+        assert revocation_filter.is_revoked(user_id, 0)
+
+
+class TestHeldEvents:
+    """Events published inside a transactional batch wait for its outcome"""
+
+    @pytest.mark.asyncio
+    async def test_held_until_released(self):
+        hub = EventHub(buffer_size=8)
+        subscription = hub.subscribe(WORKSPACE_ID)
+        with hub.hold() as held:
+            hub.publish(WORKSPACE_ID, "sop.status", {"to": "PUBLISHED"})
+        assert await subscription.next(timeout=0.01) is None and len(held) == 1
+
+        hub.release(held)
+        assert (await subscription.next(timeout=0.01))["data"] == {"to": "PUBLISHED"}
@@ -0,0 +1,63 @@
+"""
+Benchmark reporting and dataset seeding
+"""
+
+import pytest
+from app.models.folder import Folder
+from app.models.sop import SOP
+from app.models.user import User
+from benchmarks import report
+from benchmarks.seed import Scale, seed
+from sqlalchemy import func, select
+
+
+def _result(**scenarios):
+    return {"meta": {}, "scenarios": scenarios}
+
+
+class TestReport:
+    """Percentiles and regression detection"""
+
+    def test_nearest_rank_percentiles(self):
+        values = list(range(1, 101))
+        assert report.percentile(values, 50) == 50
+        assert report.percentile(values, 99) == 99
+        assert report.percentile([7.0], 95) == 7.0
+        assert report.percentile([], 50) == 0.0
+
+    def test_summarize(self):
+        summary = report.summarize([4.0, 1.0, 3.0, 2.0], errors=1, elapsed=2.0)
+        assert summary["requests"] == 4
+        assert summary["rps"] == 2.0
+        assert summary["p50_ms"] == 2.0
+        assert summary["max_ms"] == 4.0
+
+    def test_compare_flags_only_changes_past_threshold(self):
+        baseline = _result(users_me={"rps": 1000, "p95_ms": 10, "p99_ms": 20, "errors": 0})
+        steady = _result(users_me={"rps": 950, "p95_ms": 10.5, "p99_ms": 21, "errors": 0})
+        slower = _result(users_me={"rps": 800, "p95_ms": 15, "p99_ms": 20, "errors": 0})
+        assert report.compare(steady, baseline, 0.1) == []
+        regressions = report.compare(slower, baseline, 0.1)
+        assert [line.split(":")[1].split()[0] for line in regressions] == ["rps", "p95_ms"]
+
+    def test_new_scenarios_are_not_regressions(self):
+        assert report.compare(_result(login={"rps": 1, "errors": 0}), _result(), 0.1) == []
+
+
+class TestSeed:
+    """Synthetic dataset"""
+
+    @pytest.mark.asyncio
+    async def test_seeds_requested_shape(self, tmp_path):
+        from app.core.database import create_engine
+
+        url = f"sqlite+aiosqlite:///{tmp_path / 'bench.db'}"
+        await seed(url, Scale("tiny", sops=30, workspaces=2, users_per_workspace=3,
+                              folder_depth=3, folder_fanout=2), log=lambda message: None)
+        engine = create_engine(url)
+        async with engine.connect() as conn:
+            assert await conn.scalar(select(func.count()).select_from(SOP)) == 30
+            assert await conn.scalar(select(func.count()).select_from(User)) == 6
+            assert await conn.scalar(select(func.count()).select_from(Folder)) == 2 * (2 + 4 + 8)
+            assert await conn.scalar(select(func.max(Folder.depth))) == 2
+        await engine.dispose()
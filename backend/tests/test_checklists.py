@@ -0,0 +1,113 @@
+"""
+Checklist progress counters, batched item updates and single-query reads
+"""
+
+import pytest
+import uuid
+from app.models.checklist import Checklist, ChecklistItem, ChecklistStatus
+from app.models.sop import SOP
+from app.models.user import User
+from app.schemas.checklist import ChecklistItemChange, SOPAssignmentRequest
+from app.services import checklists
+from app.services.assignments import assign_sop
+from sqlalchemy import event, func
+from sqlmodel import select
+
+
+async def _checklist(session, step_count: int = 4) -> Checklist:
+    user = User(email=f"{uuid.uuid4().hex}@example.com", first_name="A", last_name="B", hashed_password="x")
+    session.add(user)
+    await session.commit()
+    steps = [{"id": f"s{index}", "title": f"Step {index}"} for index in range(step_count)]
+    sop = SOP(title="Forklift check", content={"steps": steps}, step_count=step_count)
+    session.add(sop)
+    await session.commit()
+    await assign_sop(session, sop, SOPAssignmentRequest(user_ids=[user.id]), user.id)
+    return (await session.execute(select(Checklist))).scalar_one()
+
+
+def _changes(**states: bool) -> list:
+    return [ChecklistItemChange(step_id=step_id, completed=done) for step_id, done in states.items()]
+
+
+class TestUpdateItems:
+    """Counters move with each change; versions guard concurrent edits"""
+
+    @pytest.mark.asyncio
+    async def test_progress_is_maintained_incrementally(self, session):
+        checklist = await _checklist(session)
+        assert checklist.item_count == 4
+
+        result = await checklists.update_items(
+            session, checklist, 1, _changes(s0=True, s1=True, s2=False), checklist.user_id,
+        )
+        assert (result.completed_count, result.progress, result.version, result.changed) == (2, 50, 2, 2)
+
+        # Re-checking s1 is not a change; unchecking s0 and checking the rest completes 3 of 4
+        result = await checklists.update_items(
+            session, checklist, 2, _changes(s0=False, s1=True, s2=True, s3=True), checklist.user_id,
+        )
+        assert (result.completed_count, result.progress, result.changed) == (3, 75, 3)
+        assert result.status == ChecklistStatus.ACTIVE
+
+        result = await checklists.update_items(session, checklist, 3, _changes(s0=True), checklist.user_id)
+        assert (result.progress, result.status) == (100, ChecklistStatus.COMPLETED)
+
+        stored = await session.get(Checklist, checklist.id, populate_existing=True)
+        assert (stored.completed_count, stored.progress, stored.version) == (4, 100, 4)
+        items = (await session.execute(select(func.count()).select_from(ChecklistItem))).scalar_one()
+        assert items == 4
+
+    @pytest.mark.asyncio
+    async def test_stale_version_is_rejected(self, session):
+        checklist = await _checklist(session)
+        await checklists.update_items(session, checklist, 1, _changes(s0=True), checklist.user_id)
+
+        with pytest.raises(checklists.ChecklistConflict):
+            await checklists.update_items(session, checklist, 1, _changes(s1=True), checklist.user_id)
+        assert checklist.completed_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_update_rolls_back(self, session):
+        checklist = await _checklist(session)
+        user_id = checklist.user_id
+        # Another request commits version 2 after this one loaded version 1
+        await session.execute(
+            Checklist.__table__.update().where(Checklist.__table__.c.id == checklist.id).values(version=2)
+        )
+        await session.commit()
+
+        with pytest.raises(checklists.ChecklistConflict):
+            await checklists.update_items(session, checklist, 1, _changes(s0=True, s1=True), user_id)
+        items = (await session.execute(select(func.count()).select_from(ChecklistItem))).scalar_one()
+        assert items == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_steps_are_rejected(self, session):
+        checklist = await _checklist(session)
+        with pytest.raises(checklists.UnknownSteps):
+            await checklists.update_items(session, checklist, 1, _changes(s0=True, nope=True), checklist.user_id)
+
+
+class TestReadChecklist:
+    """Row, steps and completed items in one statement"""
+
+    @pytest.mark.asyncio
+    async def test_single_query(self, engine, session):
+        checklist = await _checklist(session, step_count=300)
+        every_third = {f"s{index}": True for index in range(0, 300, 3)}
+        await checklists.update_items(session, checklist, 1, _changes(**every_third), checklist.user_id)
+        statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        result = await checklists.read_checklist(session, checklist.id)
+
+        assert len(statements) == 1
+        assert len(result.steps) == 300
+        assert sorted(item.step_id for item in result.completed_items) == sorted(every_third)
+        assert result.completed_items[0].completed_by == checklist.user_id
+        assert (result.completed_count, result.progress, result.version) == (100, 33, 2)
+
+    @pytest.mark.asyncio
+    async def test_missing(self, session):
+        assert await checklists.read_checklist(session, uuid.uuid4()) is None
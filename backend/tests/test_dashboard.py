@@ -0,0 +1,182 @@
+"""
+Incrementally maintained workspace dashboard counters
+"""
+
+import pytest
+import uuid
+from app.api.v1.endpoints.dashboard import read_dashboard
+from app.models.dashboard import WorkspaceCounter
+from app.models.folder import Folder, SOPFolder
+from app.models.sop import DifficultyLevel, SOP, SOPStatus
+from app.models.user import User, UserRole, UserStatus
+from app.schemas.token import Principal
+from app.services import dashboard, folders, user_import
+from app.services.dashboard import DashboardReconciler
+from app.services.trash import purge_batch
+from datetime import datetime, timedelta
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+WORKSPACE_ID = uuid.uuid4()
+
+
+async def stored(session, workspace_id=WORKSPACE_ID):
+    counters = await dashboard.read_counters(session, workspace_id)
+    return {(dimension, key): count for dimension, values in counters.items() for key, count in values.items()}
+
+
+async def assert_consistent(session, workspace_id=WORKSPACE_ID):
+    assert await stored(session, workspace_id) == await dashboard.compute_counters(session, workspace_id)
+
+
+async def _filed_sops(session, count: int, **fields):
+    folder = Folder(name="Safety", workspace_id=WORKSPACE_ID)
+    sops = [SOP(title=f"SOP {index}", workspace_id=WORKSPACE_ID, **fields) for index in range(count)]
+    session.add(folder)
+    session.add_all(sops)
+    await session.flush()
+    session.add_all([SOPFolder(sop_id=sop.id, folder_id=folder.id) for sop in sops])
+    await session.commit()
+    return folder, sops
+
+
+class TestIncremental:
+    """ORM writes keep the counters in step with the tables"""
+
+    @pytest.mark.asyncio
+    async def test_sop_lifecycle(self, session):
+        folder, (first, second, third) = await _filed_sops(session, 3)
+        key = folder.id.hex
+        assert await stored(session) == {
+            (dashboard.SOP_STATUS, "DRAFT"): 3,
+            (dashboard.SOP_DIFFICULTY, "BEGINNER"): 3,
+            (dashboard.SOP_FOLDER, key): 3,
+        }
+
+        first.status, first.difficulty = SOPStatus.PUBLISHED, DifficultyLevel.ADVANCED
+        second.status, second.deleted_at = SOPStatus.DELETED, datetime.utcnow()
+        await session.commit()
+        assert await stored(session) == {
+            (dashboard.SOP_STATUS, "DRAFT"): 1,
+            (dashboard.SOP_STATUS, "PUBLISHED"): 1,
+            (dashboard.SOP_STATUS, "DELETED"): 1,
+            (dashboard.SOP_DIFFICULTY, "BEGINNER"): 1,
+            (dashboard.SOP_DIFFICULTY, "ADVANCED"): 1,
+            (dashboard.SOP_FOLDER, key): 2,
+        }
+
+        link = await session.get(SOPFolder, (third.id, folder.id))
+        await session.delete(link)
+        await session.delete(first)
+        await session.commit()
+        await assert_consistent(session)
+        assert (dashboard.SOP_FOLDER, key) not in await stored(session)
+
+    @pytest.mark.asyncio
+    async def test_one_sorted_upsert_per_flush(self, engine, session):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if "workspace_counters" in statement:
+                statements.append(parameters)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        session.add_all([
+            SOP(title=f"SOP {index}", workspace_id=workspace_id, difficulty=difficulty)
+            for index, (workspace_id, difficulty) in enumerate([
+                (uuid.uuid4(), DifficultyLevel.ADVANCED), (WORKSPACE_ID, DifficultyLevel.BEGINNER),
+                (uuid.uuid4(), DifficultyLevel.BEGINNER),
+            ])
+        ])
+        await session.commit()
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+        assert len(statements) == 1
+        assert await stored(session) == {(dashboard.SOP_STATUS, "DRAFT"): 1, (dashboard.SOP_DIFFICULTY, "BEGINNER"): 1}
+
+    @pytest.mark.asyncio
+    async def test_moving_between_workspaces_and_users(self, session):
+        other = uuid.uuid4()
+        _, (sop,) = await _filed_sops(session, 1)
+        user = User(email="u@example.com", first_name="U", last_name="U", hashed_password="x", workspace_id=WORKSPACE_ID)
+        session.add(user)
+        await session.commit()
+
+        sop.workspace_id = other
+        user.status = UserStatus.ACTIVE
+        await session.commit()
+
+        for workspace_id in (WORKSPACE_ID, other):
+            await assert_consistent(session, workspace_id)
+        assert await stored(session) == {(dashboard.USER_STATUS, "ACTIVE"): 1}
+
+
+class TestBulkWrites:
+    """Statements that bypass the ORM adjust the counters themselves"""
+
+    @pytest.mark.asyncio
+    async def test_trash_purge_folder_delete_and_import(self, session):
+        now = datetime.utcnow()
+        folder, sops = await _filed_sops(session, 2)
+        sops[0].status, sops[0].deleted_at = SOPStatus.DELETED, now
+        sops[0].permanent_delete_at = now - timedelta(days=1)
+        await session.commit()
+
+        assert await purge_batch(session, now, limit=10) == 1
+        await assert_consistent(session)
+
+        await folders.delete_subtree(session, await session.get(Folder, folder.id))
+        await session.commit()
+        await assert_consistent(session)
+        assert (dashboard.SOP_FOLDER, folder.id.hex) not in await stored(session)
+
+        async def rows():
+            yield {"email": "a@example.com", "first_name": "A", "last_name": "A", "password": "secret-pass"}
+            yield {"email": "b@example.com", "first_name": "B", "last_name": "B"}
+
+        await user_import.import_users(session, rows(), WORKSPACE_ID, UserRole.ADMIN)
+        await assert_consistent(session)
+        assert (await stored(session))[(dashboard.USER_STATUS, "PENDING")] >= 1
+
+
+class TestReconciliation:
+    """Recounting from scratch corrects drift"""
+
+    @pytest.mark.asyncio
+    async def test_fixes_drifted_and_missing_counters(self, engine, session):
+        folder, _ = await _filed_sops(session, 2)
+        await session.execute(
+            update(WorkspaceCounter)
+            .where(WorkspaceCounter.dimension == dashboard.SOP_STATUS)
+            .values(count=99)
+        )
+        await session.execute(
+            WorkspaceCounter.__table__.delete().where(WorkspaceCounter.dimension == dashboard.SOP_FOLDER)
+        )
+        session.add(WorkspaceCounter(workspace_id=WORKSPACE_ID, dimension=dashboard.SOP_FOLDER, key="gone", count=4))
+        await session.commit()
+
+        reconciler = DashboardReconciler(interval=60)
+        reconciler._session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        assert await reconciler.run_once() == 3
+        await assert_consistent(session)
+        assert (await stored(session))[(dashboard.SOP_FOLDER, folder.id.hex)] == 2
+        assert await reconciler.run_once() == 0
+        assert reconciler.stats()["corrected"] == 3
+
+
+class TestEndpoint:
+    """All counters in one response, zero-filled"""
+
+    @pytest.mark.asyncio
+    async def test_read_dashboard(self, session):
+        folder, _ = await _filed_sops(session, 2, status=SOPStatus.PUBLISHED)
+        user = Principal(id=uuid.uuid4(), workspace_id=WORKSPACE_ID, role=UserRole.MEMBER, status=UserStatus.ACTIVE)
+
+        counters = await read_dashboard(session=session, current_user=user)
+
+        assert counters.sops_by_status["PUBLISHED"] == 2
+        assert counters.sops_by_status["DRAFT"] == 0
+        assert counters.sops_by_difficulty == {"BEGINNER": 2, "INTERMEDIATE": 0, "ADVANCED": 0}
+        assert counters.sops_by_folder == {folder.id: 2}
+        assert set(counters.users_by_status) == {status.value for status in UserStatus}
@@ -0,0 +1,163 @@
+"""
+Push-channel event hub, relay broker and publishing endpoints
+"""
+
+import asyncio
+import pytest
+import uuid
+from app.api.v1.endpoints import events as stream
+from app.api.v1.endpoints import sops
+from app.core import events
+from app.core.events import EventHub, Lagged, RelayBroker, serve_relay
+from app.core.revocation import RevocationFilter
+from app.models.sop import SOP, SOPStatus
+from app.models.user import UserRole, UserStatus
+from app.schemas.sop import CommentCreate, SOPUpdate
+from app.schemas.token import Principal, TokenPayload
+from datetime import datetime
+from time import time
+
+WORKSPACE_ID = uuid.uuid4()
+
+
+class TestEventHub:
+    """Workspace fan-out with bounded per-connection buffers"""
+
+    @pytest.mark.asyncio
+    async def test_delivers_to_the_workspace_only(self):
+        hub = EventHub(buffer_size=10)
+        mine, other = hub.subscribe(WORKSPACE_ID), hub.subscribe(uuid.uuid4())
+
+        hub.publish(WORKSPACE_ID, events.COMMENT_CREATED, {"sop_id": uuid.UUID(int=1)})
+
+        message = await mine.next(timeout=1)
+        assert (message["type"], message["data"]) == (events.COMMENT_CREATED, {"sop_id": str(uuid.UUID(int=1))})
+        assert await other.next(timeout=0.01) is None
+        hub.unsubscribe(mine)
+        hub.unsubscribe(other)
+        assert hub.stats()["connections"] == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_is_dropped_without_blocking(self):
+        hub = EventHub(buffer_size=3)
+        slow, fast = hub.subscribe(WORKSPACE_ID), hub.subscribe(WORKSPACE_ID)
+
+        for index in range(5):
+            hub.publish(WORKSPACE_ID, events.SOP_STATUS, {"n": index})
+            assert (await fast.next(timeout=1))["data"] == {"n": index}
+
+        with pytest.raises(Lagged):
+            await slow.next(timeout=1)
+        assert hub.lagged == 1
+        assert hub.delivered == 5 + 3
+
+
+class TestRelayBroker:
+    """Events cross worker processes through the relay"""
+
+    @pytest.mark.asyncio
+    async def test_fans_out_between_hubs(self, tmp_path):
+        url = f"unix://{tmp_path / 'relay.sock'}"
+        relay = asyncio.create_task(serve_relay(url))
+        hubs = [EventHub(10, RelayBroker(url, reconnect_seconds=0.01)) for _ in range(2)]
+        try:
+            for hub in hubs:
+                await hub.start()
+            while not all(hub.broker.connected for hub in hubs):
+                await asyncio.sleep(0.01)
+            local, remote = hubs[0].subscribe(WORKSPACE_ID), hubs[1].subscribe(WORKSPACE_ID)
+
+            hubs[0].publish(WORKSPACE_ID, events.APPROVAL_UPDATED, {"to": "APPROVED"})
+
+            assert (await local.next(timeout=1))["data"] == {"to": "APPROVED"}
+            assert (await remote.next(timeout=1))["data"] == {"to": "APPROVED"}
+            # The relay does not echo events back to the worker that sent them
+            assert await local.next(timeout=0.05) is None
+        finally:
+            for hub in hubs:
+                await hub.stop()
+            relay.cancel()
+            await asyncio.gather(relay, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_unreachable_relay_still_delivers_locally(self, tmp_path):
+        hub = EventHub(10, RelayBroker(f"unix://{tmp_path / 'missing.sock'}", reconnect_seconds=0.01))
+        await hub.start()
+        try:
+            subscription = hub.subscribe(WORKSPACE_ID)
+            hub.publish(WORKSPACE_ID, events.SOP_STATUS, {})
+            assert (await subscription.next(timeout=1))["type"] == events.SOP_STATUS
+            assert hub.stats()["broker"]["connected"] is False
+        finally:
+            await hub.stop()
+
+
+class TestPublishing:
+    """Endpoints publish after committing"""
+
+    @pytest.mark.asyncio
+    async def test_status_changes_and_comments(self, session, monkeypatch):
+        hub = EventHub(buffer_size=10)
+        monkeypatch.setattr(sops, "event_hub", hub)
+        subscription = hub.subscribe(WORKSPACE_ID)
+        user = Principal(id=uuid.uuid4(), workspace_id=WORKSPACE_ID, role=UserRole.ADMIN, status=UserStatus.ACTIVE)
+        sop = SOP(title="Forklift", workspace_id=WORKSPACE_ID)
+        session.add(sop)
+        await session.commit()
+
+        await sops.update_sop(
+            sop_id=sop.id, session=session, current_user=user, sop_in=SOPUpdate(status=SOPStatus.PENDING_APPROVAL),
+        )
+        await sops.update_sop(sop_id=sop.id, session=session, current_user=user, sop_in=SOPUpdate(title="Renamed"))
+        await sops.create_comment(
+            sop_id=sop.id, session=session, current_user=user, comment_in=CommentCreate(text="Hi"),
+        )
+
+        received = [(await subscription.next(timeout=0.1)) for _ in range(3)]
+        assert [message["type"] for message in received] == [
+            events.SOP_STATUS, events.APPROVAL_UPDATED, events.COMMENT_CREATED,
+        ]
+        assert received[0]["data"]["to"] == "PENDING_APPROVAL"
+        assert received[2]["data"]["text"] == "Hi"
+        assert await subscription.next(timeout=0.01) is None
+
+
+class _Socket:
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def close(self, code, reason):
+        self.closed = (code, reason)
+
+
+class TestStreamAuthorization:
+    """An open connection ends when its token stops being valid"""
+
+    @pytest.mark.asyncio
+    async def test_closed_when_token_expires(self):
+        hub = EventHub(buffer_size=10)
+        socket = _Socket()
+        credentials = TokenPayload(sub=str(uuid.uuid4()), exp=int(time()) + 1)
+        await asyncio.wait_for(stream._pump(socket, hub.subscribe(WORKSPACE_ID), credentials), timeout=3)
+        assert socket.closed == (1008, "token expired")
+
+    @pytest.mark.asyncio
+    async def test_closed_at_heartbeat_after_revocation(self, monkeypatch):
+        monkeypatch.setattr(stream.settings, "REALTIME_HEARTBEAT_SECONDS", 0.01)
+        revoked = RevocationFilter(retention_seconds=60, refresh_interval=5)
+        monkeypatch.setattr(stream, "revocation_filter", revoked)
+        hub = EventHub(buffer_size=10)
+        socket = _Socket()
+        user_id = uuid.uuid4()
+        credentials = TokenPayload(sub=str(user_id), token_version=0, exp=int(time()) + 600)
+        pump = asyncio.create_task(stream._pump(socket, hub.subscribe(WORKSPACE_ID), credentials))
+        await asyncio.sleep(0.05)
+        assert {"type": "ping"} in socket.sent and socket.closed is None
+
+        revoked.add(user_id, 1, datetime.utcnow())
+        await asyncio.wait_for(pump, timeout=1)
+        assert socket.closed == (1008, "token revoked")
@@ -0,0 +1,72 @@
+"""
+Materialized-path folder hierarchy
+"""
+
+import pytest
+import uuid
+from app.models.folder import Folder, SOPFolder
+from app.models.sop import SOP
+from app.services import folders
+from sqlmodel import select
+
+
+async def add_folder(session, name, parent=None, workspace_id=None):
+    folder = Folder(name=name, parent_id=parent.id if parent else None, workspace_id=workspace_id)
+    folder.path = folders.child_path(parent, folder.id)
+    folder.depth = parent.depth + 1 if parent else 0
+    session.add(folder)
+    await session.flush()
+    return folder
+
+
+class TestFolderTree:
+    """Tree loading, moves and deletes"""
+
+    @pytest.mark.asyncio
+    async def test_tree_with_counts(self, session):
+        workspace_id = uuid.uuid4()
+        ops = await add_folder(session, "Operations", workspace_id=workspace_id)
+        safety = await add_folder(session, "Safety", ops, workspace_id)
+        await add_folder(session, "HR", workspace_id=workspace_id)
+        sop = SOP(title="Lockout", workspace_id=workspace_id)
+        trashed = SOP(title="Old", workspace_id=workspace_id, deleted_at=sop.created_at)
+        session.add_all([sop, trashed])
+        await session.flush()
+        session.add_all([
+            SOPFolder(sop_id=sop.id, folder_id=safety.id),
+            SOPFolder(sop_id=trashed.id, folder_id=safety.id),
+        ])
+        await session.commit()
+
+        tree = await folders.load_tree(session, workspace_id)
+        by_name = {node["name"]: node for node in tree}
+        assert set(by_name) == {"Operations", "HR"}
+        assert by_name["Operations"]["sop_count"] == 0
+        assert by_name["Operations"]["total_sop_count"] == 1
+        assert by_name["Operations"]["children"][0]["sop_count"] == 1
+
+        subtree = await folders.load_tree(session, workspace_id, safety)
+        assert [node["name"] for node in subtree] == ["Safety"]
+
+    @pytest.mark.asyncio
+    async def test_move_rewrites_descendant_paths(self, session):
+        workspace_id = uuid.uuid4()
+        a = await add_folder(session, "A", workspace_id=workspace_id)
+        b = await add_folder(session, "B", a, workspace_id)
+        c = await add_folder(session, "C", b, workspace_id)
+        other = await add_folder(session, "Other", workspace_id=workspace_id)
+        await session.commit()
+
+        await folders.move_subtree(session, b, other)
+        await session.commit()
+        await session.refresh(c)
+        assert c.path == f"/{other.id.hex}/{b.id.hex}/{c.id.hex}/"
+        assert c.depth == 2
+
+        with pytest.raises(ValueError):
+            await folders.move_subtree(session, other, c)
+
+        await folders.delete_subtree(session, other)
+        await session.commit()
+        remaining = (await session.execute(select(Folder.name).where(Folder.workspace_id == workspace_id))).scalars()
+        assert list(remaining) == ["A"]
@@ -0,0 +1,46 @@
+"""
+Conditional GET validators
+"""
+
+from app.core import http_cache
+from datetime import datetime
+from fastapi import Request, Response
+
+
+def _request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+class TestConditional:
+    """304 decisions and response headers"""
+
+    def test_sets_validators_on_miss(self):
+        response = Response()
+        modified = datetime(2026, 3, 4, 5, 6, 7, 890)
+        etag = http_cache.strong_etag("sop", 3)
+        assert http_cache.conditional(_request(), response, etag, modified) is None
+        assert response.headers["etag"] == etag
+        assert response.headers["cache-control"] == http_cache.REVALIDATE
+        assert response.headers["last-modified"] == "Wed, 04 Mar 2026 05:06:07 GMT"
+
+    def test_matching_etag_is_not_modified(self):
+        etag = http_cache.strong_etag("sop", 3)
+        result = http_cache.conditional(_request(if_none_match=f'"other", {etag}'), Response(), etag)
+        assert result.status_code == 304
+        assert result.headers["etag"] == etag
+
+    def test_weak_comparison(self):
+        etag = http_cache.weak_etag("page")
+        assert http_cache.conditional(_request(if_none_match=etag[2:]), Response(), etag).status_code == 304
+
+    def test_stale_etag_wins_over_if_modified_since(self):
+        modified = datetime(2026, 3, 4, 5, 6, 7)
+        request = _request(if_none_match='"stale"', if_modified_since="Wed, 04 Mar 2026 05:06:07 GMT")
+        assert http_cache.conditional(request, Response(), http_cache.strong_etag(1), modified) is None
+
+    def test_if_modified_since_ignores_sub_second_precision(self):
+        request = _request(if_modified_since="Wed, 04 Mar 2026 05:06:07 GMT")
+        etag = http_cache.strong_etag(1)
+        assert http_cache.conditional(request, Response(), etag, datetime(2026, 3, 4, 5, 6, 7, 500)).status_code == 304
+        assert http_cache.conditional(request, Response(), etag, datetime(2026, 3, 4, 5, 6, 8)) is None
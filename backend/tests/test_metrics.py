@@ -0,0 +1,77 @@
+"""
+Request instrumentation and Prometheus export
+"""
+
+import httpx
+import logging
+import pytest
+from app.core import metrics
+from fastapi import FastAPI
+
+
+def _app(slow_request_ms: float = 0) -> FastAPI:
+    application = FastAPI()
+    application.add_middleware(metrics.MetricsMiddleware, slow_request_ms=slow_request_ms)
+
+    @application.get("/items/{item_id}")
+    def read_item(item_id: int):
+        metrics.record_query("SELECT * FROM items WHERE id = ?", 0.002)
+        metrics.record_query("SELECT * FROM tags WHERE item_id = ?", 0.003)
+        return {"id": item_id}
+
+    return application
+
+
+def _sample(name: str) -> float:
+    for line in metrics.render().splitlines():
+        if line.startswith(name + " ") or line.startswith(name + "{"):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} not exported")
+
+
+class TestHistogram:
+    """Text exposition"""
+
+    def test_buckets_are_cumulative(self):
+        histogram = metrics.Histogram("example_seconds", "Example.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "/a")
+        lines = list(histogram.collect())
+        assert 'example_seconds_bucket{route="/a",le="0.1"} 2' in lines
+        assert 'example_seconds_bucket{route="/a",le="1"} 3' in lines
+        assert 'example_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+        assert 'example_seconds_count{route="/a"} 4' in lines
+        assert 'example_seconds_sum{route="/a"} 3.65' in lines
+
+    def test_label_values_are_escaped(self):
+        histogram = metrics.Histogram("escaped", "Example.", ("route",), buckets=(1.0,))
+        histogram.observe(0.5, 'say "hi"')
+        assert 'escaped_count{route="say \\"hi\\""} 1' in list(histogram.collect())
+
+
+class TestMiddleware:
+    """Per-request timing, SQL accounting and the slow-request log"""
+
+    @pytest.mark.asyncio
+    async def test_records_route_template_and_queries(self):
+        metrics.request_queries.clear()
+        metrics.request_duration.clear()
+        async with httpx.AsyncClient(app=_app(), base_url="http://test") as client:
+            assert (await client.get("/items/1")).status_code == 200
+            assert (await client.get("/items/2")).status_code == 200
+
+        rendered = metrics.render()
+        assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2' in rendered
+        assert _sample('http_request_db_queries_sum{method="GET",route="/items/{item_id}"}') == 4
+
+    @pytest.mark.asyncio
+    async def test_slow_requests_log_their_sql(self, caplog):
+        async with httpx.AsyncClient(app=_app(slow_request_ms=0.001), base_url="http://test") as client:
+            with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+                await client.get("/items/7")
+        assert "2 queries" in caplog.text
+        assert "SELECT * FROM tags WHERE item_id = ?" in caplog.text
+
+    def test_queries_outside_requests_are_not_attributed(self):
+        assert metrics.current_request.get() is None
+        metrics.record_query("SELECT 1", 0.001)
@@ -0,0 +1,136 @@
+"""
+Alembic migrations and the startup schema check
+"""
+
+import json
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from app.core import database
+from app.models.user import User
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+# The tables the app created on boot before migrations existed (the original users and workspaces)
+LEGACY_SCHEMA = [
+    """CREATE TABLE workspaces (
+        name VARCHAR NOT NULL, slug VARCHAR, logo_url VARCHAR, size VARCHAR, id CHAR(32) NOT NULL,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, PRIMARY KEY (id)
+    )""",
+    "CREATE UNIQUE INDEX ix_workspaces_slug ON workspaces (slug)",
+    "CREATE INDEX ix_workspaces_name ON workspaces (name)",
+    """CREATE TABLE users (
+        email VARCHAR NOT NULL, first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL,
+        is_active BOOLEAN NOT NULL, role VARCHAR(11) NOT NULL, status VARCHAR(11) NOT NULL,
+        job_title VARCHAR, department VARCHAR, phone VARCHAR, timezone VARCHAR, avatar_url VARCHAR,
+        workspace_id CHAR(32), manager_id CHAR(32), id CHAR(32) NOT NULL, hashed_password VARCHAR NOT NULL,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, last_active_at DATETIME,
+        login_count INTEGER NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(workspace_id) REFERENCES workspaces (id), FOREIGN KEY(manager_id) REFERENCES users (id)
+    )""",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+]
+
+
+def _config() -> Config:
+    config = Config(str(database.BACKEND_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(database.BACKEND_ROOT / "migrations"))
+    return config
+
+
+def _diff(connection):
+    context = MigrationContext.configure(
+        connection,
+        opts={"include_name": lambda name, type_, parents: not (type_ == "table" and name.startswith("sop_search"))},
+    )
+    return compare_metadata(context, SQLModel.metadata)
+
+
+class TestMigrations:
+    """Migrations match the models"""
+
+    def test_schema_revision_is_head(self):
+        assert ScriptDirectory.from_config(_config()).get_current_head() == database.SCHEMA_REVISION
+
+    @pytest.mark.asyncio
+    async def test_upgrade_builds_the_model_schema(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrated.db'}")
+        async with engine.connect() as conn:
+            assert await database.schema_revision(conn) is None
+        async with engine.begin() as conn:
+            await conn.run_sync(database._migrate)
+        async with engine.connect() as conn:
+            assert await database.schema_revision(conn) == database.SCHEMA_REVISION
+            assert await conn.run_sync(_diff) == []
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_unversioned_database_is_adopted(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+        async with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                await conn.execute(text(statement))
+            await conn.execute(text(
+                "INSERT INTO users VALUES (' Old@Example.com', 'Old', 'User', 1, 'ADMIN', 'ACTIVE', NULL, NULL, NULL,"
+                " NULL, NULL, NULL, NULL, '0123456789abcdef0123456789abcdef', 'x', '2024-01-01 00:00:00',"
+                " '2024-01-01 00:00:00', NULL, 0)"
+            ))
+            await conn.run_sync(database._migrate)
+        async with engine.connect() as conn:
+            assert await database.schema_revision(conn) == database.SCHEMA_REVISION
+            assert await conn.run_sync(_diff) == []
+            assert (await conn.execute(select(User.email, User.token_version))).all() == [("old@example.com", 0)]
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_legacy_table_missing_initial_columns_is_refused(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+        async with engine.begin() as conn:
+            await conn.execute(text(LEGACY_SCHEMA[0]))
+            await conn.execute(text("CREATE TABLE users (id CHAR(32) PRIMARY KEY, email VARCHAR NOT NULL)"))
+            with pytest.raises(RuntimeError, match="users lacks"):
+                await conn.run_sync(database._migrate)
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_emails_differing_only_in_case_are_refused(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+        async with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                await conn.execute(text(statement))
+            for user_id, email in (("0" * 32, "ann@example.com"), ("1" * 32, "Ann@example.com")):
+                await conn.execute(text(
+                    f"INSERT INTO users VALUES ('{email}', 'A', 'A', 1, 'MEMBER', 'ACTIVE', NULL, NULL, NULL, NULL,"
+                    f" NULL, NULL, NULL, '{user_id}', 'x', '2024-01-01 00:00:00', '2024-01-01 00:00:00', NULL, 0)"
+                ))
+            with pytest.raises(RuntimeError, match="ann@example.com, Ann@example.com"):
+                await conn.run_sync(database._migrate)
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_checklist_backfill_counts_distinct_steps(self, tmp_path):
+        def upgrade(connection, revision):
+            config = _config()
+            config.attributes["connection"] = connection
+            config.attributes["configure_logger"] = False
+            command.upgrade(config, revision)
+
+        steps = [{"id": "a"}, {"id": "a"}, {"title": "no id"}, {"id": "b"}]
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'checklists.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(upgrade, "0004")
+            await conn.execute(text(
+                "INSERT INTO sop_snapshots (id, sop_version, content_hash, steps, created_at)"
+                " VALUES (:id, 1, 'h', :steps, '2026-01-01 00:00:00')"
+            ), {"id": "0" * 32, "steps": json.dumps(steps)})
+            await conn.execute(text(
+                "INSERT INTO checklists (id, name, snapshot_id, user_id, status, progress, created_at)"
+                " VALUES (:id, 'c', :snapshot, :user, 'ACTIVE', 0, '2026-01-01 00:00:00')"
+            ), {"id": "1" * 32, "snapshot": "0" * 32, "user": "2" * 32})
+            await conn.run_sync(upgrade, "0005")
+            assert (await conn.execute(text("SELECT item_count FROM checklists"))).scalar_one() == 3
+        await engine.dispose()
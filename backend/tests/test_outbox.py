@@ -0,0 +1,160 @@
+"""
+Transactional outbox and its dispatcher
+"""
+
+import pytest
+import uuid
+from app.api.v1.endpoints import sops
+from app.models.outbox import OutboxEvent, OutboxStatus
+from app.models.sop import PDFJob, SOP, SOPStatus
+from app.models.user import UserRole, UserStatus
+from app.schemas.sop import SOPUpdate
+from app.schemas.token import Principal
+from app.services import outbox, pdf
+from app.services.outbox import OutboxDispatcher
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+
+def make_dispatcher(engine, **overrides) -> OutboxDispatcher:
+    options = dict(
+        batch_size=10, concurrency=1, poll_interval=1, max_attempts=3, retry_base_seconds=10, claim_timeout_seconds=60,
+    )
+    dispatcher = OutboxDispatcher(**{**options, **overrides})
+    dispatcher._session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return dispatcher
+
+
+async def remaining(session):
+    session.expire_all()
+    return (await session.execute(select(OutboxEvent).order_by(OutboxEvent.id))).scalars().all()
+
+
+class TestDispatch:
+    """Batches, per-aggregate ordering and transactional handlers"""
+
+    @pytest.mark.asyncio
+    async def test_one_event_per_aggregate_at_a_time(self, engine, session, monkeypatch):
+        handled = []
+
+        async def record(_, event):
+            handled.append((event.aggregate_id, event.payload["n"]))
+
+        monkeypatch.setitem(outbox._handlers, "test.recorded", [record])
+        for aggregate_id, n in [("a", 1), ("a", 2), ("b", 1), ("a", 3)]:
+            outbox.append(session, "test.recorded", "thing", aggregate_id, {"n": n})
+        await session.commit()
+        dispatcher = make_dispatcher(engine)
+
+        assert await dispatcher.run_once() == 2
+        assert handled == [("a", 1), ("b", 1)]
+        assert await dispatcher.run_once() == 1
+        assert await dispatcher.run_once() == 1
+        assert handled[2:] == [("a", 2), ("a", 3)]
+        assert await remaining(session) == []
+        assert dispatcher.stats()["dispatched"] == 4
+
+    @pytest.mark.asyncio
+    async def test_handler_writes_commit_with_the_event(self, engine, session, monkeypatch):
+        attempts, notified = [], []
+
+        async def create_sop(db, event):
+            db.add(SOP(title=event.payload["title"]))
+            outbox.after_commit(db, lambda: notified.append(event.id))
+            attempts.append(event.attempts)
+            if len(attempts) == 1:
+                raise RuntimeError("flaky")
+
+        monkeypatch.setitem(outbox._handlers, "test.create", [create_sop])
+        outbox.append(session, "test.create", "thing", 1, {"title": "Once"})
+        await session.commit()
+        dispatcher = make_dispatcher(engine, retry_base_seconds=0)
+
+        await dispatcher.run_once()
+        assert (await session.execute(select(SOP))).scalars().all() == []
+        assert notified == []
+        await dispatcher.run_once()
+
+        assert [sop.title for sop in (await session.execute(select(SOP))).scalars().all()] == ["Once"]
+        assert attempts == [1, 2]
+        assert len(notified) == 1
+        assert await remaining(session) == []
+
+    @pytest.mark.asyncio
+    async def test_releases_stale_claims(self, engine, session):
+        event = outbox.append(session, "test.unhandled", "thing", 1)
+        event.status, event.claimed_at = OutboxStatus.PROCESSING, datetime.utcnow() - timedelta(minutes=5)
+        await session.commit()
+
+        assert await make_dispatcher(engine).run_once() == 1
+        assert await remaining(session) == []
+
+
+class TestFailures:
+    """Exponential backoff, then dead-lettering"""
+
+    @pytest.mark.asyncio
+    async def test_backoff_holds_the_aggregate_until_dead_lettered(self, engine, session, monkeypatch):
+        handled = []
+
+        async def fail_first(_, event):
+            if event.payload["n"] == 1:
+                raise ValueError("broken payload")
+            handled.append(event.payload["n"])
+
+        monkeypatch.setitem(outbox._handlers, "test.failing", [fail_first])
+        for n in (1, 2):
+            outbox.append(session, "test.failing", "thing", "a", {"n": n})
+        await session.commit()
+        dispatcher = make_dispatcher(engine, max_attempts=2, retry_base_seconds=10)
+
+        assert await dispatcher.run_once() == 1
+        failed, _ = await remaining(session)
+        assert (failed.status, failed.attempts, failed.last_error) == (
+            OutboxStatus.PENDING, 1, "ValueError: broken payload",
+        )
+        assert failed.available_at > datetime.utcnow() + timedelta(seconds=9)
+        # Neither the failed event nor the one behind it is due yet
+        assert await dispatcher.run_once() == 0
+
+        later = datetime.utcnow() + timedelta(seconds=11)
+        assert await dispatcher.run_once(later) == 1
+        assert (await remaining(session))[0].status == OutboxStatus.DEAD
+        assert await dispatcher.run_once(later) == 1
+
+        assert handled == [2]
+        dead, = await remaining(session)
+        assert (dead.status, dead.attempts) == (OutboxStatus.DEAD, 2)
+        assert dispatcher.stats() | {"backlog": 0} == {"backlog": 0, "dispatched": 1, "retried": 1, "dead": 1}
+
+    def test_retry_delay_doubles(self):
+        assert [outbox.retry_delay(attempts, 1.5) for attempts in (1, 2, 3, 4)] == [1.5, 3, 6, 12]
+
+
+class TestSOPUpdates:
+    """Publishing queues the PDF through the outbox instead of inline"""
+
+    @pytest.mark.asyncio
+    async def test_publish_renders_after_dispatch(self, engine, session, monkeypatch, tmp_path):
+        monkeypatch.setattr(pdf.settings, "PDF_STORAGE_DIR", str(tmp_path))
+        notified = []
+        monkeypatch.setattr(pdf.pdf_worker, "notify", lambda: notified.append(True))
+        workspace_id = uuid.uuid4()
+        user = Principal(id=uuid.uuid4(), workspace_id=workspace_id, role=UserRole.ADMIN, status=UserStatus.ACTIVE)
+        sop = SOP(title="Forklift", workspace_id=workspace_id, content={"steps": [{"id": "1", "title": "Check"}]})
+        session.add(sop)
+        await session.commit()
+        sop_id = sop.id
+
+        await sops.update_sop(
+            sop_id=sop_id, session=session, current_user=user, sop_in=SOPUpdate(status=SOPStatus.PUBLISHED),
+        )
+        event, = await remaining(session)
+        assert (event.event_type, event.aggregate_id) == (outbox.SOP_UPDATED, str(sop_id))
+        assert event.payload["status"] == "PUBLISHED"
+        assert (await session.execute(select(PDFJob))).scalars().all() == []
+
+        await make_dispatcher(engine).run_once()
+        assert [job.sop_id for job in (await session.execute(select(PDFJob))).scalars().all()] == [sop_id]
+        assert notified == [True]
@@ -0,0 +1,144 @@
+"""
+PDF rendering queue
+"""
+
+import pytest
+from app.models.sop import PDFGenerationStatus, PDFJob, SOP
+from app.services import pdf
+from app.services.pdf_render import render_pdf
+from datetime import datetime, timedelta
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+
+class TestRenderer:
+    """Standalone PDF writer"""
+
+    def test_paginates_and_escapes(self):
+        blocks = [("title", "Guard (A) \\ B")] + [("body", "line " * 40)] * 80
+        data = render_pdf(blocks)
+        assert data.startswith(b"%PDF-1.4")
+        assert data.rstrip().endswith(b"%%EOF")
+        assert b"Guard \\(A\\) \\\\ B" in data
+        assert data.count(b"/Type /Page ") > 1
+
+
+class TestEnqueue:
+    """Content-hash de-duplication"""
+
+    @pytest.mark.asyncio
+    async def test_skips_rendered_and_queued_content(self, session, tmp_path, monkeypatch):
+        monkeypatch.setattr(pdf.settings, "PDF_STORAGE_DIR", str(tmp_path))
+        sop = SOP(title="Lockout", content={"steps": [{"id": "1", "title": "Isolate"}]})
+        session.add(sop)
+        await session.commit()
+
+        assert await pdf.enqueue(session, sop) is True
+        await session.commit()
+        assert await pdf.enqueue(session, sop) is False
+        assert sop.pdf_status == PDFGenerationStatus.PENDING
+
+        digest = pdf.content_hash(sop)
+        pdf.pdf_path(digest).write_bytes(b"%PDF")
+        job = (await session.execute(select(PDFJob))).scalar_one()
+        job.status = PDFGenerationStatus.COMPLETED
+        sop.pdf_status, sop.pdf_content_hash = PDFGenerationStatus.COMPLETED, digest
+        await session.commit()
+        assert await pdf.enqueue(session, sop) is False
+
+        sop.version += 1
+        assert await pdf.enqueue(session, sop) is True
+
+
+@pytest.fixture
+def worker(engine, tmp_path, monkeypatch):
+    """Worker on the test database; renders on the default thread pool instead of processes"""
+    monkeypatch.setattr(pdf.settings, "PDF_STORAGE_DIR", str(tmp_path))
+    instance = pdf.PDFWorker(workers=2, poll_interval=60, max_attempts=2)
+    instance._session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return instance
+
+
+async def _queued(session, count: int = 1):
+    sops = [SOP(title=f"SOP {index}", content={"steps": [{"id": "1", "title": "Isolate"}]}) for index in range(count)]
+    session.add_all(sops)
+    await session.flush()
+    for sop in sops:
+        await pdf.enqueue(session, sop)
+    await session.commit()
+    return sops
+
+
+async def _job(session, sop_id):
+    session.expire_all()
+    return (await session.execute(select(PDFJob).where(PDFJob.sop_id == sop_id))).scalar_one()
+
+
+class TestWorker:
+    """Claiming, rendering, retries and recovery of stale jobs"""
+
+    @pytest.mark.asyncio
+    async def test_claims_each_job_once(self, worker, session):
+        await _queued(session, 3)
+        first = await worker._claim(2)
+        second = await worker._claim(2)
+        assert len(first) == 2 and len(second) == 1 and not set(first) & set(second)
+        assert await worker._claim(2) == []
+        jobs = (await session.execute(select(PDFJob))).scalars().all()
+        assert {(job.status, job.attempts) for job in jobs} == {(PDFGenerationStatus.PROCESSING, 1)}
+
+    @pytest.mark.asyncio
+    async def test_renders_claimed_job(self, worker, session):
+        sop_id = (await _queued(session))[0].id
+        (job_id,) = await worker._claim(1)
+        await worker._process(job_id)
+
+        job = await _job(session, sop_id)
+        sop = await session.get(SOP, sop_id)
+        assert job.status == PDFGenerationStatus.COMPLETED and sop.pdf_status == PDFGenerationStatus.COMPLETED
+        assert pdf.pdf_path(job.content_hash).read_bytes().startswith(b"%PDF")
+
+    @pytest.mark.asyncio
+    async def test_retries_then_fails(self, worker, session, monkeypatch):
+        def broken(blocks):
+            raise RuntimeError("renderer crashed")
+
+        monkeypatch.setattr(pdf, "render_pdf", broken)
+        sop_id = (await _queued(session))[0].id
+        await worker._process((await worker._claim(1))[0])
+        job = await _job(session, sop_id)
+        assert (job.status, job.error) == (PDFGenerationStatus.PENDING, "renderer crashed")
+
+        await worker._process((await worker._claim(1))[0])
+        job = await _job(session, sop_id)
+        assert (job.status, job.attempts) == (PDFGenerationStatus.FAILED, 2)
+        assert (await session.get(SOP, sop_id)).pdf_status == PDFGenerationStatus.FAILED
+
+    @pytest.mark.asyncio
+    async def test_job_purged_after_claim_is_skipped(self, worker, session):
+        await _queued(session)
+        (job_id,) = await worker._claim(1)
+        await session.execute(delete(PDFJob).where(PDFJob.id == job_id))
+        await session.commit()
+        await worker._process(job_id)
+
+    @pytest.mark.asyncio
+    async def test_recovers_stale_jobs_until_attempts_run_out(self, worker, session):
+        sop_id = (await _queued(session))[0].id
+        long_ago = datetime.utcnow() - timedelta(seconds=pdf.settings.PDF_JOB_TIMEOUT_SECONDS + 1)
+        await worker._claim(1)
+        await session.execute(update(PDFJob).values(started_at=long_ago))
+        await session.commit()
+        await worker._recover()
+        assert (await _job(session, sop_id)).status == PDFGenerationStatus.PENDING
+
+        await worker._claim(1)
+        await session.execute(update(PDFJob).values(started_at=long_ago))
+        await session.execute(update(SOP).values(pdf_status=PDFGenerationStatus.PROCESSING))
+        await session.commit()
+        await worker._recover()
+        job = await _job(session, sop_id)
+        assert (job.status, job.error) == (PDFGenerationStatus.FAILED, "Render timed out")
+        assert (await session.get(SOP, sop_id)).pdf_status == PDFGenerationStatus.FAILED
+        assert worker.failed == 1
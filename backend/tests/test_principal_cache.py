@@ -0,0 +1,81 @@
+"""
+Principal cache used by get_current_user
+"""
+
+import pytest
+from app.core.principal_cache import PrincipalCache, principal_cache
+from app.models.user import UserRole
+
+
+class TestPrincipalCache:
+    """LRU, TTL and version-stamp behaviour"""
+
+    def test_hit_returns_independent_copy(self, make_user):
+        cache = PrincipalCache(max_size=10, ttl_seconds=60)
+        user = make_user()
+        assert cache.get(user.id) is None
+        cache.set(user, cache.stamp())
+
+        first = cache.get(user.id)
+        second = cache.get(user.id)
+        assert first.email == user.email
+        assert first is not second
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self, make_user):
+        cache = PrincipalCache(max_size=2, ttl_seconds=60)
+        users = [make_user() for _ in range(3)]
+        cache.set(users[0], cache.stamp())
+        cache.set(users[1], cache.stamp())
+        cache.get(users[0].id)
+        cache.set(users[2], cache.stamp())
+
+        assert cache.get(users[1].id) is None
+        assert cache.get(users[0].id) is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_expired_entries_miss(self, make_user):
+        cache = PrincipalCache(max_size=10, ttl_seconds=0)
+        user = make_user()
+        cache.set(user, cache.stamp())
+        assert cache.get(user.id) is None
+
+    def test_invalidate_rejects_in_flight_load(self, make_user):
+        cache = PrincipalCache(max_size=10, ttl_seconds=60)
+        user = make_user()
+        stamp = cache.stamp()
+        cache.invalidate(user.id)
+        cache.set(user, stamp)
+        assert cache.get(user.id) is None
+
+
+    def test_remembers_invalidations_of_at_most_max_size_users(self, make_user):
+        cache = PrincipalCache(max_size=2, ttl_seconds=60)
+        users = [make_user() for _ in range(4)]
+        stale = cache.stamp()
+        for user in users:
+            cache.invalidate(user.id)
+        assert len(cache._invalidated) == 2
+
+        cache.set(users[0], stale)  # forgotten invalidation: still rejected by the floor
+        assert cache.get(users[0].id) is None
+        cache.set(users[0], cache.stamp())
+        assert cache.get(users[0].id) is not None
+
+
+class TestInvalidationHooks:
+    """Flushed user changes drop the cached principal"""
+
+    @pytest.mark.asyncio
+    async def test_role_change_invalidates(self, session, make_user):
+        user = make_user()
+        session.add(user)
+        await session.commit()
+
+        principal_cache.set(user, principal_cache.stamp())
+        assert principal_cache.get(user.id) is not None
+
+        user.role = UserRole.ADMIN
+        await session.commit()
+        assert principal_cache.get(user.id) is None
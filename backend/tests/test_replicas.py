@@ -0,0 +1,151 @@
+"""
+Read replica routing
+"""
+
+import httpx
+import pytest
+import pytest_asyncio
+import uuid
+from app.core import replicas
+from app.core.database import SCHEMA_REVISION, create_engine
+from app.core.replicas import PRINCIPAL_KEY, STICKY_COOKIE, ReadYourWritesMiddleware, ReplicaRouter
+from app.models.user import User
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import SQLModel
+
+
+async def _stamped_database(path) -> str:
+    url = f"sqlite+aiosqlite:///{path}"
+    engine = create_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        await conn.execute(text(f"INSERT INTO alembic_version VALUES ('{SCHEMA_REVISION}')"))
+    await engine.dispose()
+    return url
+
+
+@pytest_asyncio.fixture
+async def router(tmp_path):
+    """Two SQLite files standing in for read replicas"""
+    import app.models.folder  # noqa: F401
+    import app.models.sop  # noqa: F401
+
+    urls = [await _stamped_database(tmp_path / f"replica{index}.db") for index in range(2)]
+    replica_router = ReplicaRouter([create_engine(url) for url in urls], sticky_seconds=60)
+    yield replica_router
+    await replica_router.stop()
+
+
+class TestSelection:
+    """Round-robin, least-connections and fallback to the primary"""
+
+    @pytest.mark.asyncio
+    async def test_round_robin(self, router):
+        chosen = [router.choose() for _ in range(4)]
+        assert chosen == [router.replicas[0], router.replicas[1]] * 2
+
+    @pytest.mark.asyncio
+    async def test_least_connections(self, router):
+        router.selection = replicas.LEAST_CONNECTIONS
+        first = router.acquire()
+        second = router.acquire()
+        assert first is not second
+        router.release(first)
+        assert router.acquire() is first
+
+    @pytest.mark.asyncio
+    async def test_no_healthy_replica_reads_primary(self, router):
+        for replica in router.replicas:
+            router.evict(replica, "test")
+        assert router.acquire() is None
+        assert router.stats()["primary_reads"] == 1
+
+    def test_unknown_strategy_is_rejected(self):
+        with pytest.raises(ValueError):
+            ReplicaRouter([], selection="random")
+
+
+class TestReadYourWrites:
+    """A user's reads stay on the primary after they commit a write"""
+
+    @pytest.mark.asyncio
+    async def test_recent_writer_is_sticky(self, router):
+        user_id = uuid.uuid4()
+        router.note_write(user_id)
+        assert router.choose(user_id) is None
+        assert router.choose(uuid.uuid4()) is not None
+
+    @pytest.mark.asyncio
+    async def test_committed_flush_marks_principal(self, engine, monkeypatch):
+        module_router = ReplicaRouter([], sticky_seconds=60)
+        monkeypatch.setattr(replicas, "replica_router", module_router)
+        user_id = uuid.uuid4()
+
+        async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+            session.info[PRINCIPAL_KEY] = user_id
+            await session.execute(text("SELECT 1"))
+            await session.commit()
+            assert not module_router.is_sticky(user_id)
+
+            session.add(User(email="writer@example.com", first_name="W", last_name="R", hashed_password="x"))
+            await session.commit()
+        assert module_router.is_sticky(user_id)
+
+    @pytest.mark.asyncio
+    async def test_signed_cookie_is_sticky_in_any_worker(self, router):
+        user_id = uuid.uuid4()
+        cookie = router.sticky_cookie(user_id)
+        other_worker = ReplicaRouter([replica.engine for replica in router.replicas])
+        assert other_worker.choose(user_id, cookie) is None
+        assert other_worker.choose(uuid.uuid4(), cookie) is not None
+
+        owner, until, signature = cookie.split(":")
+        forged = f"{owner}:{float(until) + 3600:.3f}:{signature}"
+        expired = ReplicaRouter([], sticky_seconds=-1).sticky_cookie(user_id)
+        for rejected in (forged, expired, "garbage", None):
+            assert not other_worker.cookie_is_sticky(rejected, user_id)
+
+    @pytest.mark.asyncio
+    async def test_writing_response_sets_cookie(self, engine, monkeypatch):
+        module_router = ReplicaRouter([], sticky_seconds=60)
+        monkeypatch.setattr(replicas, "replica_router", module_router)
+        user_id = uuid.uuid4()
+        application = FastAPI()
+        application.add_middleware(ReadYourWritesMiddleware)
+
+        @application.post("/write")
+        async def write():
+            async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+                session.info[PRINCIPAL_KEY] = user_id
+                session.add(User(email="cookie@example.com", first_name="C", last_name="K", hashed_password="x"))
+                await session.commit()
+
+        @application.get("/read")
+        async def read():
+            return None
+
+        async with httpx.AsyncClient(app=application, base_url="http://test") as client:
+            assert STICKY_COOKIE not in (await client.get("/read")).cookies
+            cookie = (await client.post("/write")).cookies[STICKY_COOKIE]
+        assert module_router.cookie_is_sticky(cookie, user_id)
+
+
+class TestHealth:
+    """Health checks evict and readmit replicas"""
+
+    @pytest.mark.asyncio
+    async def test_unmigrated_replica_is_evicted_until_stamped(self, router, tmp_path):
+        bare = tmp_path / "bare.db"
+        bare.touch()
+        router.replicas.append(ReplicaRouter([create_engine(f"sqlite+aiosqlite:///{bare}")]).replicas[0])
+        await router.check_all()
+        assert [replica.healthy for replica in router.replicas] == [True, True, False]
+
+        await router.replicas[2].engine.dispose()
+        await _stamped_database(bare)
+        await router.check_all()
+        assert router.replicas[2].healthy
+        assert router.replicas[2].evictions == 1
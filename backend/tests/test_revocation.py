@@ -0,0 +1,178 @@
+"""
+Stateless access tokens and the token revocation filter
+"""
+
+import pytest
+import uuid
+from app.api import deps
+from app.api.v1.endpoints import auth
+from app.core import security
+from app.core.revocation import RevocationFilter, revocation_filter
+from app.models.user import TokenRevocation, User, UserRole, UserStatus
+from app.schemas.token import Principal, RefreshTokenRequest
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+
+def stateless_token(user: User, token_version: int = 0) -> str:
+    return security.create_access_token(str(user.id), claims={
+        "role": user.role.value,
+        "workspace_id": None,
+        "status": user.status.value,
+        "token_version": token_version,
+    })
+
+
+@pytest.fixture(autouse=True)
+def empty_filter():
+    revocation_filter.clear()
+    yield
+    revocation_filter.clear()
+
+
+class TestRevocationFilter:
+    """Version thresholds, retention and incremental refresh"""
+
+    def test_only_older_versions_are_revoked(self):
+        revoked = RevocationFilter(retention_seconds=60, refresh_interval=5)
+        user_id = uuid.uuid4()
+        revoked.add(user_id, 2, datetime.utcnow())
+        revoked.add(user_id, 1, datetime.utcnow())
+
+        assert revoked.is_revoked(user_id, 1)
+        assert not revoked.is_revoked(user_id, 2)
+        assert not revoked.is_revoked(uuid.uuid4(), 0)
+        assert revoked.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_refresh_loads_recent_rows_and_prunes_old_ones(self, engine, session):
+        recent, stale = uuid.uuid4(), uuid.uuid4()
+        session.add(TokenRevocation(user_id=recent, token_version=1, revoked_at=datetime.utcnow()))
+        session.add(TokenRevocation(
+            user_id=stale, token_version=1, revoked_at=datetime.utcnow() - timedelta(hours=1),
+        ))
+        await session.commit()
+
+        revoked = RevocationFilter(retention_seconds=60, refresh_interval=5)
+        revoked._session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await revoked.refresh()
+
+        assert revoked.is_revoked(recent, 0)
+        assert not revoked.is_revoked(stale, 0)
+        remaining = (await session.execute(select(TokenRevocation.user_id))).scalars().all()
+        assert remaining == [recent]
+
+
+class TestTokenVersion:
+    """Changes to authorization-relevant fields revoke outstanding tokens"""
+
+    @pytest.mark.asyncio
+    async def test_role_change_bumps_version_and_records_revocation(self, session, make_user):
+        user = make_user()
+        session.add(user)
+        await session.commit()
+        assert user.token_version == 0
+
+        user.role = UserRole.ADMIN
+        session.add(user)
+        await session.commit()
+
+        assert user.token_version == 1
+        rows = (await session.execute(select(TokenRevocation))).scalars().all()
+        assert [(row.user_id, row.token_version) for row in rows] == [(user.id, 1)]
+        assert revocation_filter.is_revoked(user.id, 0)
+
+    @pytest.mark.asyncio
+    async def test_unrelated_change_keeps_version(self, session, make_user):
+        user = make_user()
+        session.add(user)
+        await session.commit()
+
+        user.first_name = "Renamed"
+        session.add(user)
+        await session.commit()
+
+        assert user.token_version == 0
+        assert (await session.execute(select(TokenRevocation))).first() is None
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_change_is_not_applied(self, session, make_user):
+        user = make_user()
+        session.add(user)
+        await session.commit()
+
+        user_id = user.id
+        user.is_active = False
+        session.add(user)
+        await session.flush()
+        await session.rollback()
+
+        assert not revocation_filter.is_revoked(user_id, 0)
+
+
+class TestPrincipal:
+    """get_current_principal reads claims instead of the user row"""
+
+    @pytest.mark.asyncio
+    async def test_claims_need_no_user_row(self, session, make_user):
+        user = make_user(role=UserRole.ADMIN)
+        principal = await deps.get_current_principal(session=session, token=stateless_token(user))
+
+        assert principal.id == user.id
+        assert principal.role == UserRole.ADMIN
+        assert principal.workspace_id is None
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_is_rejected(self, session, make_user):
+        user = make_user()
+        revocation_filter.add(user.id, 1, datetime.utcnow())
+
+        with pytest.raises(HTTPException) as error:
+            await deps.get_current_principal(session=session, token=stateless_token(user))
+        assert error.value.status_code == 401
+        assert error.value.detail == "Token has been revoked"
+
+    @pytest.mark.asyncio
+    async def test_legacy_token_falls_back_to_user_row(self, session, make_user):
+        user = make_user(role=UserRole.MANAGER)
+        session.add(user)
+        await session.commit()
+
+        token = security.create_access_token(str(user.id))
+        principal = await deps.get_current_principal(session=session, token=token)
+        assert principal.id == user.id
+        assert principal.role == UserRole.MANAGER
+
+
+class TestRefreshTokens:
+    """Refresh tokens rotate on use; a replayed one signs the user out everywhere"""
+
+    async def _refresh(self, session, token):
+        return await auth.refresh_access_token(session=session, refresh_in=RefreshTokenRequest(refresh_token=token))
+
+    @pytest.mark.asyncio
+    async def test_rotation_and_reuse_detection(self, session, monkeypatch, make_user):
+        monkeypatch.setattr(auth.settings, "AUTH_STATELESS_TOKENS", True)
+        user = make_user()
+        session.add(user)
+        first = (await auth._issue_tokens(session, user)).refresh_token
+        await session.commit()
+
+        second = (await self._refresh(session, first)).refresh_token
+        assert second != first
+
+        with pytest.raises(HTTPException) as error:
+            await self._refresh(session, first)
+        assert error.value.status_code == 401
+        assert user.token_version == 1 and revocation_filter.is_revoked(user.id, 0)
+        with pytest.raises(HTTPException):
+            await self._refresh(session, second)
+
+    @pytest.mark.asyncio
+    async def test_revoke_for_deleted_user(self, session):
+        principal = Principal(id=uuid.uuid4(), role=UserRole.MEMBER, status=UserStatus.ACTIVE)
+        with pytest.raises(HTTPException) as error:
+            await auth.revoke_tokens(session=session, current_user=principal)
+        assert error.value.status_code == 401
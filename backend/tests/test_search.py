@@ -0,0 +1,77 @@
+"""
+SOP full-text search index
+"""
+
+import pytest
+import uuid
+from app.models.sop import SOP, SOPStatus
+from app.services import search
+
+
+def step(title, text):
+    return {
+        "id": uuid.uuid4().hex,
+        "title": title,
+        "description": {"type": "doc", "content": [{"type": "paragraph", "content": [{"type": "text", "text": text}]}]},
+        "order": 1,
+    }
+
+
+class TestExtractText:
+    """Text extraction from the step tree"""
+
+    def test_walks_titles_and_rich_text(self):
+        content = {"steps": [step("Lock out", "Isolate the breaker"), {"title": "Verify", "description": "Test dead"}]}
+        text = search.extract_text(content)
+        assert "Lock out" in text
+        assert "Isolate the breaker" in text
+        assert "Test dead" in text
+        assert "paragraph" not in text
+
+
+class TestSearchIndex:
+    """Index maintenance and querying on SQLite FTS5"""
+
+    @pytest.mark.asyncio
+    async def test_index_follows_create_update_delete(self, session):
+        workspace_id = uuid.uuid4()
+        sop = SOP(
+            title="Forklift inspection",
+            short_description="Daily pre-shift check",
+            content={"steps": [step("Hydraulics", "Check every hydraulic hose for leaks")]},
+            workspace_id=workspace_id,
+        )
+        session.add(sop)
+        await session.commit()
+
+        hits = await search.search_sops(session, "hydra", workspace_id)
+        assert [hit["id"] for hit in hits] == [sop.id]
+        assert "<mark>hydraulic</mark>" in hits[0]["snippet"]
+        assert await search.search_sops(session, "hydra", uuid.uuid4()) == []
+
+        sop.title = "Pallet jack inspection"
+        await session.commit()
+        assert await search.search_sops(session, "forklift", workspace_id) == []
+        hits = await search.search_sops(session, "pallet insp", workspace_id)
+        assert hits[0]["title_highlight"].startswith("<mark>Pallet</mark>")
+
+        sop.status = SOPStatus.DELETED
+        await session.commit()
+        assert await search.search_sops(session, "pallet", workspace_id) == []
+        assert len(await search.search_sops(session, "pallet", workspace_id, [SOPStatus.DELETED])) == 1
+
+        await session.delete(sop)
+        await session.commit()
+        assert await search.search_sops(session, "pallet", workspace_id, [SOPStatus.DELETED]) == []
+
+    @pytest.mark.asyncio
+    async def test_title_matches_rank_first(self, session):
+        workspace_id = uuid.uuid4()
+        body_match = SOP(title="Shift handover", content={"steps": [step("Notes", "Record ladder checks")]},
+                         workspace_id=workspace_id)
+        title_match = SOP(title="Ladder safety", content={"steps": []}, workspace_id=workspace_id)
+        session.add_all([body_match, title_match])
+        await session.commit()
+
+        hits = await search.search_sops(session, "ladder", workspace_id)
+        assert [hit["id"] for hit in hits] == [title_match.id, body_match.id]
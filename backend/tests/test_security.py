@@ -0,0 +1,43 @@
+"""
+Password hashing pool and rehash-on-login
+"""
+
+import asyncio
+import pytest
+import threading
+from app.core import security
+from passlib.context import CryptContext
+
+
+class TestPasswordHasher:
+    """Admission control on the bcrypt worker pool"""
+
+    @pytest.mark.asyncio
+    async def test_sheds_load_when_saturated(self):
+        hasher = security.PasswordHasher(max_workers=1, max_pending=0, retry_after=3)
+        release = threading.Event()
+        running = asyncio.ensure_future(hasher.run(release.wait))
+        await asyncio.sleep(0)
+
+        with pytest.raises(security.PasswordHasherBusy) as exc_info:
+            await hasher.run(lambda: None)
+        assert exc_info.value.retry_after == 3
+        assert hasher.rejected == 1
+
+        release.set()
+        assert await running is True
+        assert hasher.in_flight == 0
+        hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_outdated_hash_is_upgraded(self, monkeypatch):
+        old = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+        new = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5)
+        monkeypatch.setattr(security, "pwd_context", new)
+
+        verified, new_hash = await security.verify_and_update_password("secret", old.hash("secret"))
+        assert verified
+        assert new_hash and new.verify("secret", new_hash)
+
+        verified, new_hash = await security.verify_and_update_password("secret", new.hash("secret"))
+        assert verified and new_hash is None
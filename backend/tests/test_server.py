@@ -0,0 +1,32 @@
+"""
+Production server configuration
+"""
+
+from app.core import server
+from app.core.config import settings
+
+
+class TestServerOptions:
+    """Worker count, event loop and gunicorn settings derived from Settings"""
+
+    def test_explicit_worker_count_wins(self):
+        assert server.worker_count(3) == 3
+
+    def test_zero_workers_means_one_per_cpu(self):
+        assert server.worker_count(0) >= 1
+
+    def test_explicit_loop_and_http_are_kept(self):
+        assert server.resolve_loop("asyncio") == "asyncio"
+        assert server.resolve_http("h11") == "h11"
+        assert server.resolve_loop("auto") in ("uvloop", "asyncio")
+        assert server.resolve_http("auto") in ("httptools", "h11")
+
+    def test_gunicorn_options(self):
+        options = server.gunicorn_options()
+        assert options["bind"] == f"{settings.SERVER_HOST}:{settings.SERVER_PORT}"
+        assert options["worker_class"] == "app.core.server.UvicornWorker"
+        assert options["max_requests"] == settings.SERVER_MAX_REQUESTS
+        assert options["keepalive"] == settings.SERVER_KEEPALIVE_SECONDS
+
+    def test_unlimited_concurrency_is_none(self):
+        assert server.uvicorn_options()["limit_concurrency"] == (settings.SERVER_LIMIT_CONCURRENCY or None)
@@ -0,0 +1,139 @@
+"""
+MinHash/LSH near-duplicate detection
+"""
+
+import numpy as np
+import pytest
+import uuid
+from app.api.v1.endpoints import sops
+from app.core.config import settings
+from app.models.similarity import SOPSignature, SOPSimilarityBucket
+from app.models.sop import SOP
+from app.models.user import UserRole, UserStatus
+from app.schemas.sop import SOPCreate
+from app.schemas.token import Principal
+from app.services import similarity
+from datetime import datetime
+from sqlalchemy import delete, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+WORKSPACE_ID = uuid.uuid4()
+
+
+def procedure(words, replace=None):
+    words = list(words)
+    for index, word in (replace or {}).items():
+        words[index] = word
+    # Spread over steps, as the step text is what gets compared
+    return {"steps": [
+        {"id": str(step), "title": " ".join(words[start:start + 10])}
+        for step, start in enumerate(range(0, len(words), 10))
+    ]}
+
+
+ORIGINAL = [f"word{index}" for index in range(80)]
+UNRELATED = [f"other{index}" for index in range(80)]
+
+
+class TestSignatures:
+    """Vectorized MinHash"""
+
+    def test_estimates_jaccard(self):
+        first = np.arange(0, 1000, dtype=np.uint64)
+        second = np.arange(250, 1250, dtype=np.uint64)  # Jaccard 750 / 1250 = 0.6
+        a, b = similarity.signatures([first, second])
+        assert abs(float((a == b).mean()) - 0.6) < 0.12
+
+    def test_batch_matches_single_and_skips_empty(self, monkeypatch):
+        documents = [similarity.shingle_hashes(procedure(ORIGINAL)), np.empty(0, dtype=np.uint64),
+                     similarity.shingle_hashes(procedure(UNRELATED))]
+        monkeypatch.setattr(similarity, "_MAX_CELLS", 1)  # one document per NumPy step
+        chunked = similarity.signatures(documents)
+        monkeypatch.undo()
+        batched = similarity.signatures(documents)
+
+        assert chunked[1] is None and batched[1] is None
+        for single, batch in zip(chunked[::2], batched[::2]):
+            assert np.array_equal(single, batch)
+            assert batch.dtype == np.uint32 and len(batch) == 128
+        assert len(similarity.band_buckets(batched[0])) == settings.SIMILARITY_BANDS
+
+    def test_configured_threshold_is_above_the_recall_floor(self):
+        rows = settings.SIMILARITY_NUM_PERM // settings.SIMILARITY_BANDS
+
+        def recall(jaccard):
+            return 1 - (1 - jaccard ** rows) ** settings.SIMILARITY_BANDS
+
+        assert recall(similarity.MIN_THRESHOLD) >= 0.95 > recall(similarity.MIN_THRESHOLD - 0.01)
+        assert recall(settings.SIMILARITY_THRESHOLD) > 0.999
+
+    def test_short_text_is_one_shingle(self):
+        assert len(similarity.shingle_hashes({"steps": [{"title": "Wear gloves"}]})) == 1
+        assert len(similarity.shingle_hashes({"steps": []})) == 0
+
+
+class TestIndex:
+    """Mapper events keep signatures current; lookups go through LSH buckets"""
+
+    @pytest.mark.asyncio
+    async def test_finds_near_copies_only(self, session):
+        original = SOP(title="Original", workspace_id=WORKSPACE_ID, content=procedure(ORIGINAL))
+        copy = SOP(title="Copy", workspace_id=WORKSPACE_ID, content=procedure(ORIGINAL, {5: "changed"}))
+        unrelated = SOP(title="Unrelated", workspace_id=WORKSPACE_ID, content=procedure(UNRELATED))
+        elsewhere = SOP(title="Other workspace", workspace_id=uuid.uuid4(), content=procedure(ORIGINAL))
+        session.add_all([original, copy, unrelated, elsewhere])
+        await session.commit()
+
+        similar = await similarity.find_similar(session, original.id)
+        assert [item["title"] for item in similar] == ["Copy"]
+        assert 0.8 <= similar[0]["similarity"] < 1
+
+        copy.content = procedure(UNRELATED, {0: "changed"})
+        await session.commit()
+        assert await similarity.find_similar(session, original.id) == []
+        assert [item["title"] for item in await similarity.find_similar(session, unrelated.id)] == ["Copy"]
+
+        copy.deleted_at = datetime.utcnow()
+        await session.commit()
+        assert await similarity.find_similar(session, unrelated.id) == []
+
+        await session.delete(copy)
+        await session.commit()
+        remaining = (await session.execute(select(func.count()).select_from(SOPSimilarityBucket))).scalar_one()
+        assert remaining == 3 * settings.SIMILARITY_BANDS
+
+    @pytest.mark.asyncio
+    async def test_rebuild(self, engine, session):
+        session.add_all([
+            SOP(title=f"SOP {index}", workspace_id=WORKSPACE_ID, content=procedure(ORIGINAL, {index: "x"}))
+            for index in range(5)
+        ])
+        await session.commit()
+        await session.execute(delete(SOPSimilarityBucket))
+        await session.execute(delete(SOPSignature))
+        await session.commit()
+
+        factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        assert await similarity.rebuild(factory, batch_size=2) == 5
+
+        first = (await session.execute(select(SOP.id).where(SOP.title == "SOP 0"))).scalar_one()
+        assert len(await similarity.find_similar(session, first)) == 4
+
+
+class TestCreateWarning:
+    """Creating an SOP reports the near-duplicates it adds to"""
+
+    @pytest.mark.asyncio
+    async def test_create_returns_similar_sops(self, session):
+        user = Principal(id=uuid.uuid4(), workspace_id=WORKSPACE_ID, role=UserRole.ADMIN, status=UserStatus.ACTIVE)
+        first = await sops.create_sop(
+            session=session, current_user=user, sop_in=SOPCreate(title="Lockout", content=procedure(ORIGINAL)),
+        )
+        assert first.similar_sops == []
+
+        second = await sops.create_sop(
+            session=session, current_user=user,
+            sop_in=SOPCreate(title="Lockout (copy)", content=procedure(ORIGINAL, {40: "padlock"})),
+        )
+        assert [(item.id, item.title) for item in second.similar_sops] == [(first.id, "Lockout")]
@@ -0,0 +1,115 @@
+"""
+Trash purge of expired soft-deleted SOPs
+"""
+
+import pytest
+from app.models.checklist import Checklist, SOPAssignment, SOPSnapshot
+from app.models.folder import Folder, SOPFolder
+from app.models.sop import PDFJob, SOP, SOPStatus, SOPVersion
+from app.models.user import User
+from app.services.trash import TrashPurger, purge_batch
+from datetime import datetime, timedelta
+from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+NOW = datetime(2026, 6, 1)
+
+
+async def _trashed_sop(session, title: str, purge_at) -> SOP:
+    sop = SOP(
+        title=title,
+        status=SOPStatus.DELETED if purge_at else SOPStatus.DRAFT,
+        content={"steps": [{"id": "1", "title": "Inspect the valve"}]},
+        deleted_at=purge_at - timedelta(days=30) if purge_at else None,
+        permanent_delete_at=purge_at,
+    )
+    session.add(sop)
+    await session.flush()
+    folder = Folder(name=f"{title} folder")
+    session.add(folder)
+    await session.flush()
+    session.add_all([
+        SOPVersion(sop_id=sop.id, version_number=1, is_snapshot=True, content=sop.content),
+        PDFJob(sop_id=sop.id, content_hash="x"),
+        SOPFolder(sop_id=sop.id, folder_id=folder.id),
+    ])
+    await session.commit()
+    return sop
+
+
+async def _count(session, model) -> int:
+    return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+class TestPurgeBatch:
+    """One bounded transaction"""
+
+    @pytest.mark.asyncio
+    async def test_deletes_expired_sops_and_dependents(self, session):
+        await _trashed_sop(session, "Expired", NOW - timedelta(days=1))
+        await _trashed_sop(session, "Not yet", NOW + timedelta(days=1))
+        await _trashed_sop(session, "Live", None)
+
+        assert await purge_batch(session, NOW, limit=10) == 1
+
+        titles = (await session.execute(select(SOP.title).order_by(SOP.title))).scalars().all()
+        assert titles == ["Live", "Not yet"]
+        assert await _count(session, SOPVersion) == 2
+        assert await _count(session, PDFJob) == 2
+        assert await _count(session, SOPFolder) == 2
+        indexed = (await session.execute(text("SELECT count(*) FROM sop_search"))).scalar_one()
+        assert indexed == 2
+
+    @pytest.mark.asyncio
+    async def test_keeps_checklists_detached(self, session):
+        sop = await _trashed_sop(session, "Expired", NOW - timedelta(days=1))
+        user = User(email="assignee@example.com", first_name="A", last_name="B", hashed_password="x")
+        session.add(user)
+        await session.flush()
+        snapshot = SOPSnapshot(sop_id=sop.id, sop_version=1, content_hash="x", steps=sop.content["steps"])
+        session.add(snapshot)
+        await session.flush()
+        session.add_all([
+            SOPAssignment(sop_id=sop.id, user_id=user.id),
+            Checklist(name=sop.title, sop_id=sop.id, snapshot_id=snapshot.id, user_id=user.id),
+        ])
+        await session.commit()
+
+        assert await purge_batch(session, NOW, limit=10) == 1
+
+        assert await _count(session, SOPAssignment) == 0
+        checklist = (await session.execute(select(Checklist.sop_id, Checklist.snapshot_id))).one()
+        assert checklist == (None, snapshot.id)
+        assert (await session.execute(select(SOPSnapshot.sop_id))).scalar_one() is None
+
+    @pytest.mark.asyncio
+    async def test_respects_limit_oldest_first(self, session):
+        for days in (3, 1, 2):
+            await _trashed_sop(session, f"Expired {days}", NOW - timedelta(days=days))
+
+        assert await purge_batch(session, NOW, limit=2) == 2
+        remaining = (await session.execute(select(SOP.title))).scalars().all()
+        assert remaining == ["Expired 1"]
+
+
+class TestTrashPurger:
+    """Runs batches until done, throttled by the duty cycle"""
+
+    @pytest.mark.asyncio
+    async def test_run_purges_everything_due_in_batches(self, engine, session):
+        for index in range(5):
+            await _trashed_sop(session, f"Expired {index}", NOW - timedelta(hours=index + 1))
+        purger = TrashPurger(interval=60, batch_size=2, duty_cycle=1.0, min_pause=0)
+        purger._session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        assert await purger.run_once(NOW) == 5
+        assert purger.last_run["batches"] == 3
+        assert purger.stats()["purged"] == 5
+        assert await _count(session, SOP) == 0
+        assert await purger.run_once(NOW) == 0
+
+    def test_pause_keeps_duty_cycle(self):
+        purger = TrashPurger(interval=60, batch_size=100, duty_cycle=0.25, min_pause=0.05)
+        assert purger.pause_after(0.1) == pytest.approx(0.3)
+        assert purger.pause_after(0.001) == 0.05
@@ -0,0 +1,113 @@
+"""
+Streaming bulk user import
+"""
+
+import pytest
+from app.api.v1.endpoints import auth, users
+from app.core import security
+from app.models.user import User, UserRole, UserStatus
+from app.schemas.user import UserCreate
+from app.services import user_import
+from fastapi import HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlmodel import select
+
+
+async def chunked(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+class TestParsing:
+    """Incremental CSV / NDJSON parsing"""
+
+    @pytest.mark.asyncio
+    async def test_csv_with_quoted_newline(self):
+        body = 'email,first_name,last_name\r\na@example.com,"Ann\nMarie",Lee\r\n\r\nb@example.com,Bo,\r\n'.encode()
+        records = await collect(user_import.iter_records(chunked(body), "text/csv; charset=utf-8"))
+        assert records == [
+            {"email": "a@example.com", "first_name": "Ann\nMarie", "last_name": "Lee"},
+            {"email": "b@example.com", "first_name": "Bo"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_ndjson_flags_bad_lines(self):
+        body = b'{"email": "a@example.com"}\nnot json\n[1]\n'
+        records = await collect(user_import.iter_records(chunked(body), "application/x-ndjson"))
+        assert records[0] == {"email": "a@example.com"}
+        assert "__error__" in records[1] and "__error__" in records[2]
+
+    @pytest.mark.asyncio
+    async def test_rejects_unknown_format(self):
+        with pytest.raises(user_import.UnsupportedFormat):
+            await collect(user_import.iter_records(chunked(b"x"), "text/plain"))
+
+
+class TestImport:
+    """Batched validation, duplicate detection and inserts"""
+
+    @pytest.mark.asyncio
+    async def test_report_per_row(self, session, monkeypatch):
+        monkeypatch.setattr(user_import.settings, "USER_IMPORT_BATCH_SIZE", 2)
+        session.add(User(email="taken@example.com", first_name="T", last_name="T", hashed_password="x"))
+        await session.commit()
+
+        async def rows():
+            yield {"email": "new@example.com", "first_name": "N", "last_name": "N"}
+            yield {"email": "taken@example.com", "first_name": "T", "last_name": "T"}
+            yield {"email": "new@example.com", "first_name": "N", "last_name": "N"}
+            yield {"email": "broken", "first_name": "B", "last_name": "B"}
+
+        report = await user_import.import_users(session, rows(), None, UserRole.ADMIN)
+        assert [result.status for result in report.results] == ["invited", "exists", "duplicate", "invalid"]
+        assert (report.invited, report.created, report.failed) == (1, 0, 3)
+
+        invited = (await session.execute(select(User).where(User.email == "new@example.com"))).scalar_one()
+        assert invited.status == UserStatus.PENDING
+        assert invited.hashed_password == security.UNUSABLE_PASSWORD
+
+    @pytest.mark.asyncio
+    async def test_emails_are_case_insensitive(self, session):
+        session.add(User(email="bob@example.com", first_name="B", last_name="B", hashed_password="x"))
+        await session.commit()
+
+        async def rows():
+            yield {"email": "Bob@Example.com", "first_name": "B", "last_name": "B"}
+            yield {"email": "Ann@example.com", "first_name": "A", "last_name": "A"}
+            yield {"email": "ann@example.com", "first_name": "A", "last_name": "A"}
+
+        report = await user_import.import_users(session, rows(), None, UserRole.ADMIN)
+        assert [result.status for result in report.results] == ["exists", "invited", "duplicate"]
+        emails = (await session.execute(select(User.email).order_by(User.email))).scalars().all()
+        assert emails == ["ann@example.com", "bob@example.com"]
+
+    @pytest.mark.asyncio
+    async def test_imported_user_signs_in_and_blocks_case_variants(self, session):
+        async def rows():
+            yield {"email": "Carol@Example.com", "first_name": "C", "last_name": "C", "password": "secret-pass",
+                   "status": "ACTIVE"}
+
+        await user_import.import_users(session, rows(), None, UserRole.ADMIN)
+        with pytest.raises(HTTPException) as error:
+            await users.create_user(session=session, user_in=UserCreate(
+                email="CAROL@example.com", first_name="C", last_name="C", password="other-pass",
+            ))
+        assert error.value.status_code == 400
+
+        form = OAuth2PasswordRequestForm(username="Carol@Example.com", password="secret-pass")
+        assert (await auth.login_access_token(session=session, form_data=form)).access_token
+
+    @pytest.mark.asyncio
+    async def test_cannot_grant_a_higher_role(self, session):
+        async def rows():
+            yield {"email": "root@example.com", "first_name": "R", "last_name": "R", "role": "SUPER_ADMIN"}
+            yield {"email": "peer@example.com", "first_name": "P", "last_name": "P", "role": "ADMIN"}
+
+        report = await user_import.import_users(session, rows(), None, UserRole.ADMIN)
+        assert [result.status for result in report.results] == ["invalid", "invited"]
+        assert "SUPER_ADMIN" in report.results[0].detail
+        assert (await session.execute(select(User.role))).scalars().all() == [UserRole.ADMIN]
@@ -0,0 +1,69 @@
+"""
+Delta-compressed SOP version history
+"""
+
+import pytest
+from app.models.sop import SOP, SOPVersion
+from app.services import versioning
+from sqlmodel import select
+
+
+def content(*titles):
+    return {"steps": [{"id": str(i), "title": title, "order": i} for i, title in enumerate(titles)]}
+
+
+class TestPatch:
+    """JSON Patch generation and application"""
+
+    @pytest.mark.parametrize("old, new", [
+        (content("a", "b", "c"), content("a", "x")),
+        (content("a"), content("a", "b", "c")),
+        ({"steps": [], "meta/x": {"~k": 1}}, {"steps": [1], "meta/x": {"~k": 2}, "extra": None}),
+        ({"a": [1, [2, 3]]}, {"a": "replaced"}),
+    ])
+    def test_round_trip(self, old, new):
+        patch = versioning.make_patch(old, new)
+        assert versioning.apply_patch(old, patch) == new
+
+    def test_does_not_mutate_input(self):
+        old = content("a")
+        versioning.apply_patch(old, versioning.make_patch(old, content("b")))
+        assert old == content("a")
+
+
+class TestHistory:
+    """Snapshots, deltas and reconstruction"""
+
+    @pytest.mark.asyncio
+    async def test_reconstructs_every_version(self, session, monkeypatch):
+        monkeypatch.setattr(versioning.settings, "SOP_VERSION_SNAPSHOT_INTERVAL", 3)
+        titles = ["step one with a reasonably long title", "step two", "step three", "step four"]
+        sop = SOP(title="History", content=content(*titles))
+        session.add(sop)
+        versioning.record_version(session, sop, None)
+        expected = {1: sop.content}
+        for version in range(2, 9):
+            previous = sop.content
+            sop.content = content(*titles[:-1], f"step four, edit {version}")
+            sop.version = version
+            versioning.record_version(session, sop, previous)
+            expected[version] = sop.content
+        await session.commit()
+
+        rows = (await session.execute(
+            select(SOPVersion.version_number, SOPVersion.is_snapshot)
+            .where(SOPVersion.sop_id == sop.id).order_by(SOPVersion.version_number)
+        )).all()
+        assert [number for number, is_snapshot in rows if is_snapshot] == [1, 4, 7]
+
+        for version, expected_content in expected.items():
+            assert await versioning.reconstruct(session, sop.id, version) == expected_content
+
+        diff = await versioning.diff_versions(session, sop.id, 2, 8)
+        assert versioning.apply_patch(expected[2], diff) == expected[8]
+
+        listed = await versioning.list_versions(session, sop.id, limit=2, before=8)
+        assert [row["version_number"] for row in listed] == [7, 6]
+
+        with pytest.raises(versioning.VersionNotFound):
+            await versioning.reconstruct(session, sop.id, 9)